@@ -13,6 +13,7 @@ from app.models.business import Business  # Import Business model
 from app.models.widget import WidgetSettings, GuestUser, GuestMessage
 from app.models.chat_session import ChatSession
 from app.models.analytics import AnalyticsDailySummary
+from app.models.cache_generation import CacheGeneration
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
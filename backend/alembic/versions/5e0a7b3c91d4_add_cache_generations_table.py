@@ -0,0 +1,34 @@
+"""add_cache_generations_table
+
+Revision ID: 5e0a7b3c91d4
+Revises: d81f4c2a9e6b
+Create Date: 2026-10-18 19:12:44.031527
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e0a7b3c91d4'
+down_revision: Union[str, Sequence[str], None] = 'd81f4c2a9e6b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cache_generations',
+    sa.Column('scope', sa.String(), nullable=False),
+    sa.Column('key', sa.String(), nullable=False),
+    sa.Column('generation', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('scope', 'key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('cache_generations')
@@ -0,0 +1,32 @@
+"""add_content_hash_to_documents
+
+Revision ID: a41c9e27d5b3
+Revises: ff77867b5ca4
+Create Date: 2026-10-18 09:12:44.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41c9e27d5b3'
+down_revision: Union[str, Sequence[str], None] = 'ff77867b5ca4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_documents_content_hash'), ['content_hash'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_documents_content_hash'))
+        batch_op.drop_column('content_hash')
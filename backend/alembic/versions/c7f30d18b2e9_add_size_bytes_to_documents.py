@@ -0,0 +1,30 @@
+"""add_size_bytes_to_documents
+
+Revision ID: c7f30d18b2e9
+Revises: a41c9e27d5b3
+Create Date: 2026-10-18 10:03:27.550912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7f30d18b2e9'
+down_revision: Union[str, Sequence[str], None] = 'a41c9e27d5b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('size_bytes', sa.BigInteger(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('documents', schema=None) as batch_op:
+        batch_op.drop_column('size_bytes')
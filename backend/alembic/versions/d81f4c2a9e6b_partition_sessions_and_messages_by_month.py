@@ -0,0 +1,104 @@
+"""partition_sessions_and_messages_by_month
+
+Revision ID: d81f4c2a9e6b
+Revises: c7f30d18b2e9
+Create Date: 2026-10-18 16:40:12.208731
+
+"""
+from datetime import date, datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd81f4c2a9e6b'
+down_revision: Union[str, Sequence[str], None] = 'c7f30d18b2e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Postgres only: range-partition by created_at, one partition per month plus a DEFAULT.
+# A partitioned table's primary key must include the partition key, so it becomes
+# (id, created_at), and guest_messages.session_id can no longer reference chat_sessions.
+# Later months are created by app.db.partitions; SQLite keeps the plain tables.
+
+MONTHS_AHEAD = 3
+
+INDEXES = {
+    'chat_sessions': [('ix_chat_sessions_created_at', 'created_at'), ('ix_chat_sessions_guest_id', 'guest_id, created_at')],
+    'guest_messages': [('ix_guest_messages_session_id', 'session_id, created_at'), ('ix_guest_messages_guest_id', 'guest_id, created_at')],
+}
+
+
+def _add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _months(first: date, last: date):
+    month = date(first.year, first.month, 1)
+    while month <= last:
+        yield month
+        month = _add_months(month, 1)
+
+
+def _partition(table: str) -> None:
+    bind = op.get_bind()
+    op.execute(f"UPDATE {table} SET created_at = now() WHERE created_at IS NULL")
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_unpartitioned")
+    op.execute(f"ALTER TABLE {table}_unpartitioned RENAME CONSTRAINT {table}_pkey TO {table}_unpartitioned_pkey")
+
+    op.execute(f"CREATE TABLE {table} (LIKE {table}_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN created_at SET NOT NULL")
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id, created_at)")
+    op.execute(f"ALTER TABLE {table} ADD FOREIGN KEY (guest_id) REFERENCES guest_users (id)")
+    for name, columns in INDEXES[table]:
+        op.execute(f"CREATE INDEX {name} ON {table} ({columns})")
+
+    today = datetime.now(timezone.utc).date()
+    oldest = bind.execute(sa.text(f"SELECT min(created_at) FROM {table}_unpartitioned")).scalar()
+    for month in _months(oldest.date() if oldest else today, _add_months(today, MONTHS_AHEAD)):
+        op.execute(
+            f"CREATE TABLE {table}_p{month:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+        )
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+    op.execute(f"INSERT INTO {table} SELECT * FROM {table}_unpartitioned")
+    op.execute(f"DROP TABLE {table}_unpartitioned")
+
+
+def _unpartition(table: str) -> None:
+    op.execute(f"ALTER TABLE {table} RENAME TO {table}_partitioned")
+    op.execute(f"ALTER TABLE {table}_partitioned RENAME CONSTRAINT {table}_pkey TO {table}_partitioned_pkey")
+    for name, _ in INDEXES[table]:
+        op.execute(f"DROP INDEX {name}")
+    op.execute(f"CREATE TABLE {table} (LIKE {table}_partitioned INCLUDING DEFAULTS)")
+    op.execute(f"ALTER TABLE {table} ALTER COLUMN created_at DROP NOT NULL")
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (id)")
+    op.execute(f"ALTER TABLE {table} ADD FOREIGN KEY (guest_id) REFERENCES guest_users (id)")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {table}_partitioned")
+    # Drops every monthly partition with it
+    op.execute(f"DROP TABLE {table}_partitioned CASCADE")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("ALTER TABLE guest_messages DROP CONSTRAINT IF EXISTS fk_guest_messages_session_id")
+    _partition('chat_sessions')
+    _partition('guest_messages')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    _unpartition('guest_messages')
+    _unpartition('chat_sessions')
+    op.execute(
+        "ALTER TABLE guest_messages ADD CONSTRAINT fk_guest_messages_session_id "
+        "FOREIGN KEY (session_id) REFERENCES chat_sessions (id)"
+    )
@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 
 from app.db.session import get_db
@@ -11,7 +12,8 @@ from app.models.user import User
 from app.auth.router import get_current_user
 from pydantic import BaseModel
 from app.services.analysis_agent import generate_followup_content
-from app.models.widget import GuestMessage
+from app.services.message_log import message_log
+from app.services.analytics_cache import analytics_cache
 from app.core.response_wrapper import success_response
 
 router = APIRouter()
@@ -22,9 +24,6 @@ def get_analytics_overview(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    # Determine date range
-    start_date = datetime.utcnow() - timedelta(days=days)
-    
     # Get user's widget (assuming 1 widget per user for now)
     widget = db.query(WidgetSettings).filter(WidgetSettings.user_id == current_user.id).first()
     if not widget:
@@ -36,6 +35,13 @@ def get_analytics_overview(
             "returning_guests_percentage": 0
         })
 
+    data = analytics_cache.get_or_compute(widget.id, "overview", days, lambda: _compute_overview(db, widget, days))
+    return success_response(data=data)
+
+def _compute_overview(db: Session, widget: WidgetSettings, days: int) -> dict:
+    # Determine date range
+    start_date = datetime.utcnow() - timedelta(days=days)
+
     # Filter sessions by widget -> guest -> session
     # Doing a join: ChatSession -> GuestUser -> WidgetSettings
     query = db.query(ChatSession).join(GuestUser).filter(
@@ -81,13 +87,13 @@ def get_analytics_overview(
     if total_guests > 0:
         returning_percentage = int((returning_guests_count / total_guests) * 100)
 
-    return success_response(data={
+    return {
         "total_sessions": total_sessions,
         "total_guests": total_guests,
         "leads_captured": leads_captured,
         "avg_session_duration": int(avg_duration),
         "returning_guests_percentage": returning_percentage
-    })
+    }
 
 @router.get("/intents")
 def get_top_intents(
@@ -95,11 +101,16 @@ def get_top_intents(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    start_date = datetime.utcnow() - timedelta(days=days)
     widget = db.query(WidgetSettings).filter(WidgetSettings.user_id == current_user.id).first()
     if not widget:
         return success_response(data=[])
 
+    data = analytics_cache.get_or_compute(widget.id, "intents", days, lambda: _compute_intents(db, widget, days))
+    return success_response(data=data)
+
+def _compute_intents(db: Session, widget: WidgetSettings, days: int) -> list:
+    start_date = datetime.utcnow() - timedelta(days=days)
+
     # Group by top_intent, no limit as requested
     results = db.query(
         ChatSession.top_intent, func.count(ChatSession.id)
@@ -109,7 +120,7 @@ def get_top_intents(
         ChatSession.top_intent.isnot(None)
     ).group_by(ChatSession.top_intent).order_by(func.count(ChatSession.id).desc()).all()
     
-    return success_response(data=[{"intent": r[0], "count": r[1]} for r in results])
+    return [{"intent": r[0], "count": r[1]} for r in results]
 
 @router.get("/locations")
 def get_top_locations(
@@ -117,11 +128,16 @@ def get_top_locations(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    start_date = datetime.utcnow() - timedelta(days=days)
     widget = db.query(WidgetSettings).filter(WidgetSettings.user_id == current_user.id).first()
     if not widget:
         return success_response(data=[])
 
+    data = analytics_cache.get_or_compute(widget.id, "locations", days, lambda: _compute_locations(db, widget, days))
+    return success_response(data=data)
+
+def _compute_locations(db: Session, widget: WidgetSettings, days: int) -> list:
+    start_date = datetime.utcnow() - timedelta(days=days)
+
     # Group by City, Country
     # Prefer City if available, else Country?
     # Let's return list of {country, city, count}
@@ -133,7 +149,7 @@ def get_top_locations(
         ChatSession.country.isnot(None)
     ).group_by(ChatSession.country, ChatSession.city).order_by(func.count(ChatSession.id).desc()).limit(10).all()
     
-    return success_response(data=[{"country": r[0], "city": r[1] or "Unknown", "count": r[2]} for r in results])
+    return [{"country": r[0], "city": r[1] or "Unknown", "count": r[2]} for r in results]
 
 @router.get("/sources")
 def get_traffic_sources(
@@ -141,11 +157,16 @@ def get_traffic_sources(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    start_date = datetime.utcnow() - timedelta(days=days)
     widget = db.query(WidgetSettings).filter(WidgetSettings.user_id == current_user.id).first()
     if not widget:
         return success_response(data=[])
 
+    data = analytics_cache.get_or_compute(widget.id, "sources", days, lambda: _compute_sources(db, widget, days))
+    return success_response(data=data)
+
+def _compute_sources(db: Session, widget: WidgetSettings, days: int) -> list:
+    start_date = datetime.utcnow() - timedelta(days=days)
+
     # Count distinct guests per referrer (User asked for per-user basis)
     results = db.query(
         ChatSession.referrer, func.count(func.distinct(ChatSession.guest_id))
@@ -155,7 +176,7 @@ def get_traffic_sources(
         ChatSession.referrer.isnot(None)
     ).group_by(ChatSession.referrer).order_by(func.count(func.distinct(ChatSession.guest_id)).desc()).all()
     
-    return success_response(data=[{"source": r[0], "count": r[1]} for r in results])
+    return [{"source": r[0], "count": r[1]} for r in results]
 
 @router.get("/trend")
 def get_traffic_trend(
@@ -163,11 +184,16 @@ def get_traffic_trend(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    start_date = datetime.utcnow() - timedelta(days=days)
     widget = db.query(WidgetSettings).filter(WidgetSettings.user_id == current_user.id).first()
     if not widget:
         return success_response(data=[])
 
+    data = analytics_cache.get_or_compute(widget.id, "trend", days, lambda: _compute_trend(db, widget, days))
+    return success_response(data=data)
+
+def _compute_trend(db: Session, widget: WidgetSettings, days: int) -> list:
+    start_date = datetime.utcnow() - timedelta(days=days)
+
     # Daily session counts
     # Using func.date for SQLite compatibility (and Postgres sometimes)
     # If using Postgres, might need cast to Date.
@@ -179,7 +205,92 @@ def get_traffic_trend(
         ChatSession.created_at >= start_date
     ).group_by(func.date(ChatSession.created_at)).order_by(func.date(ChatSession.created_at)).all()
     
-    return success_response(data=[{"date": str(r[0]), "count": r[1]} for r in results])
+    return [{"date": str(r[0]), "count": r[1]} for r in results]
+
+@router.get("/dashboard")
+def get_dashboard(
+    days: int = 30,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Every dashboard panel in one request: one auth check, one widget lookup, one scan."""
+    widget = db.query(WidgetSettings).filter(WidgetSettings.user_id == current_user.id).first()
+    if not widget:
+        return success_response(data=summarize_sessions([]))
+
+    data = analytics_cache.get_or_compute(widget.id, "dashboard", days, lambda: _compute_dashboard(db, widget, days))
+    return success_response(data=data)
+
+def _compute_dashboard(db: Session, widget: WidgetSettings, days: int) -> dict:
+    start_date = datetime.utcnow() - timedelta(days=days)
+
+    # Only the columns the panels aggregate; rows are streamed, not loaded as ORM objects
+    rows = db.query(
+        ChatSession.guest_id,
+        ChatSession.created_at,
+        ChatSession.session_duration,
+        ChatSession.top_intent,
+        ChatSession.country,
+        ChatSession.city,
+        ChatSession.referrer,
+        GuestUser.is_lead,
+        GuestUser.is_returning,
+    ).join(GuestUser).filter(
+        GuestUser.widget_id == widget.id,
+        ChatSession.created_at >= start_date
+    ).yield_per(1000)
+
+    return summarize_sessions(rows)
+
+def summarize_sessions(rows) -> dict:
+    """Fold (session, guest) rows into the same figures the per-panel endpoints return."""
+    total_sessions = 0
+    guests, leads, returning = set(), set(), set()
+    durations = []
+    intents, locations, trend = Counter(), Counter(), Counter()
+    sources = defaultdict(set)
+
+    for row in rows:
+        total_sessions += 1
+        guests.add(row.guest_id)
+        if row.is_lead:
+            leads.add(row.guest_id)
+        if row.is_returning:
+            returning.add(row.guest_id)
+        if row.session_duration is not None:
+            durations.append(row.session_duration)
+        if row.top_intent is not None:
+            intents[row.top_intent] += 1
+        if row.country is not None:
+            locations[(row.country, row.city)] += 1
+        if row.referrer is not None:
+            # Distinct guests per referrer, as in /sources
+            sources[row.referrer].add(row.guest_id)
+        if row.created_at is not None:
+            trend[row.created_at.date().isoformat()] += 1
+
+    avg_duration = sum(durations) / len(durations) if durations else 0
+    returning_percentage = int((len(returning) / len(guests)) * 100) if guests else 0
+
+    return {
+        "overview": {
+            "total_sessions": total_sessions,
+            "total_guests": len(guests),
+            "leads_captured": len(leads),
+            "avg_session_duration": int(avg_duration),
+            "returning_guests_percentage": returning_percentage
+        },
+        "intents": [{"intent": intent, "count": count} for intent, count in intents.most_common()],
+        "locations": [
+            {"country": country, "city": city or "Unknown", "count": count}
+            for (country, city), count in locations.most_common(10)
+        ],
+        "sources": [
+            {"source": source, "count": len(visitors)}
+            for source, visitors in sorted(sources.items(), key=lambda item: len(item[1]), reverse=True)
+        ],
+        "trend": [{"date": day, "count": trend[day]} for day in sorted(trend)],
+    }
 
 class FollowUpRequest(BaseModel):
     session_id: str
@@ -209,14 +320,14 @@ async def generate_followup(
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
         
-    messages = db.query(GuestMessage).filter(GuestMessage.session_id == request.session_id).order_by(GuestMessage.created_at).all()
+    messages = message_log.for_session(db, request.session_id, since=session.created_at)
     
     # Get API key
     api_key = None
     if current_user.business and current_user.business.gemini_api_key:
         api_key = decrypt_string(current_user.business.gemini_api_key)
     
-    content = await generate_followup_content(messages, request.type, request.extra_info, api_key=api_key)
+    content = await generate_followup_content(messages, request.type, request.extra_info, api_key=api_key, business_id=current_user.id)
     
     return success_response(data={"content": content})
 
@@ -272,7 +383,7 @@ def get_session_details(
         raise HTTPException(status_code=404, detail="Session not found")
 
     guest = db.query(GuestUser).filter(GuestUser.id == session.guest_id).first()
-    messages = db.query(GuestMessage).filter(GuestMessage.session_id == session_id).order_by(GuestMessage.created_at).all()
+    messages = message_log.for_session(db, session_id, since=session.created_at)
     
     return success_response(data={
         "id": session.id,
@@ -1,3 +1,5 @@
+import logging
+
 from fastapi import APIRouter, HTTPException, Depends
 from sqlalchemy.orm import Session
 from app.db.session import get_db
@@ -8,7 +10,9 @@ from app.schemas.business import BusinessCreate, BusinessUpdate, BusinessRespons
 from app.core.response_wrapper import success_response
 from app.services.analysis_agent import generate_business_intents
 from app.core.security_utils import encrypt_string, decrypt_string
+from app.services.agent_system.response_cache import response_cache
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
@@ -91,6 +95,9 @@ async def update_business(
     db.commit()
     db.refresh(business)
     
+    # Name, instructions and intents all shape the agent's answers
+    response_cache.invalidate(current_user.id)
+    
     response = BusinessResponse.model_validate(business)
     response.is_api_key_set = bool(business.gemini_api_key)
 
@@ -132,7 +139,7 @@ async def validate_api_key(
         # If no exception, we are good?
         
     except Exception as e:
-        print(f"Key Validation Failed: {e}")
+        logger.warning("Key Validation Failed: %s", e)
         # Return 200 with success=False to let frontend handle message? 
         # Or 400? 400 is better for 'Invalid Request/Input'.
         raise HTTPException(status_code=400, detail=f"Invalid API Key: {str(e)}")
@@ -152,5 +159,5 @@ async def generate_intents(
     if business.gemini_api_key:
         api_key = decrypt_string(business.gemini_api_key)
         
-    intents = await generate_business_intents(business.description, api_key=api_key)
+    intents = await generate_business_intents(business.description, api_key=api_key, business_id=current_user.id)
     return success_response(data={"intents": intents})
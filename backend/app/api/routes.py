@@ -6,10 +6,17 @@ from app.models.user import User
 from typing import List
 from app.services.rag_service import rag_service
 from app.services.agent_service import run_conversation
+from app.services.agent_system.response_cache import response_cache
+from app.services.agent_system.llm_scheduler import LLMOverloaded
+from app.services.agent_system.circuit_breaker import CircuitOpen
 from app.schemas.document import IngestResponse
 from app.schemas.chat import ChatRequest, ChatResponse
 from app.core.security_utils import decrypt_string
+from app.core.config import settings
+from app.services.file_storage import StorageQuotaExceeded
+from app.utils.hashing import ReadLimitExceeded
 import asyncio
+import math
 
 from app.core.response_wrapper import success_response
 
@@ -30,11 +37,32 @@ async def upload_documents(
         if not file.filename or file.filename.strip() == "":
             raise HTTPException(status_code=400, detail="Invalid file: filename is missing")
     
+    # Stream files concurrently; each upload commits its own document
+    semaphore = asyncio.Semaphore(settings.MAX_CONCURRENT_UPLOADS)
+    
+    async def upload(file: UploadFile):
+        async with semaphore:
+            return await rag_service.upload_document(file, user_id=current_user.id, db=db)
+    
+    results = await asyncio.gather(*(upload(file) for file in files), return_exceptions=True)
+    
     saved_files = []
-    for file in files:
-        filename = await rag_service.upload_document(file, user_id=current_user.id, db=db)
-        saved_files.append(filename)
-    return success_response(message="Files uploaded successfully", data={"files": saved_files})
+    rejected = []
+    for file, result in zip(files, results):
+        if isinstance(result, (ReadLimitExceeded, StorageQuotaExceeded)):
+            rejected.append({"filename": file.filename, "reason": str(result)})
+        elif isinstance(result, BaseException):
+            raise result
+        else:
+            saved_files.append(result)
+    
+    if rejected and not saved_files:
+        raise HTTPException(
+            status_code=413,
+            detail="; ".join(f"{r['filename']}: {r['reason']}" for r in rejected)
+        )
+    message = "Files uploaded successfully" if not rejected else "Some files were rejected"
+    return success_response(message=message, data={"files": saved_files, "rejected": rejected})
 
 @router.get("/documents", response_model=None)
 async def list_documents(
@@ -54,8 +82,10 @@ async def delete_document(
         raise HTTPException(status_code=404, detail="Document not found")
     return success_response(message="Document deleted successfully")
 
+# Plain def: ingestion blocks on extraction futures, embedding and Chroma writes,
+# so FastAPI runs it in its threadpool instead of on the event loop
 @router.post("/rag/process", response_model=None)
-async def start_rag_process(
+def start_rag_process(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -91,13 +121,28 @@ async def chat_with_agent(
         )
     
     # Use user.id as session_id for chat history per user
-    response_text = await run_conversation(
-        message=request.message,
-        user_id=current_user.id,
-        business_name=business.business_name,
-        custom_instruction=business.custom_agent_instruction,
-        session_id=current_user.id,
-        intents=business.intents,
-        api_key=decrypted_key
-    )
-    return success_response(data=ChatResponse(response=response_text))
\ No newline at end of file
+    try:
+        response_text = await run_conversation(
+            message=request.message,
+            user_id=current_user.id,
+            business_name=business.business_name,
+            custom_instruction=business.custom_agent_instruction,
+            session_id=current_user.id,
+            intents=business.intents,
+            api_key=decrypted_key
+        )
+    except LLMOverloaded:
+        raise HTTPException(status_code=503, detail="The AI service is busy, please try again shortly.")
+    except CircuitOpen as e:
+        raise HTTPException(
+            status_code=503,
+            detail="The AI service is failing for this business, please try again later.",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    return success_response(data=ChatResponse(response=response_text))
+@router.get("/chat/cache-stats", response_model=None)
+async def get_chat_cache_stats(
+    current_user: User = Depends(get_current_user)
+):
+    """Semantic answer cache hit rate and saved agent latency for the current business."""
+    return success_response(data=response_cache.stats(current_user.id))
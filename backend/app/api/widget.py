@@ -4,9 +4,11 @@ from typing import List, Optional
 import uuid
 from datetime import datetime, timezone
 import httpx
+import logging
+import time
 
 from app.db.session import get_db
-from app.models.widget import WidgetSettings, GuestUser, GuestMessage
+from app.models.widget import WidgetSettings, GuestUser
 from app.models.user import User
 from app.models.business import Business
 from app.models.chat_session import ChatSession, SessionOrigin
@@ -17,9 +19,17 @@ from app.schemas.widget import (
     SessionStartRequest, SessionHistoryResponse
 )
 from app.services.agent_service import run_conversation
+from app.services.agent_system.llm_scheduler import LLMOverloaded
+from app.services.agent_system.circuit_breaker import CircuitOpen
 from app.auth.router import get_current_user
 from app.core.response_wrapper import success_response
 from app.core.security_utils import decrypt_string
+from app.core.tracing import tracer
+from app.core.metrics import chat_limit_rejections, geoip_duration, geoip_lookups
+from app.core.rate_limit import client_ip, rate_limiter, trusted_proxies
+from app.services.session_stats import session_stats
+from app.services.message_log import message_log
+from app.services.analytics_cache import analytics_cache
 from datetime import timedelta
 
 # Additional Schema for Updating Settings
@@ -41,6 +51,7 @@ class WidgetUpdate(BaseModel):
 
 
 router = APIRouter()
+logger = logging.getLogger(__name__)
 
 @router.get("/config/{public_widget_id}", response_model=WidgetConfigResponse)
 def get_widget_config(
@@ -55,7 +66,7 @@ def get_widget_config(
     # Domain Whitelisting Check
     if widget.whitelisted_domains:
         origin = request.headers.get("origin")
-        print(f"\n\nOrigin: {origin}\n\n")
+        logger.debug("Widget config requested", extra={"origin": origin})
         # If origin is null (e.g. direct curl) or not in whitelist, strip or block?
         # Requirement says "it will only work under the set domains".
         # If strict, we raise 403.
@@ -200,11 +211,20 @@ def get_guest_interactions(
     if not guest:
         raise HTTPException(status_code=404, detail="Guest session not found or access denied")
         
-    messages = db.query(GuestMessage).filter(GuestMessage.guest_id == guest_id).order_by(GuestMessage.created_at).all()
+    messages = message_log.for_guest(db, guest_id)
     return messages
 
+def _client_ip(request: Request) -> Optional[str]:
+    """Client address; X-Forwarded-For is only trusted when it comes from TRUSTED_PROXIES."""
+    peer = request.client.host if request.client else None
+    return client_ip(peer, request.headers.get("X-Forwarded-For"), trusted_proxies)
+
 @router.post("/guest/start/{public_widget_id}", response_model=GuestStartResponse)
-def start_guest_session(public_widget_id: str, guest_in: GuestStartRequest, db: Session = Depends(get_db)):
+def start_guest_session(public_widget_id: str, guest_in: GuestStartRequest, request: Request, db: Session = Depends(get_db)):
+    # Throttle before touching the DB so floods cost no queries
+    with tracer.start_as_current_span("chat.rate_limit"):
+        rate_limiter.enforce([("ip", _client_ip(request)), ("widget", public_widget_id)])
+
     widget = db.query(WidgetSettings).filter(WidgetSettings.public_widget_id == public_widget_id).first()
     if not widget:
         raise HTTPException(status_code=404, detail="Widget not found")
@@ -344,6 +364,61 @@ def start_guest_session(public_widget_id: str, guest_in: GuestStartRequest, db:
 #     return await process_chat_message(db, widget, guest, session.id, session_in.message)
 
 
+@tracer.start_as_current_span("chat.geoip_lookup")
+async def _geolocate_session(session: ChatSession, request: Request):
+    """Fill country/city/timezone from the client IP when the widget did not send them."""
+    outcome = "skipped"
+    started = time.perf_counter()
+    try:
+        # Get client IP - handle proxies/load balancers
+        client_ip = _client_ip(request)
+        
+        logger.debug("Attempting geolocation", extra={"client_ip": client_ip})
+        
+        # Skip localhost IPs
+        if client_ip:
+            if client_ip in ["127.0.0.1", "::1", "localhost"]:
+                client_ip = "8.8.8.8" # this is purely for testing only
+            outcome = "failure"
+            # Use httpx_client to avoid variable name collision
+            async with httpx.AsyncClient() as httpx_client:
+                resp = await httpx_client.get(
+                    f"http://ip-api.com/json/{client_ip}",
+                    timeout=2.0
+                )
+                
+                if resp.status_code == 200:
+                    geo = resp.json()
+                    logger.debug("Geo API response", extra={"geo": geo})
+                    
+                    if geo.get("status") == "success":
+                        outcome = "success"
+                        session.country = geo.get("country")
+                        session.city = geo.get("city")
+                        
+                        if not session.timezone:
+                            session.timezone = geo.get("timezone")
+                        
+                        logger.debug("Geolocation successful: %s, %s", session.country, session.city)
+                    else:
+                        logger.info("Geo API returned failure: %s", geo.get("message"))
+        else:
+            logger.debug("Skipping geolocation: no client IP")
+            
+    except httpx.TimeoutException:
+        outcome = "timeout"
+        logger.warning("GeoIP lookup timeout")
+    except httpx.HTTPError as e:
+        outcome = "http_error"
+        logger.warning("GeoIP HTTP error: %s", e)
+    except Exception as e:
+        outcome = "error"
+        logger.warning("GeoIP lookup failed: %s: %s", type(e).__name__, e)
+    finally:
+        geoip_lookups.inc(outcome=outcome)
+        if outcome != "skipped":
+            geoip_duration.observe(time.perf_counter() - started)
+
 @router.post("/guest/session/init/{public_widget_id}", response_model=WidgetChatResponse)
 async def init_guest_session(
     public_widget_id: str,
@@ -354,26 +429,36 @@ async def init_guest_session(
     """
     Starts a new chat session for a guest and processes the first message.
     """
-    widget = db.query(WidgetSettings).filter(WidgetSettings.public_widget_id == public_widget_id).first()
-    if not widget:
-        raise HTTPException(status_code=404, detail="Widget not found")
-        
-    guest = db.query(GuestUser).filter(GuestUser.id == session_in.guest_id).first()
-    if not guest:
-        raise HTTPException(status_code=404, detail="Guest not found")
+    with tracer.start_as_current_span("chat.rate_limit"):
+        rate_limiter.enforce([
+            ("ip", _client_ip(request)),
+            ("widget", public_widget_id),
+            ("guest", session_in.guest_id),
+        ])
+
+    with tracer.start_as_current_span("chat.widget_lookup"):
+        widget = db.query(WidgetSettings).filter(WidgetSettings.public_widget_id == public_widget_id).first()
+        if not widget:
+            raise HTTPException(status_code=404, detail="Widget not found")
+            
+        guest = db.query(GuestUser).filter(GuestUser.id == session_in.guest_id).first()
+        if not guest:
+            raise HTTPException(status_code=404, detail="Guest not found")
         
     # Create new session
     # Check Daily Session Limit
     if guest.total_sessions is not None: # Though total_sessions is lifetime.
         # We need sessions today.
         today_start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-        sessions_today = db.query(ChatSession).filter(
-            ChatSession.guest_id == guest.id,
-            ChatSession.created_at >= today_start
-        ).count()
+        with tracer.start_as_current_span("chat.session_limit_check"):
+            sessions_today = db.query(ChatSession).filter(
+                ChatSession.guest_id == guest.id,
+                ChatSession.created_at >= today_start
+            ).count()
         
         limit = widget.max_sessions_per_day or 5
         if sessions_today >= limit:
+             chat_limit_rejections.inc(limit="sessions_per_day")
              raise HTTPException(status_code=429, detail="Daily session limit reached")
 
     session = ChatSession(
@@ -397,65 +482,18 @@ async def init_guest_session(
     
     # 2. IP Geolocation Fallback
     if not session.country:
-        try:
-            # Get client IP - handle proxies/load balancers
-            client_ip = request.client.host if request.client else None
-            
-            # Check for forwarded IP (if behind proxy/load balancer)
-            forwarded = request.headers.get("X-Forwarded-For")
-            if forwarded:
-                client_ip = forwarded.split(",")[0].strip()
-            
-            print(f"Attempting geolocation for IP: {client_ip}")
-            
-            # Skip localhost IPs
-            if client_ip:
-                if client_ip in ["127.0.0.1", "::1", "localhost"]:
-                    client_ip = "8.8.8.8" # this is purely for testing only
-                # Use httpx_client to avoid variable name collision
-                async with httpx.AsyncClient() as httpx_client:
-                    resp = await httpx_client.get(
-                        f"http://ip-api.com/json/{client_ip}",
-                        timeout=2.0
-                    )
-                    
-                    if resp.status_code == 200:
-                        geo = resp.json()
-                        print(f"Geo API response: {geo}")
-                        
-                        if geo.get("status") == "success":
-                            session.country = geo.get("country")
-                            session.city = geo.get("city")
-                            
-                            if not session.timezone:
-                                session.timezone = geo.get("timezone")
-                            
-                            print(f"Geolocation successful: {session.country}, {session.city}")
-                        else:
-                            print(f"Geo API returned failure: {geo.get('message')}")
-            else:
-                print(f"Skipping geolocation for localhost IP: {client_ip}")
-                
-        except httpx.TimeoutException:
-            print(f"GeoIP Lookup Timeout")
-        except httpx.HTTPError as e:
-            print(f"GeoIP HTTP Error: {e}")
-        except Exception as e:
-            print(f"GeoIP Lookup Failed: {type(e).__name__}: {e}")
+        await _geolocate_session(session, request)
     
     db.add(session)
-    
-    # Update Guest Stats
-    guest.last_seen_at = datetime.now(timezone.utc)
-    if guest.total_sessions is None:
-        guest.total_sessions = 0
-    guest.total_sessions += 1
-    
-    if guest.total_sessions > 1:
-        guest.is_returning = True
         
-    db.commit()
-    db.refresh(session)
+    with tracer.start_as_current_span("chat.session_create"):
+        db.commit()
+        db.refresh(session)
+
+    # Guest visit stats (last_seen_at, total_sessions, is_returning) are written in the background
+    session_stats.record_guest_session(guest.id, datetime.now(timezone.utc))
+    # The widget's cached dashboard panels no longer count every session
+    analytics_cache.invalidate(widget.id)
     
     # Process message
     return await process_chat_message(db, widget, guest, session.id, session_in.message)
@@ -465,80 +503,93 @@ async def chat_in_session(
     public_widget_id: str,
     session_id: str,
     chat_in: WidgetChatRequest,
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    widget = db.query(WidgetSettings).filter(WidgetSettings.public_widget_id == public_widget_id).first()
-    if not widget:
-        raise HTTPException(status_code=404, detail="Widget not found")
-        
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
-    if not session:
-        raise HTTPException(status_code=404, detail="Session not found")
-        
-    guest = db.query(GuestUser).filter(GuestUser.id == session.guest_id).first() # Should exist
+    with tracer.start_as_current_span("chat.rate_limit"):
+        rate_limiter.enforce([("ip", _client_ip(request)), ("widget", public_widget_id)])
+
+    with tracer.start_as_current_span("chat.widget_lookup"):
+        widget = db.query(WidgetSettings).filter(WidgetSettings.public_widget_id == public_widget_id).first()
+        if not widget:
+            raise HTTPException(status_code=404, detail="Widget not found")
+            
+        session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
+        if not session:
+            raise HTTPException(status_code=404, detail="Session not found")
+            
+        guest = db.query(GuestUser).filter(GuestUser.id == session.guest_id).first() # Should exist
+
+    # The guest is only known after the lookup, but still limited before anything is written
+    with tracer.start_as_current_span("chat.rate_limit"):
+        rate_limiter.enforce([("guest", session.guest_id)])
+
+    # Check Message Limit before the message is stored.
+    # user_messages counts guest messages only: the limit is "maximum messages per session per user".
+    # Turns answered by this worker but not yet flushed count too. Those of other workers and
+    # turns still in flight do not, so a session spread across workers can overshoot by up to
+    # one flush interval's worth of turns (see WidgetSettings.max_messages_per_session).
+    limit = widget.max_messages_per_session or 50
+    if (session.user_messages or 0) + session_stats.pending_user_messages(session_id) >= limit:
+        # Answered as a system message from the "AI" rather than an error, so the widget shows it inline
+        chat_limit_rejections.inc(limit="messages_per_session")
+        now = datetime.now(timezone.utc)
+        return WidgetChatResponse(
+            message=GuestMessageSchema(
+                id=str(uuid.uuid4()),
+                guest_id=session.guest_id,
+                session_id=session_id,
+                sender="guest",
+                message_text=chat_in.message,
+                created_at=now
+            ),
+            response=GuestMessageSchema(
+                id=str(uuid.uuid4()),
+                guest_id=session.guest_id,
+                session_id=session_id,
+                sender="ai",
+                message_text="Session message limit reached. Please start a new session.",
+                created_at=now
+            )
+        )
     
-    # Update last_message_at
-    session.last_message_at = datetime.now(timezone.utc)
-    db.commit()
+    # last_message_at is written in the background with the session's other stats
+    session_stats.touch(session_id, datetime.now(timezone.utc))
     
     return await process_chat_message(db, widget, guest, session_id, chat_in.message)
 
 
+@tracer.start_as_current_span("chat.process_message")
 async def process_chat_message(db: Session, widget: WidgetSettings, guest: GuestUser, session_id: str, message_text: str):
-    # 1. Store guest message
-    guest_msg = GuestMessage(
-        guest_id=guest.id,
-        session_id=session_id,
-        sender="guest",
-        message_text=message_text
-    )
-    db.add(guest_msg)
-    db.commit()
-    db.refresh(guest_msg)
+    # 1. Store guest message (write-ahead logged; bulk-inserted in the background)
+    with tracer.start_as_current_span("chat.store_guest_message"):
+        guest_msg = message_log.append(guest.id, session_id, "guest", message_text)
 
     # 2. Get business context
-    owner_user = db.query(User).filter(User.id == widget.user_id).first()
-    if not owner_user or not owner_user.business:
-        business_name = "Taimako.AI"
-        instruction = None
-        intents = None
-    else:
-        business_name = owner_user.business.business_name
-        instruction = owner_user.business.custom_agent_instruction
-        intents = owner_user.business.intents
+    with tracer.start_as_current_span("chat.business_lookup"):
+        owner_user = db.query(User).filter(User.id == widget.user_id).first()
+        if not owner_user or not owner_user.business:
+            business_name = "Taimako.AI"
+            instruction = None
+            intents = None
+        else:
+            business_name = owner_user.business.business_name
+            instruction = owner_user.business.custom_agent_instruction
+            intents = owner_user.business.intents
 
     # 3. Call AI
-    # Check Message Limit
-    if session_id:
-        current_session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
-        if current_session:
-             limit = widget.max_messages_per_session or 50
-             # user_messages is user only. total is user+ai. Requirement: "maximum messages per session per user" usually means user messages.
-             # or total? "Businesses should be able to se maximum messages per session per user"
-             # Let's limit USER messages.
-             if (current_session.user_messages or 0) >= limit:
-                 # We can silently ignore or return a system message.
-                 # Returning a system message as "AI" is easiest.
-                 return WidgetChatResponse(
-                    message=GuestMessageSchema.model_validate(guest_msg),
-                    response=GuestMessageSchema(
-                        id=str(uuid.uuid4()),
-                        guest_id=guest.id,
-                        session_id=session_id,
-                        sender="ai",
-                        message_text="Session message limit reached. Please start a new session.",
-                        created_at=datetime.now(timezone.utc)
-                    )
-                 )
+    # (The per-session message limit is checked by chat_in_session before anything is stored;
+    # a session started by init_guest_session has no messages yet.)
 
     # Decrypt API Key
     # Decrypt API Key
     decrypted_key = None
     if owner_user and owner_user.business and owner_user.business.gemini_api_key:
-        decrypted_key = decrypt_string(owner_user.business.gemini_api_key)
+        with tracer.start_as_current_span("chat.decrypt_key"):
+            decrypted_key = decrypt_string(owner_user.business.gemini_api_key)
     
     if not decrypted_key:
-        print(f"Missing API Key for business {widget.user_id}")
+        logger.warning("Missing API key for business %s", widget.user_id)
         return WidgetChatResponse(
             message=GuestMessageSchema.model_validate(guest_msg),
             response=GuestMessageSchema(
@@ -552,6 +603,7 @@ async def process_chat_message(db: Session, widget: WidgetSettings, guest: Guest
         )
 
 
+    fallback_text = None
     try:
         ai_response_text = await run_conversation(
             message=message_text,
@@ -562,8 +614,19 @@ async def process_chat_message(db: Session, widget: WidgetSettings, guest: Guest
             intents=intents,
             api_key=decrypted_key
         )
+    except LLMOverloaded:
+        # This business's LLM queue is saturated; answer at once rather than after the timeout
+        logger.warning("LLM queue full for business %s", widget.user_id)
+        fallback_text = "We're receiving a lot of messages right now. Please try again in a moment."
+    except CircuitOpen:
+        # Recent turns for this business kept failing; skip the provider until the breaker probes again
+        logger.info("Circuit open for business %s", widget.user_id)
+        fallback_text = "I'm having trouble connecting right now. Please try again later."
     except Exception as e:
-        print(f"Agent Execution Error: {e}")
+        logger.exception("Agent execution error: %s", e)
+        fallback_text = "I'm having trouble connecting right now. Please try again later."
+
+    if fallback_text is not None:
         return WidgetChatResponse(
             message=GuestMessageSchema.model_validate(guest_msg),
             response=GuestMessageSchema(
@@ -571,68 +634,18 @@ async def process_chat_message(db: Session, widget: WidgetSettings, guest: Guest
                 guest_id=guest.id,
                 session_id=session_id,
                 sender="ai",
-                message_text="I'm having trouble connecting right now. Please try again later.",
+                message_text=fallback_text,
                 created_at=datetime.now(timezone.utc)
             )
         )
 
 
     # 4. Store AI response
-    ai_msg = GuestMessage(
-        guest_id=guest.id,
-        session_id=session_id,
-        sender="ai",
-        message_text=ai_response_text
-    )
-    db.add(ai_msg)
-    db.commit()
-    db.refresh(ai_msg)
+    with tracer.start_as_current_span("chat.store_ai_message"):
+        ai_msg = message_log.append(guest.id, session_id, "ai", ai_response_text)
 
-    # 5. Update Session Stats
-    session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
-    if session:
-        if session.total_messages is None: session.total_messages = 0
-        if session.user_messages is None: session.user_messages = 0
-        if session.ai_messages is None: session.ai_messages = 0
-        
-        session.total_messages += 2 # 1 user + 1 AI
-        session.user_messages += 1
-        session.ai_messages += 1
-        # Calculate duration
-        # Ensure session.created_at is aware or naive consistently.
-        # DB usually returns naive (implicitly UTC) if not using PostgreSQL with timezone=True explicitly in some configs.
-        # But datetime.now(timezone.utc) is aware.
-        # Safe strategy: Ensure both are aware.
-        
-        now_aware = datetime.now(timezone.utc)
-        
-        if session.created_at:
-             created_at = session.created_at
-             if created_at.tzinfo is None:
-                 created_at = created_at.replace(tzinfo=timezone.utc)
-             
-             delta = now_aware - created_at
-             session.session_duration = int(delta.total_seconds())
-        
-        # First response time (if not set)
-        if session.first_response_time is None:
-             # guest_msg.created_at and ai_msg.created_at might be naive or aware.
-             # They are freshly created so they might be naive if fetched back from SQLite immediately?
-             # Or they are the objects we just added? No, we queried messages or refreshed them.
-             
-             g_created = guest_msg.created_at
-             a_created = ai_msg.created_at
-             
-             if g_created and a_created:
-                 if g_created.tzinfo is None:
-                     g_created = g_created.replace(tzinfo=timezone.utc)
-                 if a_created.tzinfo is None:
-                     a_created = a_created.replace(tzinfo=timezone.utc)
-                     
-                 frt = a_created - g_created
-                 session.first_response_time = int(frt.total_seconds())
-
-        db.commit()
+    # 5. Update Session Stats (batched in the background, off the response path)
+    session_stats.record_turn(session_id, guest_msg.created_at, ai_msg.created_at)
 
     return WidgetChatResponse(
         message=GuestMessageSchema.model_validate(guest_msg),
@@ -646,7 +659,7 @@ def get_guest_session_history(guest_id: str, db: Session = Depends(get_db)):
 
 @router.get("/session/{session_id}/messages", response_model=List[GuestMessageSchema])
 def get_session_messages(session_id: str, db: Session = Depends(get_db)):
-    messages = db.query(GuestMessage).filter(GuestMessage.session_id == session_id).order_by(GuestMessage.created_at).all()
+    messages = message_log.for_session(db, session_id)
     return messages
 
 @router.get("/session/{session_id}")
@@ -668,7 +681,7 @@ def get_session_details_widget(
         raise HTTPException(status_code=404, detail="Session not found")
 
     guest = db.query(GuestUser).filter(GuestUser.id == session.guest_id).first()
-    messages = db.query(GuestMessage).filter(GuestMessage.session_id == session_id).order_by(GuestMessage.created_at).all()
+    messages = message_log.for_session(db, session_id, since=session.created_at)
     
     return success_response(data={
         "id": session.id,
@@ -705,12 +718,15 @@ async def analyze_chat_session(session_id: str, db: Session = Depends(get_db)):
     # Fetch intents and API key from business if available
     intents = None
     decrypted_key = None
+    business_id = None
+    guest = None
     try:
         # ChatSession -> GuestUser -> WidgetSettings -> User -> Business
         guest = db.query(GuestUser).filter(GuestUser.id == session.guest_id).first()
         if guest:
             widget = db.query(WidgetSettings).filter(WidgetSettings.id == guest.widget_id).first()
             if widget:
+                business_id = widget.user_id
                 owner_user = db.query(User).filter(User.id == widget.user_id).first()
                 if owner_user and owner_user.business:
                     if owner_user.business.intents:
@@ -718,10 +734,10 @@ async def analyze_chat_session(session_id: str, db: Session = Depends(get_db)):
                     if owner_user.business.gemini_api_key:
                         decrypted_key = decrypt_string(owner_user.business.gemini_api_key)
     except Exception as e:
-        print(f"Error fetching intents/key: {e}")
+        logger.warning("Error fetching intents/key for session %s: %s", session_id, e)
 
     # 2. Run analysis
-    summary, intent = await analyze_session(db, session_id, intents=intents, api_key=decrypted_key)
+    summary, intent = await analyze_session(db, session_id, intents=intents, api_key=decrypted_key, business_id=business_id)
 
     
     # 3. Persist
@@ -729,6 +745,9 @@ async def analyze_chat_session(session_id: str, db: Session = Depends(get_db)):
     
     if not updated_session:
         raise HTTPException(status_code=500, detail="Failed to persist analysis")
+    if guest:
+        # top_intent changed: the intents panel is stale
+        analytics_cache.invalidate(guest.widget_id)
         
     return success_response(data=SessionHistoryResponse.model_validate(updated_session))
 
@@ -738,6 +757,7 @@ async def chat_interaction(
     public_widget_id: str, 
     guest_id: str, 
     chat_in: WidgetChatRequest, 
+    request: Request,
     db: Session = Depends(get_db)
 ):
     # This endpoint is deprecated but kept for backward compatibility if needed.
@@ -758,5 +778,6 @@ async def chat_interaction(
             message=chat_in.message,
             origin="auto-start" # Legacy default
         ),
+        request=request,
         db=db
     )
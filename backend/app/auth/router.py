@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status, Request
 from sqlalchemy.orm import Session
 from fastapi.responses import RedirectResponse, JSONResponse
 from typing import Optional
+import logging
 
 from app.db.session import get_db
 from app.models.user import User
@@ -12,6 +13,7 @@ from app.core.config import settings
 from app.core.response_wrapper import success_response, error_response
 
 router = APIRouter(prefix="/auth", tags=["auth"])
+logger = logging.getLogger(__name__)
 
 # --- Dependency: Get Current User ---
 async def get_current_user(token: str = Depends(verify_token), db: Session = Depends(get_db)) -> User:
@@ -66,17 +68,15 @@ async def signup(user_in: UserSignup, db: Session = Depends(get_db)):
 async def login(user_in: UserLogin, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.email == user_in.email).first()
     
-    # Debug logging
-    print(f"[LOGIN DEBUG] Email: {user_in.email}")
-    print(f"[LOGIN DEBUG] User found: {user is not None}")
+    logger.debug("Login attempt", extra={"email": user_in.email, "user_found": user is not None})
     if user:
-        print(f"[LOGIN DEBUG] Has hashed_password: {user.hashed_password is not None}")
+        logger.debug("Login user has password: %s", user.hashed_password is not None)
         if user.hashed_password:
             try:
                 password_valid = verify_password(user_in.password, user.hashed_password)
-                print(f"[LOGIN DEBUG] Password valid: {password_valid}")
+                logger.debug("Login password valid: %s", password_valid)
             except Exception as e:
-                print(f"[LOGIN DEBUG] Password verification error: {e}")
+                logger.warning("Password verification error: %s", e)
                 password_valid = False
         else:
             password_valid = False
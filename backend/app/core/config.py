@@ -6,6 +6,126 @@ class Settings(BaseSettings):
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "local")
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "hello-world")
     CHROMA_DB_DIR: str = "chroma_db"
+    # Estimated token budget for retrieved context passed to the agent per get_context call
+    CONTEXT_TOKEN_BUDGET: int = int(os.getenv("CONTEXT_TOKEN_BUDGET", 1500))
+
+    # Uploads
+    MAX_UPLOAD_BYTES: int = int(os.getenv("MAX_UPLOAD_BYTES", 50 * 1024 * 1024))
+    STORAGE_QUOTA_BYTES: int = int(os.getenv("STORAGE_QUOTA_BYTES", 500 * 1024 * 1024))
+    MAX_CONCURRENT_UPLOADS: int = int(os.getenv("MAX_CONCURRENT_UPLOADS", 4))
+    # Whole upload request (all files); larger Content-Lengths are refused before the body is read
+    MAX_UPLOAD_REQUEST_BYTES: int = int(os.getenv("MAX_UPLOAD_REQUEST_BYTES", 200 * 1024 * 1024))
+
+    # File storage: "local" (uploads/ on this node) or "s3" (any S3-compatible store, e.g. MinIO)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "local")
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "uploads")
+    S3_BUCKET: str = os.getenv("S3_BUCKET", "")
+    S3_PREFIX: str = os.getenv("S3_PREFIX", "")
+    S3_ENDPOINT_URL: str = os.getenv("S3_ENDPOINT_URL", "") # Empty for AWS
+    S3_REGION: str = os.getenv("S3_REGION", "us-east-1")
+    S3_ACCESS_KEY_ID: str = os.getenv("S3_ACCESS_KEY_ID", "")
+    S3_SECRET_ACCESS_KEY: str = os.getenv("S3_SECRET_ACCESS_KEY", "")
+    # Local read-through cache of objects fetched for ingestion
+    STORAGE_CACHE_DIR: str = os.getenv("STORAGE_CACHE_DIR", "storage_cache")
+    STORAGE_CACHE_MAX_BYTES: int = int(os.getenv("STORAGE_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024))
+    # Worker processes for PDF/DOCX/HTML/CSV text extraction during ingestion (0 = extract inline)
+    EXTRACTION_WORKERS: int = int(os.getenv("EXTRACTION_WORKERS", min(4, os.cpu_count() or 1)))
+
+    # Send LLM calls to an OpenAI-compatible endpoint instead of Gemini (e.g. loadtest/fake_llm.py)
+    LLM_API_BASE: str = os.getenv("LLM_API_BASE", "")
+    LLM_MODEL: str = os.getenv("LLM_MODEL", "openai/fake-llm")
+
+    # Per-stage spans for chat turns, summarised as histograms on /metrics
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+    # Optional JSON-lines file receiving every finished span
+    TRACE_EXPORT_FILE: str = os.getenv("TRACE_EXPORT_FILE", "")
+
+    # Logging: root level, per-module overrides ("app.services=DEBUG,app.auth=WARNING"),
+    # "text" or "json" lines, queue bound, and the fraction of DEBUG records kept
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS: str = os.getenv("LOG_LEVELS", "")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    LOG_QUEUE_SIZE: int = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+    LOG_DEBUG_SAMPLE_RATE: float = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 1.0))
+
+    # Warm Chroma, the embedding model, the DB pool and ADK in the background at startup;
+    # /ready answers 503 until every component is warm. Failed components are retried after
+    # RETRY_BASE seconds, doubling up to RETRY_MAX.
+    WARMUP_ENABLED: bool = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+    WARMUP_TIMEOUT_SECONDS: float = float(os.getenv("WARMUP_TIMEOUT_SECONDS", 300))
+    WARMUP_RETRY_BASE_SECONDS: float = float(os.getenv("WARMUP_RETRY_BASE_SECONDS", 1))
+    WARMUP_RETRY_MAX_SECONDS: float = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", 60))
+
+    # Token-bucket limits on the public widget endpoints, "<requests>/<second|minute|hour|day>"
+    # (the count is also the allowed burst); empty disables a scope. The "memory" backend
+    # limits each worker separately, "redis" shares the buckets between workers (needs the
+    # "redis" extra; each check is a blocking round trip of at most 50ms on the event loop).
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory") # memory | redis
+    REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    RATE_LIMIT_IP: str = os.getenv("RATE_LIMIT_IP", "60/minute")
+    RATE_LIMIT_WIDGET: str = os.getenv("RATE_LIMIT_WIDGET", "600/minute")
+    RATE_LIMIT_GUEST: str = os.getenv("RATE_LIMIT_GUEST", "20/minute")
+    # Comma-separated addresses/CIDRs of our own proxies/load balancers. X-Forwarded-For is
+    # only believed on connections from them (rightmost hop that is not one of them is the
+    # client); empty means the header is ignored and the socket peer is the client, so behind
+    # a load balancer every guest shares its address (Dockerfile.prod trusts private ranges;
+    # a warning is logged once if forwarded requests arrive from one while this is empty).
+    TRUSTED_PROXIES: str = os.getenv("TRUSTED_PROXIES", "")
+
+    # Per-API-key LLM scheduling: at most N calls in flight per key, the rest queue; a chat
+    # turn that cannot get its slots within the timeout is answered "busy" at once.
+    # Provider 429s, 5xx, connection errors and calls exceeding LLM_CALL_TIMEOUT_SECONDS are
+    # retried with jittered exponential backoff (base doubling, capped).
+    LLM_MAX_CONCURRENCY_PER_KEY: int = int(os.getenv("LLM_MAX_CONCURRENCY_PER_KEY", 8))
+    LLM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", 20))
+    LLM_CALL_TIMEOUT_SECONDS: float = float(os.getenv("LLM_CALL_TIMEOUT_SECONDS", 30))
+    LLM_MAX_RETRIES: int = int(os.getenv("LLM_MAX_RETRIES", 3))
+    LLM_BACKOFF_BASE_SECONDS: float = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", 0.5))
+    LLM_BACKOFF_MAX_SECONDS: float = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", 8))
+
+    # Retrieval slower than this lets the agent answer without document context
+    RETRIEVAL_TIMEOUT_SECONDS: float = float(os.getenv("RETRIEVAL_TIMEOUT_SECONDS", 5))
+    # Chunks held in each worker's keyword (BM25) indexes; least recently queried tenants go first
+    KEYWORD_INDEX_MAX_CHUNKS: int = int(os.getenv("KEYWORD_INDEX_MAX_CHUNKS", 200_000))
+    # Per-business breaker: after N consecutive failed agent turns, fail fast for the reset period
+    CIRCUIT_BREAKER_ENABLED: bool = os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_BREAKER_FAILURE_THRESHOLD", 5))
+    CIRCUIT_BREAKER_RESET_SECONDS: float = float(os.getenv("CIRCUIT_BREAKER_RESET_SECONDS", 30))
+
+    # Session/guest statistics are batched in memory and written once per session per interval;
+    # reaching MAX_PENDING sessions+guests triggers an early flush. Widgets' per-session message
+    # limits only see other workers' turns once flushed, so they are soft by one interval.
+    SESSION_STATS_FLUSH_SECONDS: float = float(os.getenv("SESSION_STATS_FLUSH_SECONDS", 1.0))
+    SESSION_STATS_MAX_PENDING: int = int(os.getenv("SESSION_STATS_MAX_PENDING", 5000))
+
+    # Chat messages are buffered and bulk-inserted every FLUSH_SECONDS (or at MAX_BUFFER
+    # messages); until then they live in write-ahead files under MESSAGE_LOG_DIR, which must
+    # be on persistent disk. FSYNC also survives power loss, at one fsync per message.
+    MESSAGE_LOG_DIR: str = os.getenv("MESSAGE_LOG_DIR", "./message_wal")
+    MESSAGE_LOG_FLUSH_SECONDS: float = float(os.getenv("MESSAGE_LOG_FLUSH_SECONDS", 0.2))
+    MESSAGE_LOG_MAX_BUFFER: int = int(os.getenv("MESSAGE_LOG_MAX_BUFFER", 1000))
+    MESSAGE_LOG_FSYNC: bool = os.getenv("MESSAGE_LOG_FSYNC", "false").lower() == "true"
+
+    # Postgres only: monthly partitions of chat_sessions/guest_messages are created this many
+    # months ahead. `python -m app.db.partitions archive` (run it from one scheduled job, not
+    # the web workers) moves partitions older than ARCHIVE_AFTER_MONTHS (default 12 when 0)
+    # to gzipped CSV files under ARCHIVE_DIR and drops them
+    PARTITION_MONTHS_AHEAD: int = int(os.getenv("PARTITION_MONTHS_AHEAD", 3))
+    PARTITION_ARCHIVE_AFTER_MONTHS: int = int(os.getenv("PARTITION_ARCHIVE_AFTER_MONTHS", 0))
+    ARCHIVE_DIR: str = os.getenv("ARCHIVE_DIR", "./archive")
+
+    # Analytics panel results are cached per widget and window for this long, and dropped
+    # early when the widget gets a new session (0 disables the cache)
+    ANALYTICS_CACHE_TTL_SECONDS: float = float(os.getenv("ANALYTICS_CACHE_TTL_SECONDS", 30))
+
+    # Answer trivial greetings/farewells locally instead of via the LLM sub-agents
+    INTENT_ROUTER_ENABLED: bool = os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true"
+    # Reuse answers for paraphrased questions per business (invalidated on document/instruction changes)
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+    # How long a worker trusts its copy of a cache's invalidation counter before re-reading it
+    # from the database (bounds how stale other workers' cached answers/indexes can get)
+    CACHE_GENERATION_CHECK_SECONDS: float = float(os.getenv("CACHE_GENERATION_CHECK_SECONDS", 2.0))
 
     # Google OAuth
     GOOGLE_CLIENT_ID: str = os.getenv("GOOGLE_CLIENT_ID", "")
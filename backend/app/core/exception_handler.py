@@ -14,7 +14,10 @@ def get_error_code(status_code: int) -> str:
         404: "NOT_FOUND",
         405: "METHOD_NOT_ALLOWED",
         409: "CONFLICT",
+        411: "LENGTH_REQUIRED",
+        413: "PAYLOAD_TOO_LARGE",
         422: "VALIDATION_ERROR",
+        429: "TOO_MANY_REQUESTS",
         500: "INTERNAL_SERVER_ERROR",
         503: "SERVICE_UNAVAILABLE",
     }
@@ -30,11 +33,15 @@ async def http_exception_handler(request: Request, exc: HTTPException) -> JSONRe
     # Extract detail message
     detail = exc.detail if isinstance(exc.detail, str) else str(exc.detail)
     
-    return error_response(
+    response = error_response(
         message=detail,
         error_code=error_code,
         status_code=exc.status_code
     )
+    # Keep headers such as Retry-After or WWW-Authenticate
+    if exc.headers:
+        response.headers.update(exc.headers)
+    return response
 
 
 async def validation_exception_handler(request: Request, exc: RequestValidationError) -> JSONResponse:
@@ -0,0 +1,170 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional
+
+from opentelemetry import trace
+
+from app.core.config import settings
+from app.core.metrics import Gauge, registry
+
+# --- Logging ---
+# Request handlers only enqueue records; a QueueListener thread formats them and writes
+# to stdout, so hot paths never block on terminal/pipe writes. When the queue is full,
+# records are dropped (and counted) rather than stalling the event loop.
+# Every record carries the request id of the HTTP request that produced it.
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes every LogRecord has; anything else came in through `extra=` and is emitted as a field
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamps the current request id onto each record (runs on the calling thread)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """Keeps roughly `rate` of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of waiting when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, request_id, message, extra fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"
+
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """Parse "app.services=DEBUG,app.auth=WARNING" into {logger name: level}."""
+    levels = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, level = item.partition("=")
+        if level:
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_listener: Optional[QueueListener] = None
+_queue_handler: Optional[NonBlockingQueueHandler] = None
+
+
+def setup_logging() -> None:
+    """Route all logging through the background queue. Safe to call repeatedly."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else logging.Formatter(TEXT_FORMAT))
+
+    _queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=settings.LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(RequestIdFilter())
+    _queue_handler.addFilter(DebugSamplingFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_queue_handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_levels(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = QueueListener(_queue_handler.queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def dropped_records() -> int:
+    return _queue_handler.dropped if _queue_handler else 0
+
+
+registry.register(Gauge("taimako_log_records_dropped", "Log records dropped because the log queue was full", callback=dropped_records))
+
+
+class RequestIdMiddleware:
+    """ASGI middleware binding a request id (incoming X-Request-ID or a new one) to the request."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers") or []).get(REQUEST_ID_HEADER.lower().encode())
+        request_id = incoming.decode("latin-1")[:64] if incoming else uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        # Lets a slow trace in the span file be matched with its log lines
+        trace.get_current_span().set_attribute("request.id", request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(REQUEST_ID_HEADER.lower().encode(), request_id.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
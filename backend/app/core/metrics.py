@@ -0,0 +1,311 @@
+import math
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# --- In-process metrics ---
+# Minimal Prometheus text-format (0.0.4) registry so /metrics needs no extra dependency.
+# Values live per worker process; scrape each worker (or run one worker per container).
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[Tuple[str, ...], List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [per-bucket counts, sum, count]
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """{label values: {"count", "sum"}} - mainly for tests and debugging."""
+        with self._lock:
+            return {key: {"count": s[2], "sum": s[1]} for key, s in self._series.items()}
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            series = {key: (list(s[0]), s[1], s[2]) for key, s in self._series.items()}
+        lines = []
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Counter:
+    """Monotonic counter keyed by label values."""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def collect(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in values]
+
+
+class Gauge:
+    """Point-in-time value, either set directly or read from a callback at scrape time.
+
+    A callback returns a number (unlabelled gauge) or {label values tuple: number}.
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), callback: Optional[Callable] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def collect(self) -> List[str]:
+        if self.callback is not None:
+            try:
+                result = self.callback()
+            except Exception:
+                return []
+            values = result.items() if isinstance(result, dict) else [((), result)]
+        else:
+            with self._lock:
+                values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in sorted(values)]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+# --- Application metrics ---
+# Per-business labels go on counters only; histograms are labelled by model/stage so the
+# series count does not grow with the number of tenants.
+
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 15.0, 30.0, 60.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+llm_requests = registry.register(Counter(
+    "taimako_llm_requests_total", "LLM calls by business, model, operation and outcome",
+    labelnames=("business", "model", "operation", "outcome"),
+))
+llm_duration = registry.register(Histogram(
+    "taimako_llm_request_duration_seconds", "Latency of a single LLM call",
+    labelnames=("model", "operation"), buckets=LLM_BUCKETS,
+))
+llm_tokens = registry.register(Counter(
+    "taimako_llm_tokens_total", "LLM tokens by business, model and kind (prompt/completion)",
+    labelnames=("business", "model", "kind"),
+))
+conversations = registry.register(Counter(
+    "taimako_conversations_total", "Chat turns by how they were answered (intent_router, cache, agent, overloaded, circuit_open, error)",
+    labelnames=("path",),
+))
+
+llm_queue_wait = registry.register(Histogram(
+    "taimako_llm_queue_wait_seconds", "Time an LLM call waited for a slot under its API key's concurrency cap",
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0),
+))
+llm_scheduler_events = registry.register(Counter(
+    "taimako_llm_scheduler_events_total", "LLM scheduler decisions (rejected, timed_out, rate_limited, retried)",
+    labelnames=("event",),
+))
+retrieval_coalesced = registry.register(Counter(
+    "taimako_retrieval_coalesced_total", "Retrieval calls served by an identical call already in flight",
+))
+retrieval_timeouts = registry.register(Counter(
+    "taimako_retrieval_timeouts_total", "get_context calls that gave up waiting for retrieval",
+))
+
+session_stats_flushes = registry.register(Counter(
+    "taimako_session_stats_flushes_total", "Batched session/guest statistics writes by outcome (ok/error)",
+    labelnames=("outcome",),
+))
+session_stats_batch = registry.register(Histogram(
+    "taimako_session_stats_batch_rows", "Session and guest rows updated per statistics flush",
+    buckets=COUNT_BUCKETS + (500, 1000, 5000),
+))
+
+message_log_flushes = registry.register(Counter(
+    "taimako_message_log_flushes_total", "Bulk chat message writes by outcome (ok/error)",
+    labelnames=("outcome",),
+))
+message_log_batch = registry.register(Histogram(
+    "taimako_message_log_batch_messages", "Chat messages written per message log flush",
+    buckets=COUNT_BUCKETS + (500, 1000, 5000),
+))
+
+retrieval_duration = registry.register(Histogram(
+    "taimako_retrieval_duration_seconds", "Retriever latency (vector = Chroma query, keyword = BM25)",
+    labelnames=("retriever",), buckets=QUERY_BUCKETS + (2.5, 5.0),
+))
+retrieval_results = registry.register(Histogram(
+    "taimako_retrieval_results", "Chunks returned per retriever call",
+    labelnames=("retriever",), buckets=COUNT_BUCKETS,
+))
+response_cache_lookups = registry.register(Counter(
+    "taimako_response_cache_lookups_total", "Semantic response cache lookups by result (hit/miss/error)",
+    labelnames=("result",),
+))
+analytics_cache_lookups = registry.register(Counter(
+    "taimako_analytics_cache_lookups_total", "Analytics panel cache lookups by result (hit/miss/coalesced)",
+    labelnames=("result",),
+))
+
+db_queries = registry.register(Counter("taimako_db_queries_total", "SQL statements executed"))
+db_query_duration = registry.register(Histogram(
+    "taimako_db_query_duration_seconds", "SQL statement latency", buckets=QUERY_BUCKETS,
+))
+db_queries_per_request = registry.register(Histogram(
+    "taimako_db_queries_per_request", "SQL statements executed per HTTP request", buckets=COUNT_BUCKETS,
+))
+
+chat_limit_rejections = registry.register(Counter(
+    "taimako_chat_limit_rejections_total", "Chat requests refused by widget limits",
+    labelnames=("limit",),
+))
+geoip_lookups = registry.register(Counter(
+    "taimako_geoip_lookups_total", "GeoIP fallback lookups by outcome", labelnames=("outcome",),
+))
+geoip_duration = registry.register(Histogram(
+    "taimako_geoip_lookup_duration_seconds", "GeoIP fallback lookup latency", buckets=LLM_BUCKETS,
+))
+
+
+def record_llm_call(business: str, model: str, operation: str, seconds: Optional[float], outcome: str = "success",
+                    prompt_tokens: Optional[int] = None, completion_tokens: Optional[int] = None) -> None:
+    llm_requests.inc(business=business or "unknown", model=model, operation=operation, outcome=outcome)
+    if seconds is not None:
+        llm_duration.observe(seconds, model=model, operation=operation)
+    if prompt_tokens:
+        llm_tokens.inc(prompt_tokens, business=business or "unknown", model=model, kind="prompt")
+    if completion_tokens:
+        llm_tokens.inc(completion_tokens, business=business or "unknown", model=model, kind="completion")
+
+
+# Mutable per-request holder so statements run in threadpool copies of the context still count
+_request_queries: ContextVar[Optional[List[int]]] = ContextVar("request_queries", default=None)
+
+
+def instrument_engine(engine) -> None:
+    """Count and time every statement on a SQLAlchemy engine."""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        db_query_duration.observe(time.perf_counter() - started)
+        db_queries.inc()
+        counter = _request_queries.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording how many SQL statements each HTTP request issued."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        counter = [0]
+        token = _request_queries.set(counter)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _request_queries.reset(token)
+            db_queries_per_request.observe(counter[0])
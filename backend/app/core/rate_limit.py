@@ -0,0 +1,254 @@
+import ipaddress
+import logging
+import math
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.metrics import Counter, chat_limit_rejections, registry
+
+logger = logging.getLogger(__name__)
+
+# --- Rate Limiting ---
+# Token buckets keyed by scope ("ip", "widget", "guest") and identifier, checked on the
+# public widget endpoints before they touch the database so bursts are refused for the
+# price of a dict lookup (or one Redis round trip). The "memory" backend limits each
+# worker separately; the "redis" backend shares buckets between every worker.
+# A broken limiter backend never blocks chat: errors are counted and the request allowed.
+
+rate_limit_errors = registry.register(Counter(
+    "taimako_rate_limit_errors_total", "Rate limiter backend failures (requests were allowed)",
+))
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+_RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(second|minute|hour|day)\s*$")
+
+
+@dataclass(frozen=True)
+class RateLimit:
+    """`capacity` requests per `period` seconds; the full capacity may be used as a burst."""
+
+    capacity: int
+    period: float
+
+    @property
+    def refill_rate(self) -> float:
+        return self.capacity / self.period
+
+
+def parse_rate(spec: str) -> Optional[RateLimit]:
+    """Parse "30/minute" into a RateLimit; an empty spec (or a zero count) disables the limit."""
+    if not spec or not spec.strip():
+        return None
+    match = _RATE_RE.match(spec.lower())
+    if not match:
+        raise ValueError(f"Invalid rate limit {spec!r}, expected e.g. '30/minute'")
+    capacity = int(match.group(1))
+    if capacity == 0:
+        return None
+    return RateLimit(capacity=capacity, period=_PERIODS[match.group(2)])
+
+
+class BaseRateLimiter(ABC):
+    @abstractmethod
+    def acquire(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        """Take `cost` tokens from the bucket. Returns 0 if allowed, else seconds until it would be."""
+
+
+class InMemoryRateLimiter(BaseRateLimiter):
+    """Per-process buckets; the least recently used are dropped beyond `max_keys` (a dropped bucket starts full)."""
+
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        now = self.clock()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(limit.capacity), now]
+            else:
+                self._buckets.move_to_end(key)
+            tokens = min(limit.capacity, bucket[0] + (now - bucket[1]) * limit.refill_rate)
+            bucket[1] = now
+            if tokens >= cost:
+                bucket[0] = tokens - cost
+                wait = 0.0
+            else:
+                bucket[0] = tokens
+                wait = (cost - tokens) / limit.refill_rate
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+# Runs atomically inside Redis. Uses the server clock so workers with skewed clocks agree,
+# and lets idle buckets expire once they would have refilled anyway.
+# Returns the wait as a string: Lua numbers are truncated to integers in replies.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= cost then
+  tokens = tokens - cost
+else
+  wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return tostring(wait)
+"""
+
+
+class RedisRateLimiter(BaseRateLimiter):
+    """Buckets shared by all workers in Redis (or anything speaking its protocol, e.g. Valkey, KeyDB).
+
+    Uses the synchronous client, and the widget endpoints call it on the event loop: each
+    check blocks the loop for one round trip (well under a millisecond on a nearby Redis),
+    and at most `socket_timeout` when Redis is slow or down, after which the request is
+    allowed. Keep Redis close to the workers, and the timeout short.
+    """
+
+    def __init__(self, url: str = "redis://localhost:6379/0", prefix: str = "taimako:ratelimit:",
+                 socket_timeout: float = 0.05, client=None):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise RuntimeError("RATE_LIMIT_BACKEND=redis requires redis (pip install 'agentic-rag-api[redis]')") from e
+            # Short timeouts: a slow limiter must not become the bottleneck it is meant to prevent
+            client = redis.Redis.from_url(url, socket_timeout=socket_timeout, socket_connect_timeout=socket_timeout)
+        self.client = client
+        self.prefix = prefix
+        # EVALSHA with transparent fallback to EVAL when the script cache was flushed
+        self._script = client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    def acquire(self, key: str, limit: RateLimit, cost: float = 1.0) -> float:
+        wait = self._script(keys=[self.prefix + key], args=[limit.capacity, limit.refill_rate, cost])
+        return float(wait.decode() if isinstance(wait, bytes) else wait)
+
+
+class RateLimitService:
+    """Applies the configured per-scope limits through one backend."""
+
+    def __init__(self, backend: BaseRateLimiter, limits: Dict[str, Optional[RateLimit]], enabled: bool = True):
+        self.backend = backend
+        self.limits = limits
+        self.enabled = enabled
+
+    def check(self, scope: str, identifier: Optional[str]) -> float:
+        """Seconds the caller must wait before `scope`/`identifier` may proceed (0 = go ahead)."""
+        limit = self.limits.get(scope)
+        if not self.enabled or limit is None or not identifier:
+            return 0.0
+        try:
+            return self.backend.acquire(f"{scope}:{identifier}", limit)
+        except Exception as e:
+            rate_limit_errors.inc()
+            logger.warning("Rate limiter unavailable, allowing request: %s", e)
+            return 0.0
+
+    def enforce(self, checks: Iterable[Tuple[str, Optional[str]]]) -> None:
+        """Raise 429 (with Retry-After) on the first scope whose bucket is empty."""
+        for scope, identifier in checks:
+            wait = self.check(scope, identifier)
+            if wait > 0:
+                chat_limit_rejections.inc(limit=f"{scope}_rate")
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests, please slow down",
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+
+
+# --- Client Address ---
+# Clients can put anything in X-Forwarded-For; each proxy only appends the address it
+# received the request from. Walking the header from the right, the first hop that is
+# not one of our proxies is the client. Without TRUSTED_PROXIES, or on a connection that
+# does not come from one, the header is ignored and the socket peer is the client.
+
+Network = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+
+def parse_proxies(spec: str) -> List[Network]:
+    """Parse "10.0.0.0/8, 192.168.1.10" into networks."""
+    return [ipaddress.ip_network(part.strip(), strict=False) for part in spec.split(",") if part.strip()]
+
+
+def _is_trusted(address: str, proxies: List[Network]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in proxies)
+
+
+_warned_untrusted_proxy = False
+
+
+def _warn_untrusted_proxy(peer: str) -> None:
+    """Warn once per process when a proxy is evidently in front of us but not configured."""
+    global _warned_untrusted_proxy
+    if _warned_untrusted_proxy:
+        return
+    try:
+        private = ipaddress.ip_address(peer).is_private
+    except ValueError:
+        return
+    if private:
+        _warned_untrusted_proxy = True
+        logger.warning(
+            "Request with X-Forwarded-For from private address %s but TRUSTED_PROXIES is empty: "
+            "the proxy's address is used as the client IP for rate limiting and geolocation, "
+            "so all clients share one bucket. Set TRUSTED_PROXIES to the proxy addresses.", peer,
+        )
+
+
+def client_ip(peer: Optional[str], forwarded_for: Optional[str], proxies: List[Network]) -> Optional[str]:
+    """The client's address given the socket peer and the X-Forwarded-For header."""
+    if not proxies and forwarded_for and peer is not None:
+        _warn_untrusted_proxy(peer)
+    if not proxies or not forwarded_for or peer is None or not _is_trusted(peer, proxies):
+        return peer
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, proxies):
+            return hop
+    # Every hop is one of our proxies: the request started inside our network
+    return hops[0] if hops else peer
+
+
+trusted_proxies = parse_proxies(settings.TRUSTED_PROXIES)
+
+
+def get_rate_limiter() -> RateLimitService:
+    limits = {
+        "ip": parse_rate(settings.RATE_LIMIT_IP),
+        "widget": parse_rate(settings.RATE_LIMIT_WIDGET),
+        "guest": parse_rate(settings.RATE_LIMIT_GUEST),
+    }
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        backend = RedisRateLimiter(url=settings.REDIS_URL)
+    else:
+        backend = InMemoryRateLimiter()
+    return RateLimitService(backend, limits, enabled=settings.RATE_LIMIT_ENABLED)
+
+
+rate_limiter = get_rate_limiter()
@@ -0,0 +1,126 @@
+import logging
+import threading
+from typing import Optional, Sequence
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.trace import SpanKind
+
+from app.core.config import settings
+from app.core.metrics import Histogram, registry
+
+logger = logging.getLogger(__name__)
+
+# --- Tracing ---
+# OpenTelemetry spans around each stage of a chat turn (DB work, agent build, ADK run,
+# retrieval, Chroma). ADK emits its own spans (invoke_agent, call_llm, execute_tool)
+# through the same global provider, so LLM and tool time land in the same histograms.
+# Span durations are folded into `taimako_stage_duration_seconds{stage=<span name>}`
+# served on /metrics; with TRACE_EXPORT_FILE set, full spans are also appended there as
+# JSON lines for per-request breakdowns.
+
+# Stages range from sub-millisecond lookups to multi-second LLM calls
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+stage_duration = registry.register(Histogram(
+    "taimako_stage_duration_seconds",
+    "Duration of traced stages (OpenTelemetry spans), by span name",
+    labelnames=("stage",),
+    buckets=STAGE_BUCKETS,
+))
+
+tracer = trace.get_tracer("taimako")
+
+
+class StageHistogramExporter(SpanExporter):
+    """Local exporter: records every finished span's duration in a histogram."""
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        for span in spans:
+            if span.start_time is not None and span.end_time is not None:
+                self.histogram.observe((span.end_time - span.start_time) / 1e9, stage=span.name)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+class JsonLinesSpanExporter(SpanExporter):
+    """Local exporter: appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = "".join(span.to_json(indent=None) + "\n" for span in spans)
+        try:
+            with self._lock, open(self.path, "a") as f:
+                f.write(lines)
+        except OSError as e:
+            logger.warning("Span export to %s failed: %s", self.path, e)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+_provider: Optional[TracerProvider] = None
+
+
+def setup_tracing() -> Optional[TracerProvider]:
+    """Install the span processors once per process. Safe to call repeatedly."""
+    global _provider
+    if _provider is not None or not settings.TRACING_ENABLED:
+        return _provider
+
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider(resource=Resource.create({"service.name": settings.PROJECT_NAME}))
+        trace.set_tracer_provider(provider)
+
+    # Histogram updates are in-memory and cheap enough to run inline on span end;
+    # file export happens on the batch processor's background thread
+    provider.add_span_processor(SimpleSpanProcessor(StageHistogramExporter(stage_duration)))
+    if settings.TRACE_EXPORT_FILE:
+        provider.add_span_processor(BatchSpanProcessor(JsonLinesSpanExporter(settings.TRACE_EXPORT_FILE)))
+    _provider = provider
+    return provider
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per HTTP request, named after the matched route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        with tracer.start_as_current_span(f"{method} request", kind=SpanKind.SERVER) as span:
+            async def send_with_status(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                # Route templates keep the stage label low-cardinality (no raw ids)
+                route = scope.get("route")
+                if route is not None:
+                    span.update_name(f"{method} {route.path}")
@@ -0,0 +1,50 @@
+from typing import Iterable, Optional
+
+from app.core.exception_handler import get_error_code
+from app.core.response_wrapper import error_response
+
+# --- Upload Size Limits ---
+# FastAPI parses (and spools to disk) a whole multipart body before the route, or any of
+# its dependencies, runs, so per-file and quota limits checked there only apply once the
+# client has sent everything. This middleware answers from the headers instead: upload
+# requests must declare a Content-Length (the server then refuses to read past it), and
+# one larger than the request limit is rejected before a byte of the body is read.
+
+# Multipart framing (boundaries, part headers) allowed on top of the file bytes
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI middleware rejecting oversized uploads to `paths` from their Content-Length."""
+
+    def __init__(self, app, paths: Iterable[str], max_bytes: int):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = _content_length(scope)
+        if content_length is None:
+            response = _error("Uploads must declare a Content-Length", 411)
+        elif content_length > self.max_bytes + MULTIPART_OVERHEAD_BYTES:
+            response = _error(f"Upload exceeds the {self.max_bytes} byte request limit", 413)
+        else:
+            await self.app(scope, receive, send)
+            return
+        await response(scope, receive, send)
+
+
+def _content_length(scope) -> Optional[int]:
+    value = dict(scope.get("headers") or []).get(b"content-length")
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _error(message: str, status_code: int):
+    return error_response(message=message, error_code=get_error_code(status_code), status_code=status_code)
@@ -0,0 +1,254 @@
+import argparse
+import asyncio
+import gzip
+import logging
+import os
+import re
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# --- Partitioning ---
+# On Postgres, chat_sessions and guest_messages are range-partitioned by created_at into
+# monthly partitions (migration d81f4c2a9e6b), so dashboard queries filtered on
+# created_at >= start_date only scan the recent months. Partitions are created ahead of
+# time (PARTITION_MONTHS_AHEAD) at startup and once a day, by whichever web worker gets the
+# maintenance advisory lock; a DEFAULT partition catches anything outside them. Cold months
+# are archived by the CLI (`python -m app.db.partitions archive`, e.g. from a nightly job),
+# never by web workers: detached, written to ARCHIVE_DIR as gzipped CSV, then dropped.
+# SQLite (development) keeps plain tables and skips all of this.
+
+PARTITIONED_TABLES = ("chat_sessions", "guest_messages")
+
+# pg_advisory_lock key held by whoever is creating or archiving partitions
+MAINTENANCE_LOCK_KEY = 0x7461696D  # "taim"
+
+_PARTITION_RE = re.compile(r"^(?P<table>\w+)_p(?P<year>\d{4})_(?P<month>\d{2})$")
+
+
+def month_start(value: date) -> date:
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y_%m}"
+
+
+def parse_partition_name(name: str) -> Optional[Tuple[str, date]]:
+    match = _PARTITION_RE.match(name)
+    if not match:
+        return None
+    return match.group("table"), date(int(match.group("year")), int(match.group("month")), 1)
+
+
+def create_partition_sql(table: str, month: date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    )
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+@contextmanager
+def maintenance_lock(engine: Engine) -> Iterator[bool]:
+    """Yield whether this process holds the partition maintenance lock (always True off Postgres)."""
+    if engine.dialect.name != "postgresql":
+        yield True
+        return
+    with engine.connect() as conn:
+        acquired = conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {"key": MAINTENANCE_LOCK_KEY}).scalar()
+        try:
+            yield bool(acquired)
+        finally:
+            if acquired:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": MAINTENANCE_LOCK_KEY})
+
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table"
+    ), {"table": table}).first() is not None
+
+
+def attached_partitions(conn: Connection, table: str) -> List[str]:
+    return list(conn.execute(text(
+        "SELECT child.relname FROM pg_inherits i "
+        "JOIN pg_class parent ON parent.oid = i.inhparent "
+        "JOIN pg_class child ON child.oid = i.inhrelid "
+        "WHERE parent.relname = :table ORDER BY child.relname"
+    ), {"table": table}).scalars())
+
+
+def detached_partitions(conn: Connection, table: str) -> List[str]:
+    """Monthly tables no longer attached to `table`: an archive run that stopped half-way."""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_class c LEFT JOIN pg_inherits i ON i.inhrelid = c.oid "
+        "WHERE c.relkind = 'r' AND c.relname LIKE :pattern AND i.inhrelid IS NULL"
+    ), {"pattern": f"{table}_p%"}).scalars()
+    return [name for name in names if (parse_partition_name(name) or (None,))[0] == table]
+
+
+def create_partition(conn: Connection, table: str, month: date) -> int:
+    """
+    Create `table`'s partition for `month`; returns the rows moved out of DEFAULT.
+
+    Postgres refuses to create a partition while the DEFAULT partition holds rows in its
+    range (rows written before the partition existed). Those rows are moved: DEFAULT is
+    detached, the partition created and filled from it, and DEFAULT re-attached, all in
+    the caller's transaction (inserts into `table` wait for it).
+    """
+    default = default_partition_name(table)
+    start, end = month.isoformat(), add_months(month, 1).isoformat()
+    in_range = f"created_at >= '{start}' AND created_at < '{end}'"
+    if conn.execute(text(f"SELECT 1 FROM {default} WHERE {in_range} LIMIT 1")).first() is None:
+        conn.execute(text(create_partition_sql(table, month)))
+        return 0
+
+    name = partition_name(table, month)
+    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {default}"))
+    conn.execute(text(create_partition_sql(table, month)))
+    moved = conn.execute(text(f"INSERT INTO {name} SELECT * FROM {default} WHERE {in_range}")).rowcount
+    conn.execute(text(f"DELETE FROM {default} WHERE {in_range}"))
+    conn.execute(text(f"ALTER TABLE {table} ATTACH PARTITION {default} DEFAULT"))
+    logger.warning("Moved %d rows of %s from %s into the new partition %s", moved, table, default, name)
+    return moved
+
+
+def ensure_partitions(engine: Engine, months_ahead: int = 3, today: Optional[date] = None) -> List[str]:
+    """Create this month's and the next `months_ahead` months' partitions; returns the new ones."""
+    today = today or datetime.now(timezone.utc).date()
+    created = []
+    for table in PARTITIONED_TABLES:
+        with engine.connect() as conn:
+            if not is_partitioned(conn, table):
+                continue
+            existing = set(attached_partitions(conn, table))
+        for offset in range(months_ahead + 1):
+            month = add_months(month_start(today), offset)
+            if partition_name(table, month) in existing:
+                continue
+            # One transaction per partition: a failure leaves the others in place
+            try:
+                with engine.begin() as conn:
+                    create_partition(conn, table, month)
+            except Exception as e:
+                logger.error("Could not create partition %s: %s", partition_name(table, month), e)
+                continue
+            created.append(partition_name(table, month))
+    if created:
+        logger.info("Created partitions: %s", ", ".join(created))
+    return created
+
+
+def archive_partition(engine: Engine, table: str, name: str, archive_dir: str, attached: bool = True) -> str:
+    """Detach `name` from `table`, write it to <archive_dir>/<table>/<name>.csv.gz, then drop it."""
+    if attached:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+
+    target_dir = os.path.join(archive_dir, table)
+    os.makedirs(target_dir, exist_ok=True)
+    path = os.path.join(target_dir, f"{name}.csv.gz")
+    tmp_path = path + ".part"
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as out:
+            # Streams the table out of Postgres without loading it into memory
+            cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", out)
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        raw.commit()
+    finally:
+        raw.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    # Only dropped once the archive file is complete on disk
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP TABLE {name}"))
+    logger.info("Archived partition %s to %s", name, path)
+    return path
+
+
+def archive_cold_partitions(engine: Engine, keep_months: int, archive_dir: str,
+                            today: Optional[date] = None) -> List[str]:
+    """Archive every monthly partition that ended more than `keep_months` months ago."""
+    if keep_months < 1:
+        raise ValueError("keep_months must be at least 1")
+    today = today or datetime.now(timezone.utc).date()
+    cutoff = add_months(month_start(today), -keep_months)
+    archived = []
+    for table in PARTITIONED_TABLES:
+        with engine.connect() as conn:
+            if not is_partitioned(conn, table):
+                continue
+            attached = attached_partitions(conn, table)
+            leftovers = detached_partitions(conn, table)
+        for name in attached + leftovers:
+            parsed = parse_partition_name(name)
+            if parsed is None or parsed[1] >= cutoff:
+                continue  # the DEFAULT partition, or still hot
+            archived.append(archive_partition(engine, table, name, archive_dir, attached=name in attached))
+    return archived
+
+
+def ensure_partitions_locked(engine: Engine, months_ahead: int) -> List[str]:
+    """`ensure_partitions` unless another process is already maintaining partitions."""
+    with maintenance_lock(engine) as acquired:
+        if not acquired:
+            return []
+        return ensure_partitions(engine, months_ahead)
+
+
+async def run_partition_maintenance(engine: Engine, interval: float = 86400) -> None:
+    """Web worker background loop: keep future partitions created. Archiving is left to the CLI."""
+    while True:
+        try:
+            await asyncio.to_thread(ensure_partitions_locked, engine, settings.PARTITION_MONTHS_AHEAD)
+        except Exception as e:
+            logger.warning("Partition maintenance failed: %s", e)
+        await asyncio.sleep(interval)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create upcoming monthly partitions and archive cold ones.")
+    parser.add_argument("command", choices=["ensure", "archive"])
+    parser.add_argument("--months-ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD)
+    parser.add_argument("--keep-months", type=int, default=settings.PARTITION_ARCHIVE_AFTER_MONTHS or 12)
+    parser.add_argument("--archive-dir", default=settings.ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    from app.db.session import engine
+
+    with maintenance_lock(engine) as acquired:
+        if not acquired:
+            raise SystemExit("Another process is maintaining partitions; try again later")
+        if args.command == "ensure":
+            created = ensure_partitions(engine, args.months_ahead)
+            print(f"Created {len(created)} partitions: {', '.join(created) or '-'}")
+        else:
+            archived = archive_cold_partitions(engine, args.keep_months, args.archive_dir)
+            print(f"Archived {len(archived)} partitions: {', '.join(archived) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
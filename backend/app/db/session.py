@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, Session
 from typing import Generator
 import os
+from app.core.metrics import Gauge, instrument_engine, registry
 
 # Database URL - configurable via environment variable
 # Development: SQLite at ./sql_app.db
@@ -14,6 +15,21 @@ engine = create_engine(
 )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+instrument_engine(engine)
+
+
+def _pool_usage() -> dict:
+    pool = engine.pool
+    usage = {}
+    for state, method in (("checked_out", "checkedout"), ("idle", "checkedin"), ("overflow", "overflow"), ("size", "size")):
+        # Not every pool class (e.g. SQLite's) implements all of these
+        if hasattr(pool, method):
+            usage[(state,)] = getattr(pool, method)()
+    return usage
+
+
+registry.register(Gauge("taimako_db_pool_connections", "Connection pool usage by state", labelnames=("state",), callback=_pool_usage))
+
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
     try:
@@ -1,4 +1,7 @@
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
+from fastapi.responses import JSONResponse
 from fastapi.exceptions import HTTPException, RequestValidationError
 from app.api.routes import router
 
@@ -7,21 +10,59 @@ from app.api.routes import router as api_router
 from app.auth.router import router as auth_router
 from app.db.base import Base
 from app.db.session import engine
+from app.db.partitions import run_partition_maintenance
+from app.core.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, registry
+from app.core.tracing import TracingMiddleware, setup_tracing
+from app.core.logging_config import RequestIdMiddleware, setup_logging
+from app.core.upload_limits import UploadSizeLimitMiddleware
+from app.core.config import settings
+from app.services.readiness import readiness
+from app.services.session_stats import session_stats
+from app.services.message_log import message_log
+from app.services.extractors import extraction_pool
 from app.core.exception_handler import (
     http_exception_handler,
     validation_exception_handler,
     general_exception_handler
 )
 
+setup_logging()
+setup_tracing()
+
 # Create tables (if not using alembic, but we are. Keeping for dev convenience or removing if strictly alembic)
 # Base.metadata.create_all(bind=engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm-up runs in the background so /health answers while /ready reports progress
+    if settings.WARMUP_ENABLED:
+        readiness.start()
+    else:
+        readiness.skip()
+    # Messages a dead worker left in the write-ahead log go in before any are read
+    await asyncio.to_thread(message_log.recover)
+    message_log.start()
+    session_stats.start()
+    partition_maintenance = None
+    if engine.dialect.name == "postgresql":
+        partition_maintenance = asyncio.create_task(run_partition_maintenance(engine))
+    yield
+    if partition_maintenance is not None:
+        partition_maintenance.cancel()
+    await readiness.stop()
+    # Write the messages and statistics batched since the last flush before the worker exits
+    await message_log.stop()
+    await session_stats.stop()
+    # Cancel queued extractions and wait for the running ones so no worker process outlives us
+    await asyncio.to_thread(extraction_pool.shutdown)
+
 app = FastAPI(
     title="Agentic RAG API",
     description="API for Agentic RAG with Google OAuth2 and Multi-Agent Delegation.",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Register exception handlers
@@ -38,6 +79,14 @@ app.add_exception_handler(Exception, general_exception_handler)
 
 origins = ["http://localhost:3000", "http://localhost:8000"]
 
+# Inside CORS so rejected uploads still carry its headers
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    paths=["/documents/upload"],
+    # No single request can bring in more new data than a whole quota
+    max_bytes=min(settings.MAX_UPLOAD_REQUEST_BYTES, settings.STORAGE_QUOTA_BYTES),
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
@@ -46,6 +95,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added last = outermost: the request span covers CORS and every route, and the
+# request id is bound inside it so both logs and the span carry it
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+app.add_middleware(TracingMiddleware)
+
 app.include_router(api_router)
 app.include_router(auth_router)
 
@@ -68,3 +123,11 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/ready")
+async def readiness_check():
+    return JSONResponse(readiness.snapshot(), status_code=200 if readiness.ready else 503)
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=registry.render(), media_type=CONTENT_TYPE_LATEST)
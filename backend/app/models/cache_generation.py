@@ -0,0 +1,13 @@
+from sqlalchemy import Column, String, Integer, DateTime
+from datetime import datetime, timezone
+from app.db.base import Base
+
+
+class CacheGeneration(Base):
+    """A counter bumped whenever data cached by the workers under (scope, key) goes stale."""
+    __tablename__ = "cache_generations"
+
+    scope = Column(String, primary_key=True)  # e.g. "response_cache", "keyword_index"
+    key = Column(String, primary_key=True)  # usually the business owner's user id
+    generation = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
@@ -1,5 +1,5 @@
 import uuid
-from sqlalchemy import Column, String, DateTime, ForeignKey, Enum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Enum, BigInteger
 from sqlalchemy.dialects.postgresql import UUID
 from datetime import datetime, timezone
 from app.db.base import Base
@@ -14,6 +14,8 @@ class Document(Base):
     user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
     filename = Column(String, nullable=False)
     file_path = Column(String, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True) # SHA-256 of the stored file
+    size_bytes = Column(BigInteger, nullable=True) # Counted against the tenant's storage quota
     status = Column(String, default="pending") # pending, processed, error
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     error_message = Column(String, nullable=True)
@@ -27,7 +27,10 @@ class WidgetSettings(Base):
     whatsapp_number = Column(String, nullable=True)
     
     # Limits & Security
-    max_messages_per_session = Column(Integer, default=50) # Default limit to prevent abuse
+    # Default limit to prevent abuse. Soft limit: checked against counts flushed by
+    # session_stats plus this worker's unflushed turns, so turns other workers answered within
+    # the last SESSION_STATS_FLUSH_SECONDS (or still in flight) can take a session a few past it.
+    max_messages_per_session = Column(Integer, default=50)
     max_sessions_per_day = Column(Integer, default=5) # Default limit per user per day
     whitelisted_domains = Column(JSON, nullable=True) # List of allowed domains (CORS/Origin check)
     
@@ -65,7 +68,9 @@ class GuestMessage(Base):
 
     id = Column(String, primary_key=True, default=generate_uuid)
     guest_id = Column(String, ForeignKey("guest_users.id"), nullable=False)
-    # Make nullable for backward compatibility / migration, but logic should enforce it for new messages
+    # Make nullable for backward compatibility / migration, but logic should enforce it for new messages.
+    # On Postgres both tables are partitioned by created_at (primary keys become (id, created_at)),
+    # so this foreign key exists only in SQLite; the ORM still uses it for joins.
     session_id = Column(String, ForeignKey("chat_sessions.id"), nullable=True) 
     sender = Column(String, nullable=False) # "guest" or "ai"
     message_text = Column(Text, nullable=False)
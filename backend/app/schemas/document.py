@@ -16,6 +16,8 @@ class IngestResponse(BaseModel):
     filename: str
     chunks_created: int
     status: str
+    chunks_unchanged: int = 0
+    chunks_deleted: int = 0
 
 class DocumentResponse(BaseModel):
     id: str
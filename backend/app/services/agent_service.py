@@ -1,7 +1,11 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
 try:
     from app.services.rag_service import rag_service
 except ImportError:
-    print("Warning: RAG Service dependencies missing. Using Mock RAG Service.")
+    logger.warning("RAG Service dependencies missing. Using Mock RAG Service.")
     class MockRAGService:
         def query(self, text, user_id):
             return [f"Mock context for: {text}"]
@@ -13,30 +17,37 @@ USER_ID = "test_user"
 SESSION_ID = "test_session"
 
 import os
+import time
 import asyncio
-from google.adk.runners import Runner
-from google.genai import types 
-import logging
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 # Import from new modular structure
-from app.services.agent_system.service import session_service, init_session
+from app.services.agent_system.service import get_session_service, init_session, session_started
 from app.services.agent_system.agent_factory import AgentFactory
+from app.services.agent_system.intent_router import intent_router
+from app.services.agent_system.response_cache import response_cache
+from app.services.agent_system.llm_scheduler import LLMOverloaded, llm_scheduler
+from app.services.agent_system.circuit_breaker import CircuitOpen, circuit_breakers
+from app.core.config import settings
+from app.core.tracing import tracer
+from app.core.metrics import conversations, response_cache_lookups
+
+if TYPE_CHECKING:
+    from google.adk.runners import Runner
 
 import warnings
 warnings.filterwarnings("ignore")
 
-logging.basicConfig(level=logging.ERROR)
-
 
-print("Libraries imported.")
 # print(f"Google API Key set: {'Yes' if os.environ.get('GOOGLE_API_KEY') and os.environ['GOOGLE_API_KEY'] != 'YOUR_GOOGLE_API_KEY' else 'No (REPLACE PLACEHOLDER!)'}")
 
 
 
-async def call_agent_async(query: str, runner: Runner, user_id: str, session_id: str):
+async def call_agent_async(query: str, runner: "Runner", user_id: str, session_id: str):
     """Sends a query to the agent and prints the final response."""
-    print(f"\n>>> User Query: {query} (User: {user_id})")
+    from google.genai import types
+
+    logger.debug("Agent query", extra={"query": query, "user_id": user_id})
 
     content = types.Content(role='user', parts=[types.Part(text=query)])
     final_response_text = "Agent did not produce a final response." 
@@ -50,10 +61,11 @@ async def call_agent_async(query: str, runner: Runner, user_id: str, session_id:
                 final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
             break 
 
-    print(f"<<< Agent Response: {final_response_text}")
+    logger.debug("Agent response", extra={"response": final_response_text, "user_id": user_id})
     return final_response_text
 
 
+@tracer.start_as_current_span("agent.run_conversation")
 async def run_conversation(
     message: str,
     user_id: str = USER_ID,
@@ -82,27 +94,120 @@ async def run_conversation(
     if session_id is None:
         session_id = user_id
     
-    # Create agent dynamically based on business configuration
-    agent = AgentFactory.create_rag_agent(business_name, custom_instruction, intents=intents, api_key=api_key)
+    # Trivial greetings/farewells are answered locally - no agent build, no LLM call.
+    # Uncertain messages fall through to the full agent (which still has the sub-agents).
+    if settings.INTENT_ROUTER_ENABLED:
+        with tracer.start_as_current_span("agent.intent_router"):
+            canned_response = await intent_router.respond_async(message)
+        if canned_response is not None:
+            logger.debug("Pre-routed response", extra={"response": canned_response})
+            conversations.inc(path="intent_router")
+            return canned_response
+    
+    # Paraphrases of questions this business has already answered reuse the stored answer.
+    # Only opening messages: a later answer depends on the conversation so far.
+    cache_generation = None
+    if settings.SEMANTIC_CACHE_ENABLED:
+        cached_response = None
+        try:
+            with tracer.start_as_current_span("agent.cache_lookup"):
+                if not await session_started(business_name, user_id, session_id):
+                    # Embedding and the generation check block, keep them off the event loop
+                    cache_generation = await asyncio.to_thread(response_cache.generation, user_id)
+                    cached_response = await asyncio.to_thread(response_cache.lookup, user_id, message, cache_generation)
+        except Exception as e:
+            logger.warning("Response cache lookup failed: %s", e)
+            response_cache_lookups.inc(result="error")
+            cache_generation = cached_response = None
+        else:
+            if cache_generation is not None:
+                response_cache_lookups.inc(result="hit" if cached_response is not None else "miss")
+        if cached_response is not None:
+            logger.debug("Cached response", extra={"response": cached_response})
+            conversations.inc(path="cache")
+            return cached_response
+    
+    started_at = time.perf_counter()
     
-    # Create runner with dynamic agent
-    runner = Runner(
-        agent=agent,
-        app_name=business_name,
-        session_service=session_service
-    )
+    # Deferred so workers boot (and serve /health) without loading google.adk
+    from google.adk.runners import Runner
+    from app.services.agent_system.callbacks import record_llm_failure
+
+    # A business whose provider keeps failing is answered at once while its breaker is open
+    breaker = circuit_breakers.for_business(user_id)
+    probe = False
+    if breaker is not None:
+        try:
+            probe = breaker.before_call()
+        except CircuitOpen:
+            conversations.inc(path="circuit_open")
+            raise
+
+    try:
+        # Every LLM call of this turn shares one queueing deadline; a key whose queue cannot
+        # start the turn in time is refused before the agent is built or the session touched
+        with llm_scheduler.turn():
+            if api_key:
+                try:
+                    llm_scheduler.admit(api_key)
+                except LLMOverloaded:
+                    conversations.inc(path="overloaded")
+                    raise
+
+            # Create agent dynamically based on business configuration
+            with tracer.start_as_current_span("agent.build"):
+                agent = AgentFactory.create_rag_agent(business_name, custom_instruction, intents=intents, api_key=api_key)
+            
+                # Create runner with dynamic agent
+                runner = Runner(
+                    agent=agent,
+                    app_name=business_name,
+                    session_service=get_session_service()
+                )
+        
+            # Initialize session with user_id in state
+            initial_state = {
+                "response_style": "concise",
+                "user_id": user_id  # Store user_id for tools to access
+            }
+            with tracer.start_as_current_span("agent.session_init"):
+                await init_session(business_name, user_id, session_id, initial_state)
+        
+            # LLM round trips and the get_context tool call appear as ADK child spans
+            with tracer.start_as_current_span("agent.run"):
+                try:
+                    response_text = await call_agent_async(
+                        message,
+                        runner=runner,
+                        user_id=user_id,
+                        session_id=session_id
+                    )
+                except LLMOverloaded:
+                    conversations.inc(path="overloaded")
+                    raise
+                except Exception:
+                    conversations.inc(path="error")
+                    record_llm_failure(user_id)
+                    if breaker is not None:
+                        breaker.record_failure()
+                    raise
+        if breaker is not None:
+            breaker.record_success()
+    finally:
+        # Turns that ended without a verdict (overloaded, cancelled) free the half-open probe
+        if probe:
+            breaker.release()
+    conversations.inc(path="agent")
     
-    # Initialize session with user_id in state
-    initial_state = {
-        "response_style": "concise",
-        "user_id": user_id  # Store user_id for tools to access
-    }
-    await init_session(business_name, user_id, session_id, initial_state)
+    if cache_generation is not None:
+        try:
+            with tracer.start_as_current_span("agent.cache_store"):
+                await asyncio.to_thread(
+                    response_cache.store, user_id, message, response_text,
+                    time.perf_counter() - started_at, cache_generation,
+                )
+        except Exception as e:
+            logger.warning("Response cache store failed: %s", e)
     
-    return await call_agent_async(
-        message,
-        runner=runner,
-        user_id=user_id,
-        session_id=session_id
-    )
+    return response_text
 
@@ -1,9 +1,10 @@
-from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm 
-from app.services.agent_system.tools import get_context, say_hello, say_goodbye
-from app.services.agent_system.callbacks import block_unsafe_content, validate_tool_args
+from app.core.config import settings
 from typing import Optional
 
+# google.adk / litellm (and the tools and callbacks built on them) are imported inside the
+# factory methods: they take seconds to import and are only needed once a chat turn
+# actually reaches the agent.
+
 # Default detailed instruction used when a business does not provide a custom one.
 # This follows best practices: be friendly, professional, concise, and reference the business name.
 DEFAULT_AGENT_INSTRUCTION = (
@@ -24,33 +25,49 @@ class AgentFactory:
     @staticmethod
     def _get_model(api_key: Optional[str] = None):
         """Get the appropriate model, with API key if provided."""
+        from app.services.agent_system.scheduled_model import ScheduledLiteLlm
+
+        if api_key and settings.LLM_API_BASE:
+            return ScheduledLiteLlm(model=settings.LLM_MODEL, api_key=api_key, api_base=settings.LLM_API_BASE)
         if api_key:
             model_name = MODEL_GEMINI_2_0_FLASH
             if not model_name.startswith("gemini/"):
                 model_name = f"gemini/{model_name}"
-            return LiteLlm(model=model_name, api_key=api_key)
+            return ScheduledLiteLlm(model=model_name, api_key=api_key)
         return MODEL_GEMINI_2_0_FLASH
     
     @staticmethod
     def create_greeting_agent(api_key: Optional[str] = None):
         """Create the greeting sub-agent."""
+        from google.adk.agents import Agent
+        from app.services.agent_system.tools import say_hello
+        from app.services.agent_system.callbacks import track_llm_call_start, record_llm_usage
+
         return Agent(
             name="greeting_agent",
             model=AgentFactory._get_model(api_key),
             description="Handles simple greetings.",
             instruction="You are a friendly greeting agent. Use 'say_hello' to greet the user.",
-            tools=[say_hello]
+            tools=[say_hello],
+            before_model_callback=track_llm_call_start,
+            after_model_callback=record_llm_usage
         )
     
     @staticmethod
     def create_farewell_agent(api_key: Optional[str] = None):
         """Create the farewell sub-agent."""
+        from google.adk.agents import Agent
+        from app.services.agent_system.tools import say_goodbye
+        from app.services.agent_system.callbacks import track_llm_call_start, record_llm_usage
+
         return Agent(
             name="farewell_agent",
             model=AgentFactory._get_model(api_key),
             description="Handles simple farewells.",
             instruction="You are a polite farewell agent. Use 'say_goodbye' to say goodbye.",
-            tools=[say_goodbye]
+            tools=[say_goodbye],
+            before_model_callback=track_llm_call_start,
+            after_model_callback=record_llm_usage
         )
     
     @staticmethod
@@ -66,6 +83,12 @@ class AgentFactory:
         Returns:
             Configured Agent instance
         """
+        from google.adk.agents import Agent
+        from app.services.agent_system.tools import get_context
+        from app.services.agent_system.callbacks import (
+            block_unsafe_content, validate_tool_args, track_llm_call_start, record_llm_usage
+        )
+
         # Build the instruction with business context
         base_instruction = f"You are a helpful customer support assistant for {business_name}. "
         
@@ -102,6 +125,8 @@ class AgentFactory:
             tools=[get_context],
             sub_agents=[greeting_agent, farewell_agent],
             output_key="last_agent_response",
-            before_model_callback=block_unsafe_content,
+            # Metrics start only once the safety check lets the call through
+            before_model_callback=[block_unsafe_content, track_llm_call_start],
+            after_model_callback=record_llm_usage,
             before_tool_callback=validate_tool_args
         )
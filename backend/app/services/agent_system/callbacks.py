@@ -1,17 +1,26 @@
-from typing import Optional, Dict, Any
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional, Dict, Any, Tuple
 from google.adk.agents.callback_context import CallbackContext
 from google.adk.models.llm_request import LlmRequest
 from google.adk.models.llm_response import LlmResponse
 from google.adk.tools.base_tool import BaseTool
 from google.adk.tools.tool_context import ToolContext
 from google.genai import types 
+from app.core.metrics import record_llm_call
+
+logger = logging.getLogger(__name__)
+
+# (start time, model) of the LLM call in flight; ADK makes a turn's calls one at a time
+_llm_call: ContextVar[Optional[Tuple[float, str]]] = ContextVar("llm_call", default=None)
 
 def block_unsafe_content(
     callback_context: CallbackContext, llm_request: LlmRequest
 ) -> Optional[LlmResponse]:
     """Blocks requests containing the keyword 'BLOCK'."""
     agent_name = callback_context.agent_name
-    print(f"--- Callback: block_unsafe_content running for agent: {agent_name} ---")
+    logger.debug("block_unsafe_content running for agent %s", agent_name)
 
     last_user_message_text = ""
     if llm_request.contents:
@@ -22,7 +31,7 @@ def block_unsafe_content(
                     break
 
     if "BLOCK" in last_user_message_text.upper():
-        print(f"--- Callback: Found 'BLOCK'. Blocking LLM call! ---")
+        logger.info("Blocked LLM call for agent %s: unsafe content", agent_name)
         return LlmResponse(
             content=types.Content(
                 role="model",
@@ -35,7 +44,7 @@ def validate_tool_args(
     tool: BaseTool, args: Dict[str, Any], tool_context: ToolContext
 ) -> Optional[Dict]:
     """Validates tool arguments."""
-    print(f"--- Callback: validate_tool_args running for tool '{tool.name}' ---")
+    logger.debug("validate_tool_args running for tool %s", tool.name)
     # Example: Prevent empty user_input for get_context
     if tool.name == "get_context":
         user_input = args.get("user_input", "")
@@ -45,3 +54,43 @@ def validate_tool_args(
                 "error_message": "Input cannot be empty."
             }
     return None
+
+def track_llm_call_start(
+    callback_context: CallbackContext, llm_request: LlmRequest
+) -> Optional[LlmResponse]:
+    """Marks the start of an LLM call for latency/usage metrics. Never alters the request."""
+    _llm_call.set((time.perf_counter(), llm_request.model or "unknown"))
+    return None
+
+def record_llm_usage(
+    callback_context: CallbackContext, llm_response: LlmResponse
+) -> Optional[LlmResponse]:
+    """Records latency, tokens and outcome of the finished LLM call."""
+    started = _llm_call.get()
+    if started is None or llm_response.partial:
+        return None
+    _llm_call.set(None)
+    started_at, model = started
+    usage = llm_response.usage_metadata
+    record_llm_call(
+        business=callback_context.state.get("user_id"),
+        model=model,
+        operation="chat",
+        seconds=time.perf_counter() - started_at,
+        outcome="error" if llm_response.error_code else "success",
+        prompt_tokens=usage.prompt_token_count if usage else None,
+        completion_tokens=usage.candidates_token_count if usage else None,
+    )
+    return None
+
+def record_llm_failure(business: Optional[str]) -> None:
+    """Records the in-flight LLM call as failed when the turn raised before it returned.
+
+    Failures elsewhere (tools, session store) leave no call in flight and are not counted.
+    """
+    started = _llm_call.get()
+    if started is None:
+        return
+    _llm_call.set(None)
+    started_at, model = started
+    record_llm_call(business=business, model=model, operation="chat", seconds=time.perf_counter() - started_at, outcome="error")
@@ -0,0 +1,117 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, registry
+
+logger = logging.getLogger(__name__)
+
+# --- Circuit Breaker ---
+# One breaker per business. After `failure_threshold` consecutive failed agent turns the
+# breaker opens and turns fail fast (no agent build, no provider call) for `reset_timeout`
+# seconds; then a single probe turn is let through (half-open) and its outcome closes or
+# re-opens the breaker. Intent-router and cached answers never consult it.
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+breaker_transitions = registry.register(Counter(
+    "taimako_circuit_breaker_transitions_total", "Circuit breaker state changes by the state entered",
+    labelnames=("state",),
+))
+
+
+class CircuitOpen(Exception):
+    """The business's breaker is open; the turn was not attempted."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Circuit open, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def _enter(self, state: str) -> None:
+        if state != self.state:
+            self.state = state
+            breaker_transitions.inc(state=state)
+
+    def before_call(self) -> bool:
+        """Raise CircuitOpen unless a turn may be attempted now; True if it is the half-open probe."""
+        with self._lock:
+            if self.state == CLOSED:
+                return False
+            remaining = self.opened_at + self.reset_timeout - self.clock()
+            if self.state == OPEN and remaining <= 0:
+                self._enter(HALF_OPEN)
+            if self.state == HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            raise CircuitOpen(max(remaining, 1.0))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self._probe_in_flight = False
+            self._enter(CLOSED)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._probe_in_flight = False
+                self.opened_at = self.clock()
+                self._enter(OPEN)
+
+    def release(self) -> None:
+        """The probe ended without a verdict on the provider (e.g. it was cancelled)."""
+        with self._lock:
+            self._probe_in_flight = False
+
+
+class CircuitBreakerRegistry:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, enabled: bool = True):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.enabled = enabled
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def for_business(self, business_id: str) -> Optional[CircuitBreaker]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            breaker = self._breakers.get(business_id)
+            if breaker is None:
+                breaker = self._breakers[business_id] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return breaker
+
+    def states(self) -> Dict[Tuple[str, ...], int]:
+        with self._lock:
+            return {(business_id,): _STATE_VALUES[b.state] for business_id, b in self._breakers.items()}
+
+
+circuit_breakers = CircuitBreakerRegistry(
+    failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.CIRCUIT_BREAKER_RESET_SECONDS,
+    enabled=settings.CIRCUIT_BREAKER_ENABLED,
+)
+
+registry.register(Gauge(
+    "taimako_circuit_breaker_state", "Per-business agent circuit breaker (0 closed, 1 half-open, 2 open)",
+    labelnames=("business",), callback=circuit_breakers.states,
+))
@@ -0,0 +1,18 @@
+from typing import Optional
+
+def say_hello(name: Optional[str] = None) -> str:
+    """Provides a simple greeting.
+
+    Args:
+        name (str, optional): The name of the person to greet.
+
+    Returns:
+        str: A friendly greeting message.
+    """
+    if name:
+        return f"Hello, {name}! How can I help you today?"
+    return "Hello! How can I assist you with your questions?"
+
+def say_goodbye() -> str:
+    """Provides a simple farewell message."""
+    return "Goodbye! Have a great day."
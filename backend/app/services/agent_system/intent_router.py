@@ -0,0 +1,186 @@
+import asyncio
+import logging
+import re
+import time
+from typing import Callable, Dict, List, Optional
+from app.services.agent_system.greetings import say_hello, say_goodbye
+from app.utils.similarity import cosine_similarity
+
+logger = logging.getLogger(__name__)
+
+# --- Local Intent Pre-Router ---
+# Answers trivial greetings/farewells without an LLM round trip.
+# Anything that is not clearly small talk falls through to the full agent.
+
+GREETING = "greeting"
+FAREWELL = "farewell"
+
+PHRASE_BANK: Dict[str, List[str]] = {
+    GREETING: [
+        "hi", "hello", "hey", "hey there", "hi there", "hello there", "hiya", "howdy",
+        "good morning", "good afternoon", "good evening", "greetings", "yo", "sup",
+    ],
+    FAREWELL: [
+        "bye", "goodbye", "bye bye", "see you", "see you later", "see ya", "later",
+        "good night", "take care", "thanks bye", "thank you bye", "ok bye", "cheers bye",
+        "have a nice day", "have a good day", "talk to you later",
+    ],
+}
+
+# At least one of these must appear for a keyword match
+ANCHOR_WORDS: Dict[str, set] = {
+    GREETING: {"hi", "hello", "hey", "hiya", "howdy", "greetings", "morning", "afternoon", "evening", "yo", "sup"},
+    FAREWELL: {"bye", "goodbye", "later", "night", "care", "ya"},
+}
+
+# Filler tokens that may accompany a greeting/farewell without changing its intent
+_FILLER_WORDS = {"there", "all", "team", "everyone", "folks", "again", "then", "now", "ok", "okay", "so", "and"}
+
+# Only very short messages are considered; longer ones almost always carry a question
+MAX_ROUTABLE_WORDS = 5
+# Minimum cosine similarity to the phrase bank for the embedding fallback
+EMBEDDING_THRESHOLD = 0.85
+# Required gap between the best and the runner-up intent to avoid ambiguous routing
+EMBEDDING_MARGIN = 0.05
+
+# After the embedding model fails, skip the fallback for this long (doubling per failure)
+EMBEDDING_RETRY_SECONDS = 30.0
+EMBEDDING_RETRY_MAX_SECONDS = 600.0
+
+# Words, numbers and punctuation-bearing tokens ("4411", "sku-9", "a@b.com") are kept whole
+_TOKEN_RE = re.compile(r"[\w']+(?:[-./@:+#][\w']+)*")
+
+_RESPONDERS: Dict[str, Callable[[], str]] = {
+    GREETING: say_hello,
+    FAREWELL: say_goodbye,
+}
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class IntentRouter:
+    """Keyword + embedding similarity classifier over a small phrase bank."""
+
+    def __init__(self, embed_fn: Optional[Callable[[List[str]], List[List[float]]]] = None):
+        self.embed_fn = embed_fn
+        self._phrases = {intent: {" ".join(_tokens(p)) for p in phrases} for intent, phrases in PHRASE_BANK.items()}
+        self._vocab = {intent: {t for p in phrases for t in _tokens(p)} for intent, phrases in PHRASE_BANK.items()}
+        self._known_words = set().union(*self._vocab.values(), _FILLER_WORDS)
+        self._bank_embeddings: Optional[Dict[str, List[List[float]]]] = None
+        self._embedding_retry_at = 0.0
+        self._embedding_backoff = EMBEDDING_RETRY_SECONDS
+
+    def _keyword_match(self, tokens: List[str]) -> Optional[str]:
+        normalized = " ".join(tokens)
+        for intent, phrases in self._phrases.items():
+            if normalized in phrases:
+                return intent
+
+        # Loose form ("hello hello", "ok bye then"): every token belongs to one intent's
+        # vocabulary, and the message carries that intent's anchor but not the other's.
+        content = [t for t in tokens if t not in _FILLER_WORDS]
+        matches = [
+            intent for intent, vocab in self._vocab.items()
+            if content and all(t in vocab for t in content) and ANCHOR_WORDS[intent] & set(content)
+        ]
+        if len(matches) == 1:
+            others = set().union(*(a for i, a in ANCHOR_WORDS.items() if i != matches[0]))
+            if not others & set(content):
+                return matches[0]
+        return None
+
+    def warm_up(self) -> None:
+        """Embed the phrase bank now instead of on the first ambiguous message."""
+        if self.embed_fn is not None and self._bank_embeddings is None:
+            self._bank_embeddings = {intent: self.embed_fn(phrases) for intent, phrases in PHRASE_BANK.items()}
+
+    def _embedding_match(self, text: str) -> Optional[str]:
+        if self.embed_fn is None:
+            return None
+
+        self.warm_up()
+        query = self.embed_fn([text])[0]
+        scores = sorted(
+            ((max(cosine_similarity(query, e) for e in embeddings), intent)
+             for intent, embeddings in self._bank_embeddings.items()),
+            reverse=True
+        )
+        best_score, best_intent = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        if best_score >= EMBEDDING_THRESHOLD and best_score - runner_up >= EMBEDDING_MARGIN:
+            return best_intent
+        return None
+
+    def classify(self, message: str) -> Optional[str]:
+        """
+        Classify a message as a trivial greeting/farewell.
+
+        Returns:
+            GREETING, FAREWELL, or None when the message should go to the full agent
+        """
+        tokens = self._routable_tokens(message)
+        if tokens is None:
+            return None
+        return self._keyword_match(tokens) or self._fallback_match(tokens)
+
+    async def classify_async(self, message: str) -> Optional[str]:
+        """`classify` for the event loop: the embedding fallback runs in a worker thread."""
+        tokens = self._routable_tokens(message)
+        if tokens is None:
+            return None
+        return self._keyword_match(tokens) or await asyncio.to_thread(self._fallback_match, tokens)
+
+    def _routable_tokens(self, message: str) -> Optional[List[str]]:
+        """The message's tokens, or None when it may carry more than small talk.
+
+        Every token must come from the phrase bank ("hi 12345" or "hello order 4411" go to
+        the agent); the one exception is a single unknown word ("hullo", "heyyy"), which the
+        embedding fallback compares with the bank.
+        """
+        tokens = _tokens(message)
+        if not tokens or len(tokens) > MAX_ROUTABLE_WORDS or "?" in message:
+            return None
+        unknown = [t for t in tokens if t not in self._known_words]
+        if unknown and (len(tokens) > 1 or not unknown[0].isalpha()):
+            return None
+        return tokens
+
+    def _fallback_match(self, tokens: List[str]) -> Optional[str]:
+        if time.monotonic() < self._embedding_retry_at:
+            return None
+        try:
+            intent = self._embedding_match(" ".join(tokens))
+        except Exception as e:
+            # Embeddings are a best-effort fallback; never block the chat on them, and don't
+            # reload a broken model on every short message either
+            self._embedding_retry_at = time.monotonic() + self._embedding_backoff
+            logger.warning("Intent router embedding fallback failed, skipping it for %.0fs: %s",
+                           self._embedding_backoff, e)
+            self._embedding_backoff = min(self._embedding_backoff * 2, EMBEDDING_RETRY_MAX_SECONDS)
+            return None
+        self._embedding_backoff = EMBEDDING_RETRY_SECONDS
+        return intent
+
+    def respond(self, message: str) -> Optional[str]:
+        """Return a canned response for trivial messages, or None to fall through."""
+        intent = self.classify(message)
+        if intent is None:
+            return None
+        return _RESPONDERS[intent]()
+
+    async def respond_async(self, message: str) -> Optional[str]:
+        """`respond` for the event loop (see `classify_async`)."""
+        intent = await self.classify_async(message)
+        if intent is None:
+            return None
+        return _RESPONDERS[intent]()
+
+
+def _default_embed_fn(texts: List[str]) -> List[List[float]]:
+    from app.services.vector_db import get_vector_db
+    return get_vector_db().embed(texts)
+
+
+intent_router = IntentRouter(embed_fn=_default_embed_fn)
@@ -0,0 +1,237 @@
+import asyncio
+import hashlib
+import logging
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.metrics import Gauge, llm_queue_wait, llm_scheduler_events, registry
+
+logger = logging.getLogger(__name__)
+
+# --- LLM Scheduler ---
+# Every business brings its own provider key, and each key has its own provider quota, so
+# LLM calls are scheduled per key: at most `limit` in flight, the rest wait FIFO. A turn
+# is refused up front when the queue ahead of it cannot drain before its deadline, so a
+# spike on one widget gets a fast "busy" answer instead of piling up provider 429s.
+# After a 429 the key cools down (no new calls start) and its limit is halved; successes
+# grow it back towards the configured cap (AIMD), settling at what the quota sustains.
+
+
+class LLMOverloaded(Exception):
+    """This API key's queue cannot start the call before the turn's deadline."""
+
+
+# Monotonic time by which every LLM call of the current chat turn must have started
+_turn_deadline: ContextVar[Optional[float]] = ContextVar("llm_turn_deadline", default=None)
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    """Provider quota errors: litellm.RateLimitError, google.genai ClientError(429), ..."""
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    return status == 429 or type(exc).__name__ == "RateLimitError"
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Transient failures worth another attempt: rate limits, timeouts, dropped connections, 5xx."""
+    if is_rate_limited(exc) or isinstance(exc, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+        return True
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    if isinstance(status, int) and 500 <= status < 600:
+        return True
+    return type(exc).__name__ in ("APIConnectionError", "ServiceUnavailableError", "InternalServerError", "Timeout")
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class SlotOutcome:
+    """Handed to the holder of a slot to report a provider rate limit."""
+
+    def __init__(self):
+        self.cooldown: Optional[float] = None
+
+    def rate_limited(self, cooldown: float) -> None:
+        self.cooldown = cooldown
+
+
+class KeyScheduler:
+    """Concurrency cap, FIFO queue and cooldown for one API key (single event loop)."""
+
+    def __init__(self, max_concurrency: int, clock=time.monotonic):
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.active = 0
+        self.cooldown_until = 0.0
+        # Moving average of how long a call holds its slot, for admission estimates
+        self.avg_call_seconds = 1.0
+        self.clock = clock
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._wake_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def capacity(self) -> int:
+        return max(1, int(self.limit))
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for waiter in self._waiters if not waiter.done())
+
+    def _can_start(self, now: float) -> bool:
+        return self.active < self.capacity and not self._waiters and now >= self.cooldown_until
+
+    def estimated_wait(self) -> float:
+        now = self.clock()
+        if self._can_start(now):
+            return 0.0
+        # Everyone queued plus this call drains `capacity` at a time
+        return max(0.0, self.cooldown_until - now) + (self.queued + 1) / self.capacity * self.avg_call_seconds
+
+    async def acquire(self, deadline: float) -> float:
+        """Wait for a slot and return the seconds waited. Raises LLMOverloaded."""
+        started = self.clock()
+        if self._can_start(started):
+            self.active += 1
+            return 0.0
+        if self.estimated_wait() > deadline - started:
+            llm_scheduler_events.inc(event="rejected")
+            raise LLMOverloaded("LLM queue for this API key is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._wake()
+        try:
+            await asyncio.wait_for(waiter, timeout=max(0.0, deadline - started))
+        except asyncio.TimeoutError:
+            llm_scheduler_events.inc(event="timed_out")
+            raise LLMOverloaded("Timed out waiting for an LLM slot") from None
+        except asyncio.CancelledError:
+            # Granted just before the caller went away: hand the slot on
+            if waiter.done() and not waiter.cancelled():
+                self.release(0.0)
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+        return self.clock() - started
+
+    def release(self, held_seconds: float, cooldown: Optional[float] = None) -> None:
+        self.active -= 1
+        if cooldown is not None:
+            self.limit = max(1.0, self.limit / 2)
+            self.cooldown_until = max(self.cooldown_until, self.clock() + cooldown)
+        else:
+            self.avg_call_seconds = 0.8 * self.avg_call_seconds + 0.2 * held_seconds
+            # +1 per `limit` successes, i.e. roughly one more slot per round of calls
+            self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def _wake(self) -> None:
+        now = self.clock()
+        if now < self.cooldown_until:
+            # Nothing else releases the queue when the cooldown ends with no call in flight
+            if self._waiters and self._wake_handle is None:
+                self._wake_handle = asyncio.get_running_loop().call_later(self.cooldown_until - now, self._on_cooldown_end)
+            return
+        while self._waiters and self.active < self.capacity:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.active += 1
+            waiter.set_result(None)
+
+    def _on_cooldown_end(self) -> None:
+        self._wake_handle = None
+        self._wake()
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int = 8, queue_timeout: float = 20.0, call_timeout: float = 30.0,
+                 max_retries: int = 3, backoff_base: float = 0.5, backoff_max: float = 8.0):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self.call_timeout = call_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._keys: Dict[str, KeyScheduler] = {}
+
+    def for_key(self, api_key: str) -> KeyScheduler:
+        # Keyed by a fingerprint so raw provider keys never sit in scheduler state or logs
+        fingerprint = hashlib.sha256((api_key or "").encode()).hexdigest()[:16]
+        scheduler = self._keys.get(fingerprint)
+        if scheduler is None:
+            scheduler = self._keys[fingerprint] = KeyScheduler(self.max_concurrency)
+        return scheduler
+
+    def _deadline(self) -> float:
+        deadline = _turn_deadline.get()
+        return deadline if deadline is not None else time.monotonic() + self.queue_timeout
+
+    @contextmanager
+    def turn(self):
+        """Give every LLM call made inside the block one shared queueing deadline."""
+        token = _turn_deadline.set(time.monotonic() + self.queue_timeout)
+        try:
+            yield
+        finally:
+            _turn_deadline.reset(token)
+
+    def admit(self, api_key: str) -> None:
+        """Refuse a turn before any work is done if its key's queue cannot start it in time."""
+        if self.for_key(api_key).estimated_wait() > self._deadline() - time.monotonic():
+            llm_scheduler_events.inc(event="rejected")
+            raise LLMOverloaded("LLM queue for this API key is full")
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max)
+        # Equal jitter: at least half the exponential step, so retries from many turns spread out
+        step = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+        return step / 2 + random.uniform(0, step / 2)
+
+    @asynccontextmanager
+    async def slot(self, api_key: str):
+        scheduler = self.for_key(api_key)
+        waited = await scheduler.acquire(self._deadline())
+        llm_queue_wait.observe(waited)
+        outcome = SlotOutcome()
+        started = time.monotonic()
+        try:
+            yield outcome
+        finally:
+            scheduler.release(time.monotonic() - started, outcome.cooldown)
+            if outcome.cooldown is not None:
+                llm_scheduler_events.inc(event="rate_limited")
+                logger.warning("LLM provider rate limit hit; key cooling down for %.1fs", outcome.cooldown)
+
+    def usage(self) -> Dict[Tuple[str, ...], int]:
+        schedulers = list(self._keys.values())
+        return {
+            ("active",): sum(s.active for s in schedulers),
+            ("queued",): sum(s.queued for s in schedulers),
+        }
+
+
+llm_scheduler = LLMScheduler(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY_PER_KEY,
+    queue_timeout=settings.LLM_QUEUE_TIMEOUT_SECONDS,
+    call_timeout=settings.LLM_CALL_TIMEOUT_SECONDS,
+    max_retries=settings.LLM_MAX_RETRIES,
+    backoff_base=settings.LLM_BACKOFF_BASE_SECONDS,
+    backoff_max=settings.LLM_BACKOFF_MAX_SECONDS,
+)
+
+registry.register(Gauge(
+    "taimako_llm_slots", "LLM calls in flight or queued, across all API keys",
+    labelnames=("state",), callback=llm_scheduler.usage,
+))
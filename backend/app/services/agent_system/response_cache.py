@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+from app.utils.similarity import cosine_similarity
+
+if TYPE_CHECKING:
+    from app.services.cache_generations import CacheGenerations
+
+logger = logging.getLogger(__name__)
+
+# --- Semantic Response Cache ---
+# Per-business cache of agent answers keyed by question embedding.
+# A new question whose embedding is close enough to a past one reuses its answer,
+# skipping the full agent loop (model call + retrieval + model call).
+# Each worker has its own entries; invalidation reaches the other workers through a
+# per-business generation counter in the database (see cache_generations), and entries
+# built under an older generation are dropped on the next lookup. Only a conversation's
+# opening message is looked up or stored: later answers depend on the session's history.
+
+# Minimum cosine similarity for two questions to be treated as the same question
+SIMILARITY_THRESHOLD = 0.92
+# Entries kept per business (oldest evicted first)
+MAX_ENTRIES_PER_TENANT = 256
+# Entries older than this are ignored and evicted lazily
+ENTRY_TTL_SECONDS = 24 * 60 * 60
+# Very short messages ("and that?", "why") depend on conversation context; never cache them
+MIN_QUESTION_WORDS = 3
+# Embeddings memoised per question text, so lookup + store embed once
+_EMBEDDING_MEMO_SIZE = 1024
+# cache_generations scope of the per-business invalidation counter
+GENERATION_SCOPE = "response_cache"
+
+# Agent fallbacks that must not be served from cache
+_UNCACHEABLE_PREFIXES = ("Agent did not produce", "Agent escalated", "Error:")
+
+
+@dataclass
+class CacheEntry:
+    question: str
+    embedding: List[float]
+    answer: str
+    latency_seconds: float
+    created_at: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    saved_latency_seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_latency_seconds": round(self.saved_latency_seconds, 3),
+        }
+
+
+class SemanticResponseCache:
+    def __init__(self, embed_fn: Callable[[List[str]], List[List[float]]],
+                 generations: Optional["CacheGenerations"] = None):
+        self.embed_fn = embed_fn
+        self.generations = generations
+        self._entries: Dict[str, List[CacheEntry]] = {}
+        # Generation each business's entries were stored under
+        self._entry_generations: Dict[str, int] = {}
+        self._stats: Dict[str, CacheStats] = {}
+        self._embedding_memo: "OrderedDict[str, List[float]]" = OrderedDict()
+        # lookup/store run in worker threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    def _embed(self, question: str) -> List[float]:
+        key = self._normalize(question)
+        with self._lock:
+            if key in self._embedding_memo:
+                self._embedding_memo.move_to_end(key)
+                return self._embedding_memo[key]
+        embedding = self.embed_fn([key])[0]
+        with self._lock:
+            self._embedding_memo[key] = embedding
+            if len(self._embedding_memo) > _EMBEDDING_MEMO_SIZE:
+                self._embedding_memo.popitem(last=False)
+        return embedding
+
+    def generation(self, tenant_id: str) -> int:
+        """The business's current invalidation generation (0 without a shared store). May block."""
+        if self.generations is None:
+            return 0
+        return self.generations.current(GENERATION_SCOPE, tenant_id)
+
+    def _live_entries(self, tenant_id: str, generation: int) -> List[CacheEntry]:
+        """The business's entries, emptied first if they predate `generation`. Call under the lock."""
+        if self._entry_generations.get(tenant_id, 0) < generation:
+            self._entries.pop(tenant_id, None)
+            self._entry_generations[tenant_id] = generation
+        return self._entries.setdefault(tenant_id, [])
+
+    @staticmethod
+    def is_cacheable_question(question: str) -> bool:
+        return len(question.split()) >= MIN_QUESTION_WORDS
+
+    def lookup(self, tenant_id: str, question: str, generation: int = 0) -> Optional[str]:
+        """Return a cached answer for a semantically equivalent question, or None.
+
+        `generation` is the business's current generation (see `generation()`); entries
+        stored under an older one are discarded.
+        """
+        if not self.is_cacheable_question(question):
+            return None
+
+        with self._lock:
+            stats = self._stats.setdefault(tenant_id, CacheStats())
+            entries = self._live_entries(tenant_id, generation)
+            now = time.monotonic()
+            entries[:] = [e for e in entries if now - e.created_at < ENTRY_TTL_SECONDS]
+            candidates = list(entries)
+        if not candidates:
+            with self._lock:
+                stats.misses += 1
+            return None
+
+        query = self._embed(question)
+        best: Optional[CacheEntry] = None
+        best_score = SIMILARITY_THRESHOLD
+        for entry in candidates:
+            score = cosine_similarity(query, entry.embedding)
+            if score >= best_score:
+                best, best_score = entry, score
+
+        with self._lock:
+            if best is None:
+                stats.misses += 1
+                return None
+            stats.hits += 1
+            stats.saved_latency_seconds += best.latency_seconds
+        return best.answer
+
+    def store(self, tenant_id: str, question: str, answer: str, latency_seconds: float,
+              generation: int = 0) -> None:
+        """Cache an answer; `generation` is the one read before the answer was produced."""
+        if not self.is_cacheable_question(question) or not answer or answer.startswith(_UNCACHEABLE_PREFIXES):
+            return
+
+        entry = CacheEntry(
+            question=question,
+            embedding=self._embed(question),
+            answer=answer,
+            latency_seconds=latency_seconds
+        )
+        with self._lock:
+            if generation < self._entry_generations.get(tenant_id, 0):
+                return  # documents or instructions changed while the answer was being built
+            entries = self._live_entries(tenant_id, generation)
+            entries.append(entry)
+            if len(entries) > MAX_ENTRIES_PER_TENANT:
+                del entries[: len(entries) - MAX_ENTRIES_PER_TENANT]
+
+    def invalidate(self, tenant_id: str) -> None:
+        """Drop all cached answers for a business (documents or instructions changed), on every worker."""
+        with self._lock:
+            self._entries.pop(tenant_id, None)
+        if self.generations is not None:
+            try:
+                generation = self.generations.bump(GENERATION_SCOPE, tenant_id)
+            except Exception as e:
+                # The change itself is committed; other workers catch up when their entries expire
+                logger.warning("Could not publish response cache invalidation for %s: %s", tenant_id, e)
+                return
+            with self._lock:
+                self._entry_generations[tenant_id] = max(generation, self._entry_generations.get(tenant_id, 0))
+
+    def stats(self, tenant_id: Optional[str] = None) -> dict:
+        if tenant_id is not None:
+            data = self._stats.get(tenant_id, CacheStats()).as_dict()
+            data["entries"] = len(self._entries.get(tenant_id, []))
+            return data
+
+        total = CacheStats()
+        for s in self._stats.values():
+            total.hits += s.hits
+            total.misses += s.misses
+            total.saved_latency_seconds += s.saved_latency_seconds
+        data = total.as_dict()
+        data["entries"] = sum(len(e) for e in self._entries.values())
+        return data
+
+
+def _default_embed_fn(texts: List[str]) -> List[List[float]]:
+    from app.services.vector_db import get_vector_db
+    return get_vector_db().embed(texts)
+
+
+def get_response_cache() -> SemanticResponseCache:
+    from app.services.cache_generations import cache_generations
+
+    return SemanticResponseCache(embed_fn=_default_embed_fn, generations=cache_generations)
+
+
+response_cache = get_response_cache()
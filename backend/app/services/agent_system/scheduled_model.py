@@ -0,0 +1,61 @@
+import asyncio
+import logging
+from typing import AsyncGenerator
+
+from google.adk.models.lite_llm import LiteLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+
+from app.core.metrics import llm_scheduler_events
+from app.services.agent_system.llm_scheduler import is_rate_limited, is_retryable, llm_scheduler, retry_after_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduledLiteLlm(LiteLlm):
+    """LiteLlm whose calls take a slot from the per-key LLM scheduler, time out, and retry.
+
+    Retrying here (one model call) rather than around the whole turn means a transient
+    provider error never replays the user's message into the ADK session.
+    """
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        api_key = self._additional_args.get("api_key") or ""
+        attempt = 0
+        while True:
+            async with llm_scheduler.slot(api_key) as slot:
+                responses = super().generate_content_async(llm_request, stream=stream)
+                try:
+                    # Read the whole provider answer inside the slot and yield it only after the
+                    # slot is released: ADK runs tools and agent transfers (whose sub-agent makes
+                    # its own LLM call) before resuming this generator, and a held slot would
+                    # leave that nested call queued behind its own parent.
+                    received = []
+                    while True:
+                        # Bounds the wait for each response (the whole answer when not streaming)
+                        try:
+                            received.append(await asyncio.wait_for(responses.__anext__(), llm_scheduler.call_timeout))
+                        except StopAsyncIteration:
+                            break
+                except Exception as e:
+                    # Nothing has been yielded yet, so any retryable failure can be retried
+                    if not is_retryable(e):
+                        raise
+                    delay = llm_scheduler.backoff(attempt, retry_after_seconds(e))
+                    if is_rate_limited(e):
+                        slot.rate_limited(delay)
+                    if attempt >= llm_scheduler.max_retries:
+                        raise
+                    logger.warning("LLM call failed (%s), retrying in %.1fs", type(e).__name__, delay)
+                    received = None
+                finally:
+                    await responses.aclose()
+            if received is not None:
+                for response in received:
+                    yield response
+                return
+            llm_scheduler_events.inc(event="retried")
+            await asyncio.sleep(delay)
+            attempt += 1
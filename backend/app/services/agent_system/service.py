@@ -1,50 +1,135 @@
-from google.adk.sessions import DatabaseSessionService
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
 from app.db.session import SQLALCHEMY_DATABASE_URL
 
+if TYPE_CHECKING:
+    from google.adk.sessions import DatabaseSessionService, Session
+
+logger = logging.getLogger(__name__)
+
 # --- Session Management ---
-# Using DatabaseSessionService for persistent session storage
-session_service = DatabaseSessionService(db_url=SQLALCHEMY_DATABASE_URL)
+# Using DatabaseSessionService for persistent session storage.
+# Built on first use: importing google.adk takes seconds and only the chat path needs it.
+session_service: Optional["DatabaseSessionService"] = None
+_session_service_lock = threading.Lock()
+
+
+def get_session_service() -> "DatabaseSessionService":
+    global session_service
+    if session_service is None:
+        with _session_service_lock:
+            if session_service is None:
+                from google.adk.sessions import DatabaseSessionService
+                session_service = DatabaseSessionService(db_url=SQLALCHEMY_DATABASE_URL)
+    return session_service
+
+# --- Session Existence Cache ---
+# (app_name, user_id, session_id) triples known to exist in the ADK `sessions` table.
+# ADK sessions are never deleted on the chat path, so a hit can skip the DB entirely.
+# Bounded LRU so long-running workers don't grow without limit.
+MAX_KNOWN_SESSIONS = 10_000
+_known_sessions: "OrderedDict[Tuple[str, str, str], None]" = OrderedDict()
+
+
+def _remember_session(key: Tuple[str, str, str]) -> None:
+    _known_sessions[key] = None
+    _known_sessions.move_to_end(key)
+    while len(_known_sessions) > MAX_KNOWN_SESSIONS:
+        _known_sessions.popitem(last=False)
+
+
+def forget_session(app_name: str, user_id: str, session_id: str) -> None:
+    """Drop a triple from the existence cache (e.g. after deleting the ADK session)."""
+    _known_sessions.pop((app_name, user_id, session_id), None)
+
+
+def session_exists(app_name: str, user_id: str, session_id: str) -> bool:
+    """
+    Lightweight existence probe against the ADK `sessions` table.
+
+    Unlike `session_service.get_session`, this does not load the event history
+    or app/user state - it is a single primary-key lookup.
+    """
+    with get_session_service().db_engine.connect() as conn:
+        row = conn.execute(
+            text(
+                "SELECT 1 FROM sessions "
+                "WHERE app_name = :app_name AND user_id = :user_id AND id = :session_id"
+            ),
+            {"app_name": app_name, "user_id": user_id, "session_id": session_id},
+        ).first()
+    return row is not None
+
+
+async def session_started(app_name: str, user_id: str, session_id: str) -> bool:
+    """Whether the conversation already has an ADK session, i.e. earlier turns."""
+    key = (app_name, user_id, session_id)
+    if key in _known_sessions:
+        return True
+    if await asyncio.to_thread(session_exists, app_name, user_id, session_id):
+        _remember_session(key)
+        return True
+    return False
+
 
-async def init_session(app_name: str, user_id: str, session_id: str, initial_state: dict = None):
+async def init_session(app_name: str, user_id: str, session_id: str, initial_state: dict = None) -> Optional["Session"]:
     """
     Initialize a session with optional initial state.
     Uses get-or-create pattern to avoid duplicate key errors.
-    
+
+    The per-message check is served from the in-process existence cache when possible,
+    falling back to `session_exists` (one indexed lookup). The full session is only
+    built when it has to be created; the Runner loads it itself on `run_async`.
+
     Args:
         app_name: Application/business name
         user_id: User identifier
         session_id: Session identifier
         initial_state: Optional initial state dictionary
-        
+
     Returns:
-        Existing or newly created session
+        Newly created session, or None if the session already existed
     """
+    key = (app_name, user_id, session_id)
+
+    # Fast path: already seen by this worker
+    if key in _known_sessions:
+        _known_sessions.move_to_end(key)
+        return None
+
+    try:
+        # A blocking DB round trip; keep it off the event loop
+        if await asyncio.to_thread(session_exists, app_name, user_id, session_id):
+            _remember_session(key)
+            return None
+    except Exception:
+        # Probe failed, fall through to create
+        pass
+
     if initial_state is None:
         initial_state = {}
-    
+
     # Ensure user_id is in state for tools to access
     initial_state["user_id"] = user_id
-    
-    # Try to get existing session first
+
+    # Create new session only if it doesn't exist
     try:
-        existing_session = await session_service.get_session(
+        session = await get_session_service().create_session(
             app_name=app_name,
             user_id=user_id,
-            session_id=session_id
+            session_id=session_id,
+            state=initial_state
         )
-        if existing_session:
-            # Session already exists, return it
-            return existing_session
-    except Exception:
-        # Session doesn't exist or error occurred, will create new one
-        pass
-    
-    # Create new session only if it doesn't exist
-    session = await session_service.create_session(
-        app_name=app_name,
-        user_id=user_id,
-        session_id=session_id,
-        state=initial_state
-    )
-    print(f"Session created: App='{app_name}', User='{user_id}', Session='{session_id}'")
+    except IntegrityError:
+        # Another worker created it between the probe and the insert
+        _remember_session(key)
+        return None
+
+    _remember_session(key)
+    logger.debug("Session created: app=%s user=%s session=%s", app_name, user_id, session_id)
     return session
@@ -1,17 +1,33 @@
+import asyncio
+import logging
 from typing import Optional
 from google.adk.tools.tool_context import ToolContext
+from app.core.config import settings
+from app.core.metrics import retrieval_coalesced, retrieval_timeouts
+from app.utils.singleflight import SingleFlight
+from app.utils.context_assembler import assemble_context
+# Plain-text tools live apart from ADK so the intent router can use them without importing it
+from app.services.agent_system.greetings import say_hello, say_goodbye
+
+logger = logging.getLogger(__name__)
 
 # Mock RAG Service import (handling missing dependencies as done previously)
 try:
     from app.services.rag_service import rag_service
 except ImportError:
-    print("Warning: RAG Service dependencies missing. Using Mock RAG Service.")
+    logger.warning("RAG Service dependencies missing. Using Mock RAG Service.")
     class MockRAGService:
         def query(self, text):
             return [f"Mock context for: {text}"]
+
+        def query_chunks(self, text, user_id, n_results=5):
+            return [{"text": f"Mock context for: {text}", "metadata": {}}]
     rag_service = MockRAGService()
 
-def get_context(user_input: str, tool_context: ToolContext) -> str:
+# Identical questions to the same business in flight at once share one retrieval
+retrieval_flights = SingleFlight(on_coalesce=retrieval_coalesced.inc)
+
+async def get_context(user_input: str, tool_context: ToolContext) -> str:
     """Retrieves the context from the RAG service.
 
     Args:
@@ -21,7 +37,7 @@ def get_context(user_input: str, tool_context: ToolContext) -> str:
     Returns:
         str: The retrieved context.
     """
-    print(f"--- Tool: get_context called for user_input: {user_input} ---") 
+    logger.debug("get_context called", extra={"user_input": user_input})
     
     # Extract user_id from state
     user_id = tool_context.state.get("user_id")
@@ -30,27 +46,23 @@ def get_context(user_input: str, tool_context: ToolContext) -> str:
     
     # Example of reading from state
     style = tool_context.state.get("response_style", "normal")
-    print(f"--- Tool: Reading state 'response_style': {style} ---")
-    print(f"--- Tool: Using user_id: {user_id} ---")
+    logger.debug("get_context state", extra={"response_style": style, "user_id": user_id})
 
-    # Retrieve context with user_id
-    context_chunks = rag_service.query(user_input, user_id)
-    context_text = "\n\n".join(context_chunks)
+    # Retrieve context with user_id; overlapping neighbours are stitched and
+    # duplicates dropped so the prompt stays within the token budget
+    # (embedding + Chroma query are blocking, so they run off the event loop)
+    try:
+        context_chunks = await asyncio.wait_for(
+            retrieval_flights.do(
+                (user_id, user_input),
+                lambda: asyncio.to_thread(rag_service.query_chunks, user_input, user_id),
+            ),
+            timeout=settings.RETRIEVAL_TIMEOUT_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        # A stuck vector store must not hold the turn; the agent answers without documents
+        logger.warning("Retrieval timed out after %ss for %s", settings.RETRIEVAL_TIMEOUT_SECONDS, user_id)
+        retrieval_timeouts.inc()
+        return "Context is temporarily unavailable."
+    context_text = assemble_context(context_chunks, max_tokens=settings.CONTEXT_TOKEN_BUDGET)
     return context_text
-
-def say_hello(name: Optional[str] = None) -> str:
-    """Provides a simple greeting.
-
-    Args:
-        name (str, optional): The name of the person to greet.
-
-    Returns:
-        str: A friendly greeting message.
-    """
-    if name:
-        return f"Hello, {name}! How can I help you today?"
-    return "Hello! How can I assist you with your questions?"
-
-def say_goodbye() -> str:
-    """Provides a simple farewell message."""
-    return "Goodbye! Have a great day."
@@ -1,31 +1,58 @@
 import os
 import json
+import logging
+import time
 from datetime import datetime, timezone
 from typing import List, Optional, Tuple
 from sqlalchemy.orm import Session
 from app.models.widget import GuestMessage, GuestUser
 from app.models.chat_session import ChatSession
+from app.core.metrics import record_llm_call
+from app.services.message_log import message_log
 
-# Use specific client for multi-tenant API key support
-from google import genai
+logger = logging.getLogger(__name__)
 
 INTENT_ENUM = ["Support", "Sales", "Feedback", "Bug Report", "General"]
+ANALYSIS_MODEL = "gemini-2.0-flash"
 
-async def analyze_session(db: Session, session_id: str, intents: Optional[List[str]] = None, api_key: str = None) -> Tuple[str, str]:
+def _generate_content(api_key: str, prompt: str, operation: str, business_id: Optional[str] = None):
+    """Single generate_content call, recorded in the LLM metrics under `operation`."""
+    # Use specific client for multi-tenant API key support (imported lazily: google.genai is slow to load)
+    from google import genai
+
+    started = time.perf_counter()
+    try:
+        client = genai.Client(api_key=api_key)
+        response = client.models.generate_content(
+            model=ANALYSIS_MODEL,
+            contents=prompt
+        )
+    except Exception:
+        record_llm_call(business_id, ANALYSIS_MODEL, operation, time.perf_counter() - started, outcome="error")
+        raise
+    usage = response.usage_metadata
+    record_llm_call(
+        business_id, ANALYSIS_MODEL, operation, time.perf_counter() - started,
+        prompt_tokens=usage.prompt_token_count if usage else None,
+        completion_tokens=usage.candidates_token_count if usage else None,
+    )
+    return response
+
+async def analyze_session(db: Session, session_id: str, intents: Optional[List[str]] = None, api_key: str = None, business_id: Optional[str] = None) -> Tuple[str, str]:
     """
     Analyzes a chat session to generate a summary and determine intent.
     Returns (summary, intent).
     """
     if not api_key:
         # Fail fast if no key provided
-        print("Analysis Agent: No API Key provided")
+        logger.warning("Analysis Agent: No API Key provided")
         return "Analysis unavailable (Missing Key)", "General"
 
     session = db.query(ChatSession).filter(ChatSession.id == session_id).first()
     if not session:
         raise ValueError("Session not found")
         
-    messages = db.query(GuestMessage).filter(GuestMessage.session_id == session_id).order_by(GuestMessage.created_at).all()
+    messages = message_log.for_session(db, session_id, since=session.created_at)
     
     if not messages:
         return "No messages in session", "General"
@@ -61,11 +88,7 @@ async def analyze_session(db: Session, session_id: str, intents: Optional[List[s
     """
     
     try:
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(
-            model="gemini-2.0-flash", 
-            contents=prompt
-        )
+        response = _generate_content(api_key, prompt, operation="analyze_session", business_id=business_id)
         
         # Simple parsing logic
         content = response.text
@@ -90,7 +113,7 @@ async def analyze_session(db: Session, session_id: str, intents: Optional[List[s
         return summary, intent
         
     except Exception as e:
-        print(f"Error in analysis agent: {e}")
+        logger.exception("Error in analysis agent for session %s", session_id)
         return session.summary or "Error generating summary", session.top_intent or "General"
 
 async def persist_analysis(db: Session, session_id: str, summary: str, intent: str):
@@ -104,7 +127,7 @@ async def persist_analysis(db: Session, session_id: str, summary: str, intent: s
         return session
     return None
 
-async def generate_business_intents(business_description: str, api_key: str = None) -> List[str]:
+async def generate_business_intents(business_description: str, api_key: str = None, business_id: Optional[str] = None) -> List[str]:
     if not api_key:
         return []
 
@@ -118,11 +141,7 @@ async def generate_business_intents(business_description: str, api_key: str = No
     """
     
     try:
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=prompt
-        )
+        response = _generate_content(api_key, prompt, operation="generate_intents", business_id=business_id)
         text = response.text
         if "```json" in text:
             text = text.replace("```json", "").replace("```", "")
@@ -134,10 +153,10 @@ async def generate_business_intents(business_description: str, api_key: str = No
             return intents[:5]
         return []
     except Exception as e:
-        print(f"Error generating intents: {e}")
+        logger.exception("Error generating intents")
         return []
 
-async def generate_followup_content(messages: List[GuestMessage], follow_up_type: str, extra_info: str, api_key: str = None) -> str:
+async def generate_followup_content(messages: List[GuestMessage], follow_up_type: str, extra_info: str, api_key: str = None, business_id: Optional[str] = None) -> str:
     if not api_key:
         return "Error: No API Key configured."
 
@@ -164,13 +183,9 @@ async def generate_followup_content(messages: List[GuestMessage], follow_up_type
     """
     
     try:
-        client = genai.Client(api_key=api_key)
-        response = client.models.generate_content(
-            model="gemini-2.0-flash", 
-            contents=prompt
-        )
+        response = _generate_content(api_key, prompt, operation="followup", business_id=business_id)
         return response.text
     except Exception as e:
-        print(f"Error generating follow up: {e}")
+        logger.exception("Error generating follow up")
         return "Error generating follow up."
 
@@ -0,0 +1,98 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from app.core.config import settings
+from app.core.metrics import Gauge, analytics_cache_lookups, registry
+
+# --- Analytics Cache ---
+# The dashboard loads every analytics panel for the same `days` window at once and
+# refreshes them together, so each aggregate is cached per (widget, panel, days) for a
+# few seconds. A new chat session bumps the widget's generation, which makes all of its
+# cached panels stale at once. Concurrent misses for the same key wait for the first
+# caller's query instead of running their own (analytics endpoints run in the threadpool,
+# hence threading primitives). The cache is per worker; the TTL bounds how stale another
+# worker's view can be.
+
+
+@dataclass
+class CachedResult:
+    value: Any
+    generation: int
+    expires_at: float
+
+
+class AnalyticsCache:
+    def __init__(self, ttl_seconds: float = 30.0, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple, CachedResult] = {}
+        self._generations: Dict[Hashable, int] = {}
+        self._inflight: Dict[Tuple, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, widget_id: Hashable, panel: str, days: int, compute: Callable[[], Any]) -> Any:
+        """Return the cached `panel` result for the widget, computing it at most once per key."""
+        if self.ttl_seconds <= 0:
+            return compute()
+
+        key = (widget_id, panel, days)
+        waited = False
+        while True:
+            with self._lock:
+                generation = self._generations.get(widget_id, 0)
+                entry = self._entries.get(key)
+                if entry is not None and entry.generation == generation and entry.expires_at > time.monotonic():
+                    analytics_cache_lookups.inc(result="coalesced" if waited else "hit")
+                    return entry.value
+                inflight = self._inflight.get(key)
+                if inflight is None:
+                    inflight = self._inflight[key] = threading.Event()
+                    break
+            # Another request is computing this key; if it fails, the loop computes it here
+            inflight.wait()
+            waited = True
+
+        analytics_cache_lookups.inc(result="miss")
+        try:
+            value = compute()
+            with self._lock:
+                # Stored under the generation read before computing: if a session arrived
+                # meanwhile, the result is already stale and the next request recomputes
+                self._entries[key] = CachedResult(value, generation, time.monotonic() + self.ttl_seconds)
+                if len(self._entries) > self.max_entries:
+                    self._evict()
+            return value
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.set()
+
+    def _evict(self) -> None:
+        now = time.monotonic()
+        self._entries = {
+            key: entry for key, entry in self._entries.items()
+            if entry.expires_at > now and entry.generation == self._generations.get(key[0], 0)
+        }
+        if len(self._entries) > self.max_entries:
+            # Still full of live entries: drop the ones closest to expiry
+            keep = sorted(self._entries.items(), key=lambda item: item[1].expires_at)[-self.max_entries // 2:]
+            self._entries = dict(keep)
+
+    def invalidate(self, widget_id: Hashable) -> None:
+        """New data for the widget (a session started): every cached panel is stale."""
+        with self._lock:
+            self._generations[widget_id] = self._generations.get(widget_id, 0) + 1
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+analytics_cache = AnalyticsCache(ttl_seconds=settings.ANALYTICS_CACHE_TTL_SECONDS)
+
+registry.register(Gauge(
+    "taimako_analytics_cache_entries", "Analytics panel results cached in this worker",
+    callback=analytics_cache.size,
+))
@@ -0,0 +1,86 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.core.config import settings
+from app.models.cache_generation import CacheGeneration
+
+# --- Cache Generations ---
+# Caches kept in each worker's memory (answers, keyword indexes) are invalidated in the
+# worker that handled the change, but the others only learn about it through here: the
+# change bumps a counter in the database, and every worker compares the counter it built
+# its entries under with the current one before serving them. Reads are memoised for
+# CHECK_SECONDS, which bounds how long another worker can keep serving stale entries.
+
+_generations = CacheGeneration.__table__
+
+# Memoised (scope, key) pairs kept per worker before the memo is reset
+_MAX_MEMO_ENTRIES = 10_000
+
+
+class CacheGenerations:
+    def __init__(self, session_factory: Callable, check_seconds: float = 2.0):
+        self.session_factory = session_factory
+        self.check_seconds = check_seconds
+        self._memo: Dict[Tuple[str, str], Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def current(self, scope: str, key: str) -> int:
+        """The generation of (scope, key); 0 until it is first bumped. Blocking."""
+        now = time.monotonic()
+        with self._lock:
+            memo = self._memo.get((scope, key))
+        if memo is not None and now - memo[1] < self.check_seconds:
+            return memo[0]
+        db = self.session_factory()
+        try:
+            value = db.execute(
+                select(_generations.c.generation).where(_generations.c.scope == scope, _generations.c.key == key)
+            ).scalar() or 0
+        finally:
+            db.close()
+        self._remember(scope, key, value, now)
+        return value
+
+    def bump(self, scope: str, key: str) -> int:
+        """Mark everything cached under (scope, key) stale on every worker; returns the new generation."""
+        now = datetime.now(timezone.utc)
+        where = (_generations.c.scope == scope) & (_generations.c.key == key)
+        increment = _generations.update().where(where).values(generation=_generations.c.generation + 1, updated_at=now)
+        db = self.session_factory()
+        try:
+            if db.execute(increment).rowcount == 0:
+                try:
+                    db.execute(_generations.insert().values(scope=scope, key=key, generation=1, updated_at=now))
+                except IntegrityError:
+                    # Another worker inserted it first
+                    db.rollback()
+                    db.execute(increment)
+            db.commit()
+            value = db.execute(select(_generations.c.generation).where(where)).scalar()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        self._remember(scope, key, value, time.monotonic())
+        return value
+
+    def _remember(self, scope: str, key: str, value: int, at: float) -> None:
+        with self._lock:
+            if len(self._memo) >= _MAX_MEMO_ENTRIES:
+                self._memo.clear()
+            self._memo[(scope, key)] = (value, at)
+
+
+def get_cache_generations() -> CacheGenerations:
+    from app.db.session import SessionLocal
+
+    return CacheGenerations(SessionLocal, check_seconds=settings.CACHE_GENERATION_CHECK_SECONDS)
+
+
+cache_generations = get_cache_generations()
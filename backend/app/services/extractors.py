@@ -0,0 +1,426 @@
+import csv
+import multiprocessing
+import os
+import re
+import tempfile
+import zipfile
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Callable, Dict, Iterator, List, Optional
+from xml.etree import ElementTree
+from app.core.config import settings
+from app.utils.document_reader import iter_text_blocks, iter_pdf_text
+
+# --- Text Extraction ---
+# Documents are typed by sniffing their first bytes (falling back to the extension for
+# text formats) and turned into plain text by a registered extractor. Extractors are
+# generators so large files never have to be held in memory; binary formats run in a
+# process pool and write their text to a temp file that ingestion streams from.
+
+PDF = "application/pdf"
+DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+HTML = "text/html"
+CSV = "text/csv"
+MARKDOWN = "text/markdown"
+PLAIN_TEXT = "text/plain"
+
+# Bytes inspected when sniffing a file's type
+SNIFF_BYTES = 2048
+# Extracted text is written out in pieces of roughly this many characters
+_WRITE_BATCH_CHARS = 64 * 1024
+
+_HTML_PREFIXES = ("<!doctype html", "<html", "<head", "<body")
+_TEXT_EXTENSIONS = {
+    ".csv": CSV,
+    ".tsv": CSV,
+    ".md": MARKDOWN,
+    ".markdown": MARKDOWN,
+    ".html": HTML,
+    ".htm": HTML,
+}
+
+
+class UnsupportedFileType(ValueError):
+    """Raised for files no extractor can read."""
+
+
+def sniff_mime(path: str, filename: str) -> str:
+    """Detect a document's MIME type from its content, using the extension only for text formats."""
+    with open(path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+
+    if head.startswith(b"%PDF-"):
+        return PDF
+    if head.startswith(b"PK\x03\x04"):
+        try:
+            with zipfile.ZipFile(path) as archive:
+                if "word/document.xml" in archive.namelist():
+                    return DOCX
+        except zipfile.BadZipFile:
+            pass
+        return "application/zip"
+    if b"\x00" in head:
+        return "application/octet-stream"
+
+    text = head.decode("utf-8", errors="ignore").lstrip("﻿ \t\r\n").lower()
+    if text.startswith(_HTML_PREFIXES):
+        return HTML
+    _, ext = os.path.splitext(filename.lower())
+    return _TEXT_EXTENSIONS.get(ext, PLAIN_TEXT)
+
+
+EXTRACTORS: Dict[str, Callable[[str], Iterator[str]]] = {}
+
+
+def register_extractor(*mime_types: str):
+    def decorator(func: Callable[[str], Iterator[str]]):
+        for mime_type in mime_types:
+            EXTRACTORS[mime_type] = func
+        return func
+    return decorator
+
+
+def _format_row(headers: List[str], cells: List[str]) -> str:
+    """Render a table row as "Header: value | Header: value" so each row stands alone in a chunk."""
+    cells = [c.strip() for c in cells]
+    if not any(cells):
+        return ""
+    if headers and len(headers) == len(cells):
+        return " | ".join(f"{h}: {c}" for h, c in zip(headers, cells) if c)
+    return " | ".join(c for c in cells if c)
+
+
+@register_extractor(PLAIN_TEXT)
+def extract_plain_text(path: str) -> Iterator[str]:
+    yield from iter_text_blocks(path)
+
+
+@register_extractor(PDF)
+def extract_pdf(path: str) -> Iterator[str]:
+    with open(path, "rb") as stream:
+        yield from iter_pdf_text(stream)
+
+
+class _BoilerplateStrippingParser(HTMLParser):
+    """Collects visible text, skipping scripts, navigation, headers/footers and similar chrome."""
+
+    SKIP_TAGS = {"script", "style", "noscript", "template", "svg", "nav", "header", "footer", "aside", "form", "iframe", "button"}
+    VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+    BLOCK_TAGS = {
+        "p", "div", "section", "article", "main", "li", "ul", "ol", "table", "tr", "br", "hr",
+        "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "dd", "dt", "title",
+    }
+    BOILERPLATE_MARKERS = re.compile(r"cookie|banner|sidebar|navbar|menu|breadcrumb|share|social|advert|popup|newsletter", re.I)
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skip_stack: List[str] = []
+
+    def _is_boilerplate(self, tag: str, attrs) -> bool:
+        if tag in self.SKIP_TAGS:
+            return True
+        attributes = dict(attrs)
+        marker = " ".join(filter(None, [attributes.get("class"), attributes.get("id"), attributes.get("role")]))
+        return bool(marker and self.BOILERPLATE_MARKERS.search(marker))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID_TAGS:
+            if not self._skip_stack and tag in self.BLOCK_TAGS:
+                self.parts.append("\n")
+            return
+        if self._skip_stack or self._is_boilerplate(tag, attrs):
+            self._skip_stack.append(tag)
+            return
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+        elif tag in ("td", "th"):
+            self.parts.append(" | ")
+
+    def handle_endtag(self, tag):
+        if self._skip_stack:
+            if tag in self._skip_stack:
+                # Pop up to the matching tag, tolerating unclosed children
+                while self._skip_stack.pop() != tag:
+                    pass
+            return
+        if tag in self.BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self._skip_stack:
+            return
+        text = " ".join(data.split())
+        if text:
+            self.parts.append(text + " ")
+
+    def drain(self) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        # Collapse the blank lines left behind by nested blocks
+        return re.sub(r" *\n[\s|]*\n\s*", "\n\n", text)
+
+
+@register_extractor(HTML)
+def extract_html(path: str) -> Iterator[str]:
+    parser = _BoilerplateStrippingParser()
+    for block in iter_text_blocks(path):
+        parser.feed(block)
+        text = parser.drain()
+        if text.strip():
+            yield text
+    parser.close()
+    text = parser.drain()
+    if text.strip():
+        yield text
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+@register_extractor(DOCX)
+def extract_docx(path: str) -> Iterator[str]:
+    parts: List[str] = []
+    size = 0
+    paragraph: List[str] = []
+    cell: List[str] = []
+    row: List[str] = []
+    # Header row of each open table (tables can nest); None until the first row ends
+    table_headers: List[Optional[List[str]]] = []
+
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        for event, elem in ElementTree.iterparse(xml, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if tag == _W + "tbl":
+                    table_headers.append(None)
+                continue
+
+            if tag == _W + "t":
+                paragraph.append(elem.text or "")
+            elif tag == _W + "tab":
+                paragraph.append("\t")
+            elif tag in (_W + "br", _W + "cr"):
+                paragraph.append("\n")
+            elif tag == _W + "p":
+                text = "".join(paragraph).strip()
+                paragraph = []
+                if table_headers:
+                    if text:
+                        cell.append(text)
+                elif text:
+                    parts.append(text + "\n\n")
+                    size += len(text)
+                elem.clear()
+            elif tag == _W + "tc":
+                row.append(" ".join(cell))
+                cell = []
+            elif tag == _W + "tr":
+                if table_headers[-1] is None:
+                    table_headers[-1] = [c.strip() for c in row]
+                else:
+                    line = _format_row(table_headers[-1], row)
+                    if line:
+                        parts.append(line + "\n")
+                        size += len(line)
+                row = []
+                elem.clear()
+            elif tag == _W + "tbl":
+                table_headers.pop()
+                parts.append("\n")
+                elem.clear()
+
+            if size >= _WRITE_BATCH_CHARS:
+                yield "".join(parts)
+                parts, size = [], 0
+
+    if parts:
+        yield "".join(parts)
+
+
+def _row_batches(rows: Iterator[List[str]], headers: List[str]) -> Iterator[str]:
+    parts: List[str] = []
+    size = 0
+    for row in rows:
+        line = _format_row(headers, row)
+        if not line:
+            continue
+        parts.append(line + "\n")
+        size += len(line)
+        if size >= _WRITE_BATCH_CHARS:
+            yield "".join(parts)
+            parts, size = [], 0
+    if parts:
+        yield "".join(parts)
+
+
+@register_extractor(CSV)
+def extract_csv(path: str) -> Iterator[str]:
+    with open(path, "r", encoding="utf-8-sig", errors="replace", newline="") as f:
+        sample = f.read(SNIFF_BYTES * 4)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        headers = [h.strip() for h in next(reader, [])]
+        yield from _row_batches(reader, headers)
+
+
+_TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?\s*$")
+
+
+def _split_table_row(line: str) -> List[str]:
+    return line.strip().strip("|").split("|")
+
+
+@register_extractor(MARKDOWN)
+def extract_markdown(path: str) -> Iterator[str]:
+    parts: List[str] = []
+    size = 0
+    pending: Optional[str] = None  # Possible table header, waiting for its separator line
+    headers: Optional[List[str]] = None
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if headers is not None:
+                if "|" in line:
+                    row = _format_row(headers, _split_table_row(line))
+                    if row:
+                        parts.append(row + "\n")
+                    continue
+                headers = None
+                parts.append("\n")
+            if pending is not None:
+                if _TABLE_SEPARATOR_RE.match(line):
+                    headers = [h.strip() for h in _split_table_row(pending)]
+                    pending = None
+                    continue
+                parts.append(pending)
+                pending = None
+            if "|" in line:
+                pending = line
+                continue
+            parts.append(line)
+            size += len(line)
+            if size >= _WRITE_BATCH_CHARS:
+                yield "".join(parts)
+                parts, size = [], 0
+
+    if pending is not None:
+        parts.append(pending)
+    if parts:
+        yield "".join(parts)
+
+
+def extract_text(path: str, filename: str) -> Iterator[str]:
+    """Yield a document's text using the extractor registered for its sniffed type."""
+    mime_type = sniff_mime(path, filename)
+    extractor = EXTRACTORS.get(mime_type)
+    if extractor is None:
+        raise UnsupportedFileType(f"Unsupported file type: {mime_type}")
+    return extractor(path)
+
+
+@dataclass
+class ExtractedText:
+    path: str
+    mime_type: str
+    temporary: bool  # True when `path` is a temp file the caller must delete
+
+
+def _write_extracted(texts: Iterator[str], mime_type: str, output_dir: Optional[str]) -> ExtractedText:
+    fd, out_path = tempfile.mkstemp(dir=output_dir, prefix="extracted_", suffix=".txt")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as out:
+            for text in texts:
+                out.write(text)
+    except BaseException:
+        os.remove(out_path)
+        raise
+    return ExtractedText(path=out_path, mime_type=mime_type, temporary=True)
+
+
+def extract_to_file(path: str, filename: str, output_dir: Optional[str] = None) -> ExtractedText:
+    """Extract a document into a UTF-8 text file (runs inside extraction worker processes)."""
+    mime_type = sniff_mime(path, filename)
+    extractor = EXTRACTORS.get(mime_type)
+    if extractor is None:
+        raise UnsupportedFileType(f"Unsupported file type: {mime_type}")
+    return _write_extracted(extractor(path), mime_type, output_dir)
+
+
+def extract_stored_to_file(file_path: str, filename: str, output_dir: Optional[str] = None) -> ExtractedText:
+    """
+    Extract a document held by the file storage backend but not on this node.
+
+    PDFs are parsed from the stored object through `open()`: pypdf seeks to the trailer and
+    reads only the objects it needs, so only those byte ranges are fetched. Other formats
+    are downloaded into the storage cache and extracted from there.
+    """
+    from app.services.file_storage import get_file_storage
+
+    storage = get_file_storage()
+    with storage.open(file_path) as stream:
+        if stream.read(5) == b"%PDF-":
+            stream.seek(0)
+            return _write_extracted(iter_pdf_text(stream), PDF, output_dir)
+    return extract_to_file(storage.get_full_path(file_path), filename, output_dir)
+
+
+class ExtractionPool:
+    """
+    Bounded process pool for CPU-bound extraction (PDF, DOCX, HTML, ...).
+    Plain text needs no extraction and resolves immediately to the source file;
+    with `max_workers=0` everything runs inline in the calling process.
+
+    Workers are spawned rather than forked: the API process holds threads (ADK, the
+    background flushers, Chroma), locks and open DB/HTTP connections that a forked child
+    would inherit mid-use.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def submit(self, path: str, filename: str) -> "Future[ExtractedText]":
+        future: "Future[ExtractedText]" = Future()
+        try:
+            mime_type = sniff_mime(path, filename)
+            if mime_type == PLAIN_TEXT:
+                future.set_result(ExtractedText(path=path, mime_type=mime_type, temporary=False))
+                return future
+            if self.max_workers > 0:
+                return self._get_executor().submit(extract_to_file, path, filename)
+            future.set_result(extract_to_file(path, filename))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def submit_stored(self, file_path: str, filename: str) -> "Future[ExtractedText]":
+        """Like `submit`, for a document that has to be read from the file storage backend."""
+        if self.max_workers > 0:
+            return self._get_executor().submit(extract_stored_to_file, file_path, filename)
+        future: "Future[ExtractedText]" = Future()
+        try:
+            future.set_result(extract_stored_to_file(file_path, filename))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+extraction_pool = ExtractionPool(max_workers=settings.EXTRACTION_WORKERS)
@@ -1,7 +1,37 @@
+import io
 import os
+import re
 import shutil
+import tempfile
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import BinaryIO
+from typing import BinaryIO, Optional
+from app.core.config import settings
+from app.utils.hashing import HashingReader
+
+# Uploads are copied in fixed-size blocks so whole files are never held in memory
+COPY_CHUNK_SIZE = 1024 * 1024
+# Objects larger than this are sent as multipart uploads of this part size (S3 minimum is 5 MiB)
+MULTIPART_PART_SIZE = 8 * 1024 * 1024
+# Ranged reads fetch at least this many bytes per request
+RANGE_BLOCK_SIZE = 256 * 1024
+# Cached files written or read this recently may be in use (e.g. a download waiting in the
+# extraction window, possibly in another process) and are never evicted
+IN_USE_GRACE_SECONDS = 10 * 60
+_SAFE_EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,10}$")
+
+
+class StorageQuotaExceeded(ValueError):
+    """Raised when an upload would take a tenant over its storage quota."""
+
+
+def safe_extension(filename: str) -> str:
+    """Extension of a client-supplied filename, or "" if it is not a plain short extension."""
+    _, ext = os.path.splitext(os.path.basename(filename or ""))
+    ext = ext.lower()
+    return ext if _SAFE_EXTENSION_RE.match(ext) else ""
+
 
 class BaseFileStorage(ABC):
     @abstractmethod
@@ -24,6 +54,14 @@ class BaseFileStorage(ABC):
         """Deletes a file."""
         pass
 
+    def open(self, file_path: str) -> BinaryIO:
+        """Opens a file for seekable binary reading."""
+        return open(self.get_full_path(file_path), "rb")
+
+    def is_remote(self, file_path: str) -> bool:
+        """True when `get_full_path` would have to download the file first."""
+        return False
+
 class LocalFileStorage(BaseFileStorage):
     def __init__(self, base_dir: str = "uploads"):
         self.base_dir = base_dir
@@ -33,13 +71,21 @@ class LocalFileStorage(BaseFileStorage):
         user_dir = os.path.join(self.base_dir, user_id)
         os.makedirs(user_dir, exist_ok=True)
         
-        file_path = os.path.join(user_dir, filename)
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file_obj, buffer)
+        # Content-addressed: files are stored as <sha256><ext>, so identical uploads share
+        # one file and a same-named upload with new content never overwrites the old one.
+        reader = file_obj if isinstance(file_obj, HashingReader) else HashingReader(file_obj)
+        fd, tmp_path = tempfile.mkstemp(dir=user_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                shutil.copyfileobj(reader, buffer, COPY_CHUNK_SIZE)
+            file_path = os.path.join(user_dir, reader.hexdigest() + safe_extension(filename))
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
             
-        # Return relative path from base_dir, or just the path itself
-        # Storing relative to project root or absolute? 
-        # Let's return path relative to project root for consistency.
+        # Return path relative to project root for consistency.
         return file_path
 
     def get_full_path(self, file_path: str) -> str:
@@ -58,4 +104,255 @@ class LocalFileStorage(BaseFileStorage):
             return True
         return False
 
-file_storage = LocalFileStorage()
+
+class S3RangeReader(io.RawIOBase):
+    """Seekable read-only view of an S3 object that fetches only the byte ranges read."""
+
+    def __init__(self, client, bucket: str, key: str, size: int):
+        self._client = client
+        self._bucket = bucket
+        self._key = key
+        self._size = size
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._pos = max(0, offset)
+        return self._pos
+
+    def readinto(self, buffer) -> int:
+        if self._pos >= self._size or len(buffer) == 0:
+            return 0
+        end = min(self._pos + len(buffer), self._size) - 1
+        response = self._client.get_object(Bucket=self._bucket, Key=self._key, Range=f"bytes={self._pos}-{end}")
+        data = response["Body"].read()
+        buffer[:len(data)] = data
+        self._pos += len(data)
+        return len(data)
+
+
+class S3FileStorage(BaseFileStorage):
+    """
+    S3-compatible object storage (AWS S3, MinIO, ...) so any worker node can ingest any upload.
+
+    Uploads are spooled into a local cache (hashed on the way in), then sent to the bucket,
+    as a multipart upload when large. Reads go through the same cache, which is trimmed
+    least-recently-used first (never the file being returned, nor files touched within
+    IN_USE_GRACE_SECONDS); PDFs not cached on this node are parsed straight from ranged GETs
+    via `open` instead of being downloaded.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        cache_dir: str = "storage_cache",
+        cache_max_bytes: int = 2 * 1024 * 1024 * 1024,
+        client=None,
+        **client_kwargs
+    ):
+        if client is None:
+            try:
+                import boto3
+            except ImportError as e:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install 'agentic-rag-api[s3]')") from e
+            client = boto3.client("s3", **{k: v for k, v in client_kwargs.items() if v})
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.cache_dir = cache_dir
+        self.cache_max_bytes = cache_max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def _object_key(self, file_path: str) -> str:
+        return self.prefix + file_path
+
+    def _cache_path(self, file_path: str) -> str:
+        return os.path.join(self.cache_dir, file_path)
+
+    @staticmethod
+    def _is_not_found(error: Exception) -> bool:
+        code = getattr(error, "response", {}).get("Error", {}).get("Code")
+        return code in ("404", "NoSuchKey", "NotFound")
+
+    def _head(self, file_path: str) -> Optional[dict]:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=self._object_key(file_path))
+        except Exception as e:
+            if self._is_not_found(e):
+                return None
+            raise
+
+    def _upload(self, local_path: str, file_path: str) -> None:
+        key = self._object_key(file_path)
+        if os.path.getsize(local_path) <= MULTIPART_PART_SIZE:
+            with open(local_path, "rb") as f:
+                self.client.put_object(Bucket=self.bucket, Key=key, Body=f)
+            return
+
+        upload_id = self.client.create_multipart_upload(Bucket=self.bucket, Key=key)["UploadId"]
+        try:
+            parts = []
+            with open(local_path, "rb") as f:
+                while True:
+                    data = f.read(MULTIPART_PART_SIZE)
+                    if not data:
+                        break
+                    part_number = len(parts) + 1
+                    response = self.client.upload_part(
+                        Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data
+                    )
+                    parts.append({"PartNumber": part_number, "ETag": response["ETag"]})
+            self.client.complete_multipart_upload(
+                Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+            )
+        except BaseException:
+            self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+            raise
+
+    def _evict_cache(self, keep: Optional[str] = None) -> None:
+        """Trim the cache to cache_max_bytes, oldest first, sparing `keep` and files in use."""
+        now = time.time()
+        total = 0
+        candidates = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".part"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # evicted by another process meanwhile
+                total += stat.st_size
+                if path != keep and now - stat.st_mtime >= IN_USE_GRACE_SECONDS:
+                    candidates.append((stat.st_mtime, stat.st_size, path))
+        # If everything left is in use the cache stays over budget until it is not
+        for _, size, path in sorted(candidates):
+            if total <= self.cache_max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+    def save(self, file_obj: BinaryIO, filename: str, user_id: str) -> str:
+        user_dir = os.path.join(self.cache_dir, user_id)
+        os.makedirs(user_dir, exist_ok=True)
+
+        # Same content-addressed layout as LocalFileStorage: <user_id>/<sha256><ext>
+        reader = file_obj if isinstance(file_obj, HashingReader) else HashingReader(file_obj)
+        fd, tmp_path = tempfile.mkstemp(dir=user_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                shutil.copyfileobj(reader, buffer, COPY_CHUNK_SIZE)
+            file_path = f"{user_id}/{reader.hexdigest()}{safe_extension(filename)}"
+            os.replace(tmp_path, self._cache_path(file_path))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if self._head(file_path) is None:
+            self._upload(self._cache_path(file_path), file_path)
+        self._evict_cache(keep=self._cache_path(file_path))
+        return file_path
+
+    def get_full_path(self, file_path: str) -> str:
+        """Returns a local copy of the object, downloading it into the cache if needed."""
+        cache_path = self._cache_path(file_path)
+        if os.path.exists(cache_path):
+            os.utime(cache_path)
+            return os.path.abspath(cache_path)
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(file_path))
+        except Exception as e:
+            if self._is_not_found(e):
+                raise FileNotFoundError(f"Object not found: {file_path}") from e
+            raise
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as buffer:
+                shutil.copyfileobj(response["Body"], buffer, COPY_CHUNK_SIZE)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self._evict_cache(keep=cache_path)
+        return os.path.abspath(cache_path)
+
+    def is_remote(self, file_path: str) -> bool:
+        return not os.path.exists(self._cache_path(file_path))
+
+    def open(self, file_path: str) -> BinaryIO:
+        cache_path = self._cache_path(file_path)
+        if os.path.exists(cache_path):
+            os.utime(cache_path)
+            return open(cache_path, "rb")
+        head = self._head(file_path)
+        if head is None:
+            raise FileNotFoundError(f"Object not found: {file_path}")
+        raw = S3RangeReader(self.client, self.bucket, self._object_key(file_path), head["ContentLength"])
+        return io.BufferedReader(raw, buffer_size=RANGE_BLOCK_SIZE)
+
+    def list_files(self, user_id: str) -> list[str]:
+        names = []
+        paginator = self.client.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._object_key(f"{user_id}/")):
+            names.extend(os.path.basename(obj["Key"]) for obj in page.get("Contents", []))
+        return names
+
+    def delete(self, file_path: str) -> bool:
+        cache_path = self._cache_path(file_path)
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+        if self._head(file_path) is None:
+            return False
+        self.client.delete_object(Bucket=self.bucket, Key=self._object_key(file_path))
+        return True
+
+
+def build_file_storage() -> BaseFileStorage:
+    if settings.STORAGE_BACKEND == "s3":
+        return S3FileStorage(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_PREFIX,
+            cache_dir=settings.STORAGE_CACHE_DIR,
+            cache_max_bytes=settings.STORAGE_CACHE_MAX_BYTES,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region_name=settings.S3_REGION,
+            aws_access_key_id=settings.S3_ACCESS_KEY_ID,
+            aws_secret_access_key=settings.S3_SECRET_ACCESS_KEY
+        )
+    return LocalFileStorage(base_dir=settings.UPLOAD_DIR)
+
+
+# Built on first use, so a bad S3 configuration fails the requests that need storage
+# instead of `import app.main`
+_file_storage: Optional[BaseFileStorage] = None
+_file_storage_lock = threading.Lock()
+
+
+def get_file_storage() -> BaseFileStorage:
+    global _file_storage
+    if _file_storage is None:
+        with _file_storage_lock:
+            if _file_storage is None:
+                _file_storage = build_file_storage()
+    return _file_storage
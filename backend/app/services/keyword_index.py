@@ -0,0 +1,338 @@
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.services.vector_db import get_vector_db
+
+if TYPE_CHECKING:
+    from app.services.cache_generations import CacheGenerations
+
+logger = logging.getLogger(__name__)
+
+# --- Keyword (BM25) Index ---
+# Per-tenant inverted index kept alongside the Chroma collection so exact tokens
+# (SKUs, prices, policy numbers) that embeddings blur together can still be retrieved.
+# Built lazily from Chroma on first query and updated incrementally on ingest/delete;
+# other workers learn about those changes through a per-tenant generation counter
+# (see cache_generations) and rebuild their copy in the background.
+
+# Compound tokens such as "sku-4821", "49.99" or "pol_77/b" are kept whole *and* split
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+_PART_RE = re.compile(r"[a-z0-9]+")
+
+# Backstop for missed invalidations: rebuild from Chroma (in the background) after this long
+INDEX_REFRESH_SECONDS = 300
+# Background threads rebuilding stale indexes
+REBUILD_WORKERS = 2
+# cache_generations scope of the per-tenant invalidation counter
+GENERATION_SCOPE = "keyword_index"
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for match in _TOKEN_RE.findall(text.lower()):
+        tokens.append(match)
+        parts = _PART_RE.findall(match)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a tenant's chunks. Postings map term -> {doc_slot: term_frequency}.
+
+    Ingestion updates an index while queries search it from other threads; every public
+    method holds the index's lock.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._slot_by_id: Dict[str, int] = {}
+        self._ids: Dict[int, str] = {}
+        self._texts: Dict[int, str] = {}
+        self._metadatas: Dict[int, Dict[str, Any]] = {}
+        self._total_length = 0
+        self._next_slot = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._doc_lengths)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        with self._lock:
+            if doc_id in self._slot_by_id:
+                self.remove(doc_id)
+
+            slot = self._next_slot
+            self._next_slot += 1
+            term_counts = Counter(tokenize(text))
+            for term, tf in term_counts.items():
+                self._postings.setdefault(term, {})[slot] = tf
+
+            length = sum(term_counts.values())
+            self._doc_lengths[slot] = length
+            self._doc_terms[slot] = tuple(term_counts)
+            self._slot_by_id[doc_id] = slot
+            self._ids[slot] = doc_id
+            self._texts[slot] = text
+            self._metadatas[slot] = metadata or {}
+            self._total_length += length
+
+    def remove(self, doc_id: str) -> bool:
+        with self._lock:
+            slot = self._slot_by_id.pop(doc_id, None)
+            if slot is None:
+                return False
+
+            for term in self._doc_terms.pop(slot):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(slot, None)
+                    if not postings:
+                        del self._postings[term]
+
+            self._total_length -= self._doc_lengths.pop(slot)
+            del self._ids[slot]
+            del self._texts[slot]
+            del self._metadatas[slot]
+            return True
+
+    def remove_where(self, **metadata: Any) -> int:
+        """Remove every chunk whose metadata matches all given key/value pairs."""
+        with self._lock:
+            doomed = [
+                self._ids[slot] for slot, meta in self._metadatas.items()
+                if all(meta.get(k) == v for k, v in metadata.items())
+            ]
+            for doc_id in doomed:
+                self.remove(doc_id)
+            return len(doomed)
+
+    def get_text(self, doc_id: str) -> Optional[str]:
+        with self._lock:
+            slot = self._slot_by_id.get(doc_id)
+            return self._texts.get(slot) if slot is not None else None
+
+    def get_metadata(self, doc_id: str) -> Dict[str, Any]:
+        with self._lock:
+            slot = self._slot_by_id.get(doc_id)
+            return self._metadatas.get(slot, {}) if slot is not None else {}
+
+    def search(self, query: str, n_results: int = 5) -> List[Tuple[str, float]]:
+        """Return up to n_results (doc_id, score) pairs, best first."""
+        with self._lock:
+            doc_count = len(self._doc_lengths)
+            if doc_count == 0:
+                return []
+
+            avg_length = self._total_length / doc_count
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                df = len(postings)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                for slot, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._doc_lengths[slot] / avg_length)
+                    scores[slot] = scores.get(slot, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+            return [(self._ids[slot], score) for slot, score in ranked]
+
+    def search_chunks(self, query: str, n_results: int = 5) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """`search`, returning (doc_id, text, metadata) read under the same lock."""
+        with self._lock:
+            return [
+                (doc_id, self._texts[self._slot_by_id[doc_id]], self._metadatas[self._slot_by_id[doc_id]])
+                for doc_id, _ in self.search(query, n_results)
+            ]
+
+
+class _TenantIndex:
+    __slots__ = ("index", "generation", "loaded_at")
+
+    def __init__(self, index: BM25Index, generation: int, loaded_at: float):
+        self.index = index
+        self.generation = generation
+        self.loaded_at = loaded_at
+
+
+class KeywordIndexService:
+    """Holds one BM25Index per tenant (user_id), mirrored from the vector store.
+
+    Indexes are kept least-recently-used first and evicted once they hold more than
+    `max_chunks` chunks between them. A tenant's first query builds its index inline;
+    later rebuilds (another worker changed the tenant's documents, or the index is older
+    than INDEX_REFRESH_SECONDS) run in the background while the current index keeps serving.
+    """
+
+    def __init__(self, vector_db=None, generations: Optional["CacheGenerations"] = None,
+                 max_chunks: int = 200_000):
+        self._vector_db = vector_db
+        self.generations = generations
+        self.max_chunks = max_chunks
+        self._indexes: "OrderedDict[str, _TenantIndex]" = OrderedDict()
+        # Tenants whose index is being built, so each is loaded from Chroma once at a time
+        self._building: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def vector_db(self):
+        # Falls back to the shared store, resolved on first use rather than at import
+        return self._vector_db if self._vector_db is not None else get_vector_db()
+
+    def _generation(self, user_id: str) -> Optional[int]:
+        """The tenant's shared generation, or None when it cannot be read."""
+        if self.generations is None:
+            return 0
+        try:
+            return self.generations.current(GENERATION_SCOPE, user_id)
+        except Exception as e:
+            logger.warning("Could not read keyword index generation for %s: %s", user_id, e)
+            return None
+
+    def publish(self, user_id: str) -> None:
+        """Tell the other workers their copy of the tenant's index is stale."""
+        if self.generations is None:
+            return
+        try:
+            generation = self.generations.bump(GENERATION_SCOPE, user_id)
+        except Exception as e:
+            # Other workers catch up when their index reaches INDEX_REFRESH_SECONDS
+            logger.warning("Could not publish keyword index change for %s: %s", user_id, e)
+            return
+        with self._lock:
+            entry = self._indexes.get(user_id)
+            # Only adopt the new generation if no other worker's change slipped in between
+            if entry is not None and entry.generation == generation - 1:
+                entry.generation = generation
+
+    def _load(self, user_id: str) -> _TenantIndex:
+        # Read the generation first: changes published during the load trigger another rebuild
+        generation = self._generation(user_id)
+        index = BM25Index()
+        data = self.vector_db.get(where={"user_id": user_id})
+        for doc_id, text, metadata in zip(data["ids"], data["documents"], data["metadatas"]):
+            index.add(doc_id, text or "", metadata)
+        return _TenantIndex(index, generation or 0, time.monotonic())
+
+    def _build(self, user_id: str, future: Future) -> None:
+        try:
+            entry = self._load(user_id)
+        except BaseException as e:
+            with self._lock:
+                self._building.pop(user_id, None)
+            future.set_exception(e)
+            return
+        with self._lock:
+            self._building.pop(user_id, None)
+            self._indexes[user_id] = entry
+            self._indexes.move_to_end(user_id)
+            self._evict(keep=user_id)
+        future.set_result(entry)
+
+    def _start_build(self, user_id: str) -> Tuple[Future, bool]:
+        """The tenant's in-flight build, and whether the caller must run it. Call under the lock."""
+        future = self._building.get(user_id)
+        if future is not None:
+            return future, False
+        future = Future()
+        self._building[user_id] = future
+        return future, True
+
+    def _rebuild_in_background(self, user_id: str) -> None:
+        with self._lock:
+            future, owner = self._start_build(user_id)
+            if not owner:
+                return
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=REBUILD_WORKERS, thread_name_prefix="keyword-index")
+        self._executor.submit(self._build, user_id, future)
+        future.add_done_callback(self._log_failed_rebuild(user_id))
+
+    @staticmethod
+    def _log_failed_rebuild(user_id: str):
+        def callback(future: Future) -> None:
+            if future.exception() is not None:
+                logger.warning("Keyword index rebuild failed for %s: %s", user_id, future.exception())
+        return callback
+
+    def _evict(self, keep: str) -> None:
+        """Drop least recently used tenants until the cap holds. Call under the lock."""
+        total = sum(len(entry.index) for entry in self._indexes.values())
+        for user_id in list(self._indexes):
+            if total <= self.max_chunks:
+                break
+            if user_id == keep:
+                continue
+            total -= len(self._indexes.pop(user_id).index)
+            logger.debug("Evicted keyword index for %s", user_id)
+
+    def get_index(self, user_id: str) -> BM25Index:
+        generation = self._generation(user_id)
+        with self._lock:
+            entry = self._indexes.get(user_id)
+            if entry is not None:
+                self._indexes.move_to_end(user_id)
+            else:
+                future, owner = self._start_build(user_id)
+        if entry is None:
+            # Nothing to serve yet: build inline (concurrent queries wait for the same build)
+            if owner:
+                self._build(user_id, future)
+            return future.result().index
+
+        stale = generation is not None and entry.generation < generation
+        if stale or time.monotonic() - entry.loaded_at > INDEX_REFRESH_SECONDS:
+            self._rebuild_in_background(user_id)
+        return entry.index
+
+    # add_documents/delete_ids only update this worker's copy: ingestion calls them per batch
+    # and then `publish`es once, so other workers rebuild once per document, not per batch.
+
+    def add_documents(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str]) -> None:
+        # Tenants not loaded yet will pick these up from Chroma on first query
+        for doc_id, text, metadata in zip(ids, documents, metadatas):
+            with self._lock:
+                entry = self._indexes.get(metadata.get("user_id"))
+            if entry is not None:
+                entry.index.add(doc_id, text, metadata)
+
+    def delete(self, user_id: str, **metadata: Any) -> None:
+        with self._lock:
+            entry = self._indexes.get(user_id)
+        if entry is not None:
+            entry.index.remove_where(**metadata)
+        self.publish(user_id)
+
+    def delete_ids(self, user_id: str, ids: List[str]) -> None:
+        with self._lock:
+            entry = self._indexes.get(user_id)
+        if entry is not None:
+            for doc_id in ids:
+                entry.index.remove(doc_id)
+
+    def search(self, user_id: str, query: str, n_results: int = 5) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """Return up to n_results (doc_id, text, metadata) triples for the tenant, best first."""
+        return self.get_index(user_id).search_chunks(query, n_results)
+
+
+def get_keyword_index() -> KeywordIndexService:
+    from app.services.cache_generations import cache_generations
+
+    return KeywordIndexService(generations=cache_generations, max_chunks=settings.KEYWORD_INDEX_MAX_CHUNKS)
+
+
+keyword_index = get_keyword_index()
@@ -0,0 +1,343 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from app.core.config import settings
+from app.core.metrics import Gauge, message_log_batch, message_log_flushes, registry
+from app.models.widget import GuestMessage
+from app.utils.dates import as_utc
+
+logger = logging.getLogger(__name__)
+
+# --- Message Log ---
+# guest_messages is append-only, so a chat turn does not need its own INSERT + COMMIT +
+# SELECT per message. Messages are appended to an in-memory buffer and to a local
+# write-ahead file (one line each) and returned at once; a background task writes the
+# buffer with one multi-row INSERT per flush and then deletes the WAL segments it covered.
+# If the worker dies, the next worker to start replays leftover segments. Message ids
+# are generated here, so a replayed message that was already written is skipped.
+# Reads merge the persisted rows with this worker's unflushed messages.
+
+_messages = GuestMessage.__table__
+
+
+@dataclass
+class MessageEvent:
+    """A guest or AI message, shaped like a GuestMessage row (GuestMessageSchema validates both)."""
+
+    id: str
+    guest_id: str
+    session_id: str
+    sender: str
+    message_text: str
+    created_at: datetime
+
+    def to_json(self) -> str:
+        return json.dumps({**asdict(self), "created_at": self.created_at.isoformat()})
+
+    @classmethod
+    def from_json(cls, line: str) -> "MessageEvent":
+        data = json.loads(line)
+        data["created_at"] = datetime.fromisoformat(data["created_at"])
+        return cls(**data)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class MessageLog:
+    def __init__(self, session_factory: Callable, wal_dir: str, flush_interval: float = 0.2,
+                 max_buffer: int = 1000, fsync: bool = False):
+        self.session_factory = session_factory
+        self.wal_dir = wal_dir
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.fsync = fsync
+        self._buffer: List[MessageEvent] = []
+        # The batch being written, kept readable until it is committed
+        self._flushing: List[MessageEvent] = []
+        # Segments whose messages are not committed yet; deleted after the next successful flush
+        self._sealed: List[str] = []
+        self._fd: Optional[int] = None
+        self._segment: Optional[str] = None
+        self._sequence = 0
+        # Distinguishes our segments from a previous process that had the same pid
+        self._instance = uuid.uuid4().hex[:8]
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    # --- Writing ---
+
+    def append(self, guest_id: str, session_id: str, sender: str, message_text: str) -> MessageEvent:
+        """Record a message and return it; it is durable once this returns (WAL line written)."""
+        event = MessageEvent(
+            id=str(uuid.uuid4()),
+            guest_id=guest_id,
+            session_id=session_id,
+            sender=sender,
+            message_text=message_text,
+            created_at=datetime.now(timezone.utc),
+        )
+        line = (event.to_json() + "\n").encode()
+        with self._lock:
+            if self._fd is None:
+                self._open_segment()
+            os.write(self._fd, line)
+            if self.fsync:
+                os.fsync(self._fd)
+            self._buffer.append(event)
+            full = len(self._buffer) >= self.max_buffer
+        self._schedule(full)
+        return event
+
+    def _open_segment(self) -> None:
+        os.makedirs(self.wal_dir, exist_ok=True)
+        self._sequence += 1
+        self._segment = os.path.join(self.wal_dir, f"{os.getpid()}-{self._instance}-{self._sequence:08d}.wal")
+        self._fd = os.open(self._segment, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+
+    def _seal_segment(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._sealed.append(self._segment)
+            self._fd = self._segment = None
+
+    def _insert(self, db, events: List[MessageEvent]) -> None:
+        rows = [asdict(event) for event in events]
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            db.execute(_messages.insert(), rows)
+            return
+        # Replays after a crash may repeat messages that were already committed. No conflict
+        # target: on partitioned Postgres the unique key is (id, created_at), not id alone.
+        db.execute(insert(_messages).on_conflict_do_nothing(), rows)
+
+    def flush(self) -> int:
+        """Write the buffered messages in one statement; returns how many. Blocking."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                self._flushing = batch
+                self._seal_segment()
+                segments = list(self._sealed)
+            if not batch:
+                self._delete(segments)
+                return 0
+            db = self.session_factory()
+            try:
+                self._insert(db, batch)
+                db.commit()
+            except Exception:
+                db.rollback()
+                with self._lock:
+                    # Back in front of anything appended meanwhile; the WAL segments stay on disk
+                    self._buffer[:0] = batch
+                    self._flushing = []
+                message_log_flushes.inc(outcome="error")
+                raise
+            finally:
+                db.close()
+            with self._lock:
+                self._flushing = []
+            self._delete(segments)
+            message_log_flushes.inc(outcome="ok")
+            message_log_batch.observe(len(batch))
+            return len(batch)
+
+    def _delete(self, segments: List[str]) -> None:
+        for path in segments:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        with self._lock:
+            self._sealed = [path for path in self._sealed if path not in segments]
+
+    def recover(self) -> int:
+        """Write messages left in WAL segments by workers that are gone; returns how many.
+
+        Every worker runs this at startup, so each segment is claimed by renaming it first:
+        the workers that lose the rename skip it. A segment whose replay fails is put back
+        for the next worker to start.
+        """
+        if not os.path.isdir(self.wal_dir):
+            return 0
+        recovered = 0
+        for name in sorted(os.listdir(self.wal_dir)):
+            segment = self._orphaned_segment(name)
+            if segment is None:
+                continue
+            path = os.path.join(self.wal_dir, name)
+            claimed = os.path.join(self.wal_dir, f"{segment}.{os.getpid()}.recovering")
+            try:
+                os.rename(path, claimed)
+            except FileNotFoundError:
+                continue  # another worker claimed it first
+            try:
+                count = self._replay(claimed)
+            except Exception as e:
+                logger.error("Could not replay WAL segment %s, keeping it for the next start: %s", segment, e)
+                os.replace(claimed, os.path.join(self.wal_dir, segment))
+                continue
+            os.remove(claimed)
+            recovered += count
+        if recovered:
+            logger.info("Recovered %d chat messages from the write-ahead log", recovered)
+        return recovered
+
+    def _orphaned_segment(self, name: str) -> Optional[str]:
+        """The segment name if `name` is a segment no live worker owns, else None."""
+        if name.endswith(".recovering"):
+            # Claimed by a worker that died mid-replay (or by an earlier process with our pid)
+            segment, claimer, _ = name.rsplit(".", 2)
+            if int(claimer) != os.getpid() and _pid_alive(int(claimer)):
+                return None
+            return segment
+        if not name.endswith(".wal"):
+            return None
+        pid, instance = name.split("-")[:2]
+        if int(pid) == os.getpid():
+            # A container restart can reuse our pid: only our own instance's segments are live
+            return None if instance == self._instance else name
+        return None if _pid_alive(int(pid)) else name
+
+    def _replay(self, path: str) -> int:
+        events = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    events.append(MessageEvent.from_json(line))
+                except (ValueError, TypeError, KeyError):
+                    # A torn final line from a crash mid-write; the message never got a reply
+                    logger.warning("Skipping unreadable WAL line in %s", os.path.basename(path))
+        if events:
+            db = self.session_factory()
+            try:
+                self._insert(db, events)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+        return len(events)
+
+    # --- Reading ---
+
+    def _pending(self, predicate: Callable[[MessageEvent], bool]) -> List[MessageEvent]:
+        with self._lock:
+            return [event for event in self._flushing + self._buffer if predicate(event)]
+
+    def _merge(self, pending: List[MessageEvent], persisted: list) -> list:
+        if not pending:
+            return persisted
+        seen = {message.id for message in persisted}
+        merged = persisted + [event for event in pending if event.id not in seen]
+        merged.sort(key=lambda message: as_utc(message.created_at))
+        return merged
+
+    def for_session(self, db, session_id: str, since: Optional[datetime] = None) -> list:
+        """Messages of a session in order, including ones not flushed yet.
+
+        Pass the session's created_at as `since` when known: no message predates its session,
+        and on partitioned Postgres it keeps older monthly partitions out of the scan.
+        """
+        # Snapshot the buffer first: a message flushed in between is then found in the table
+        pending = self._pending(lambda event: event.session_id == session_id)
+        query = db.query(GuestMessage).filter(GuestMessage.session_id == session_id)
+        if since is not None:
+            query = query.filter(GuestMessage.created_at >= since)
+        persisted = query.order_by(GuestMessage.created_at).all()
+        return self._merge(pending, persisted)
+
+    def for_guest(self, db, guest_id: str) -> list:
+        """All of a guest's messages in order, including ones not flushed yet."""
+        pending = self._pending(lambda event: event.guest_id == guest_id)
+        persisted = db.query(GuestMessage).filter(GuestMessage.guest_id == guest_id).order_by(GuestMessage.created_at).all()
+        return self._merge(pending, persisted)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._buffer) + len(self._flushing)
+
+    # --- Background task ---
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write whatever is still buffered."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self._flush_logged)
+
+    def _schedule(self, full: bool) -> None:
+        try:
+            self.start()
+        except RuntimeError:
+            return  # no running loop (scripts, sync tests): flushed by an explicit flush()
+        if full:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await asyncio.to_thread(self._flush_logged)
+
+    def _flush_logged(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning("Message log flush failed, will retry: %s", e)
+
+
+def get_message_log() -> MessageLog:
+    from app.db.session import SessionLocal
+
+    return MessageLog(
+        SessionLocal,
+        wal_dir=settings.MESSAGE_LOG_DIR,
+        flush_interval=settings.MESSAGE_LOG_FLUSH_SECONDS,
+        max_buffer=settings.MESSAGE_LOG_MAX_BUFFER,
+        fsync=settings.MESSAGE_LOG_FSYNC,
+    )
+
+
+message_log = get_message_log()
+
+registry.register(Gauge(
+    "taimako_message_log_pending", "Chat messages buffered (and in the WAL) but not yet in the database",
+    callback=message_log.pending,
+))
@@ -1,47 +1,268 @@
+import logging
 import uuid
 import os
 import shutil
-from typing import List
+import itertools
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Iterable, List, Optional, Tuple
 from fastapi import UploadFile
-from pypdf import PdfReader
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
 import io
-from app.services.vector_db import vector_db
+from app.services.vector_db import get_vector_db
 from app.utils.text_splitter import recursive_character_text_splitter
 from app.utils.text_splitter import recursive_character_text_splitter
 from app.schemas.document import IngestResponse
 
 from sqlalchemy.orm import Session
-from app.services.vector_db import vector_db
-from app.utils.text_splitter import recursive_character_text_splitter
+from app.services.vector_db import get_vector_db
+from app.utils.text_splitter import recursive_character_text_splitter, iter_text_chunks
+from app.utils.document_reader import iter_text_blocks
+from app.services.extractors import extraction_pool
 from app.schemas.document import IngestResponse
 from app.models.document import Document
-from app.services.file_storage import file_storage
+from app.services.file_storage import get_file_storage, StorageQuotaExceeded
+from app.core.config import settings
+from app.core.tracing import tracer
+from app.core.metrics import retrieval_duration, retrieval_results
+from app.services.agent_system.response_cache import response_cache
+from app.services.keyword_index import keyword_index
+from app.utils.similarity import reciprocal_rank_fusion
+from app.utils.hashing import HashingReader, sha256_text
 import os
 import uuid
-from pypdf import PdfReader
+
+logger = logging.getLogger(__name__)
+
+# Chunks embedded and written to the vector store per call during ingestion
+EMBED_BATCH_SIZE = 64
+# Each retriever contributes this many candidates per requested result before fusion
+HYBRID_CANDIDATE_MULTIPLIER = 4
 
 class RAGService:
     def __init__(self):
-        self.vector_db = vector_db
-        self.file_storage = file_storage
+        self._vector_db = None
+        self._file_storage = None
+        self.keyword_index = keyword_index
+        self.extraction_pool = extraction_pool
+
+    @property
+    def vector_db(self):
+        # Chroma is opened on first use so importing this module stays cheap
+        return self._vector_db if self._vector_db is not None else get_vector_db()
+
+    @vector_db.setter
+    def vector_db(self, value):
+        self._vector_db = value
+
+    @property
+    def file_storage(self):
+        # Built on first use too: a misconfigured backend must not break importing the app
+        return self._file_storage if self._file_storage is not None else get_file_storage()
+
+    @file_storage.setter
+    def file_storage(self, value):
+        self._file_storage = value
+
+    def storage_used(self, user_id: str, db: Session, exclude_document_id: str = None) -> int:
+        """Bytes counted against a tenant's quota, optionally ignoring a document about to be replaced."""
+        q = db.query(func.coalesce(func.sum(Document.size_bytes), 0)).filter(Document.user_id == user_id)
+        if exclude_document_id is not None:
+            q = q.filter(Document.id != exclude_document_id)
+        return int(q.scalar() or 0)
+
+    @staticmethod
+    def _replaced_document(user_id: str, filename: str, db: Session) -> Optional[Document]:
+        """The document a re-upload of `filename` updates (the newest one with that name)."""
+        return db.query(Document).filter(
+            Document.user_id == user_id,
+            Document.filename == filename
+        ).order_by(Document.created_at.desc()).first()
 
     async def upload_document(self, file: UploadFile, user_id: str, db: Session) -> str:
-        # Save to file storage
-        file_path = self.file_storage.save(file.file, file.filename, user_id)
-        
-        # Save to DB
-        doc = Document(
-            user_id=user_id,
-            filename=file.filename,
-            file_path=file_path,
-            status="pending"
+        """
+        Stream an upload into storage and register (or update) its Document.
+
+        The copy runs in a worker thread, so several uploads can stream concurrently
+        without blocking the event loop. The bytes are hashed as they are copied, and the
+        copy is cut off once it passes MAX_UPLOAD_BYTES or the tenant's remaining quota.
+
+        Raises:
+            ReadLimitExceeded: the file is larger than the per-file limit or remaining quota
+            StorageQuotaExceeded: the tenant has no quota left for this file
+        """
+        replaced = self._replaced_document(user_id, file.filename, db)
+        remaining = settings.STORAGE_QUOTA_BYTES - self.storage_used(
+            user_id, db, exclude_document_id=replaced.id if replaced else None
         )
-        db.add(doc)
-        db.commit()
+        if remaining <= 0:
+            raise StorageQuotaExceeded("Storage quota exhausted")
+        
+        # Save to file storage, hashing the bytes as they are copied
+        reader = HashingReader(file.file, max_bytes=min(settings.MAX_UPLOAD_BYTES, remaining))
+        file_path = await run_in_threadpool(self.file_storage.save, reader, file.filename, user_id)
+        content_hash = reader.hexdigest()
+        size_bytes = reader.bytes_read
+        
+        # No awaits past this point: concurrent uploads sharing this session run their
+        # quota check and DB writes one at a time.
+        # Re-uploading a filename updates its existing document so re-ingestion can diff chunks
+        doc = self._replaced_document(user_id, file.filename, db)
+        used = self.storage_used(user_id, db, exclude_document_id=doc.id if doc else None)
+        if used + size_bytes > settings.STORAGE_QUOTA_BYTES:
+            self._delete_file_if_unreferenced(file_path, db)
+            raise StorageQuotaExceeded("Storage quota exceeded")
+        
+        if doc and doc.content_hash == content_hash and doc.status != "error":
+            # Identical content: nothing to store or re-embed
+            if doc.size_bytes is None:
+                doc.size_bytes = size_bytes
+                db.commit()
+            return doc.filename
+        
+        if doc:
+            previous_path = doc.file_path
+            doc.file_path = file_path
+            doc.content_hash = content_hash
+            doc.size_bytes = size_bytes
+            doc.status = "pending"
+            doc.error_message = None
+            db.commit()
+            if previous_path != file_path:
+                self._delete_file_if_unreferenced(previous_path, db)
+        else:
+            # Save to DB
+            doc = Document(
+                user_id=user_id,
+                filename=file.filename,
+                file_path=file_path,
+                content_hash=content_hash,
+                size_bytes=size_bytes,
+                status="pending"
+            )
+            db.add(doc)
+            db.commit()
         db.refresh(doc)
         
         return doc.filename
 
+    def _delete_file_if_unreferenced(self, file_path: str, db: Session) -> None:
+        # Content-addressed files can be shared by several documents
+        if db.query(Document).filter(Document.file_path == file_path).first():
+            return
+        try:
+            self.file_storage.delete(file_path)
+        except Exception:
+            # Continue even if file delete fails (maybe already gone)
+            pass
+
+    def _document_chunks(self, doc: Document, user_id: str) -> Tuple[List[str], List[dict]]:
+        """
+        (ids, metadatas) of `doc`'s chunks in the vector store. Several documents can share a
+        filename, so chunks are matched on their `document_id`; chunks written before they
+        carried one are recognised by their "<document id>-<hash>" id (or, from before
+        content hashing, by the filename alone).
+        """
+        found = self.vector_db.get(
+            where={"$and": [{"filename": doc.filename}, {"user_id": user_id}]},
+            include=["metadatas"]
+        )
+        ids, metadatas = [], []
+        for chunk_id, metadata in zip(found["ids"], found["metadatas"]):
+            metadata = metadata or {}
+            owner = metadata.get("document_id")
+            if owner == doc.id or (
+                owner is None and (chunk_id.startswith(f"{doc.id}-") or "chunk_hash" not in metadata)
+            ):
+                ids.append(chunk_id)
+                metadatas.append(metadata)
+        return ids, metadatas
+
+    def _sync_chunks(self, doc: Document, chunks: Iterable[str], user_id: str) -> tuple:
+        """
+        Incrementally bring the vector store in line with a document's new chunks.
+        Chunks are keyed by SHA-256 of their text: unchanged chunks keep their embeddings
+        (only `chunk_index` metadata is updated), new ones are embedded, removed ones deleted.
+        Chunks from before content hashing have no `chunk_hash` and are replaced once.
+        `chunks` may be a generator; it is consumed in EMBED_BATCH_SIZE batches.
+
+        Returns:
+            (added, unchanged, deleted) chunk counts
+        """
+        existing_by_hash = {}
+        stale_ids = []
+        for chunk_id, metadata in zip(*self._document_chunks(doc, user_id)):
+            chunk_hash = metadata.get("chunk_hash")
+            if chunk_hash and chunk_hash not in existing_by_hash:
+                existing_by_hash[chunk_hash] = (chunk_id, metadata)
+            else:
+                stale_ids.append(chunk_id)
+        
+        new_chunks, new_ids, new_metadatas = [], [], []
+        moved_chunks, moved_ids, moved_metadatas = [], [], []
+        added = 0
+        seen = set()
+        changed = False
+        
+        def flush():
+            nonlocal new_chunks, new_ids, new_metadatas, moved_chunks, moved_ids, moved_metadatas, changed
+            if moved_ids:
+                self.vector_db.update_metadatas(ids=moved_ids, metadatas=moved_metadatas)
+            if new_chunks:
+                self.vector_db.add_documents(documents=new_chunks, metadatas=new_metadatas, ids=new_ids)
+            if new_chunks or moved_chunks:
+                changed = True
+                self.keyword_index.add_documents(
+                    documents=new_chunks + moved_chunks,
+                    metadatas=new_metadatas + moved_metadatas,
+                    ids=new_ids + moved_ids
+                )
+            # Fresh lists: the previous batch may still be referenced by the stores
+            new_chunks, new_ids, new_metadatas = [], [], []
+            moved_chunks, moved_ids, moved_metadatas = [], [], []
+        
+        try:
+            for i, chunk in enumerate(chunks):
+                chunk_hash = sha256_text(chunk)
+                if chunk_hash in seen:
+                    # Repeated boilerplate adds nothing to retrieval
+                    continue
+                seen.add(chunk_hash)
+                # Embed chunks with user_id metadata for filtering
+                metadata = {
+                    "filename": doc.filename, "chunk_index": i, "user_id": user_id,
+                    "chunk_hash": chunk_hash, "document_id": doc.id,
+                }
+                if chunk_hash in existing_by_hash:
+                    chunk_id, old_metadata = existing_by_hash.pop(chunk_hash)
+                    # Also tags chunks written before they carried document_id
+                    if old_metadata.get("chunk_index") != i or old_metadata.get("document_id") != doc.id:
+                        moved_chunks.append(chunk)
+                        moved_ids.append(chunk_id)
+                        moved_metadatas.append(metadata)
+                else:
+                    new_chunks.append(chunk)
+                    new_ids.append(f"{doc.id}-{chunk_hash}")
+                    new_metadatas.append(metadata)
+                    added += 1
+                if len(new_chunks) + len(moved_chunks) >= EMBED_BATCH_SIZE:
+                    flush()
+            flush()
+        
+            stale_ids.extend(chunk_id for chunk_id, _ in existing_by_hash.values())
+            if stale_ids:
+                changed = True
+                self.vector_db.delete(ids=stale_ids)
+                self.keyword_index.delete_ids(user_id, stale_ids)
+        finally:
+            # Other workers' keyword indexes rebuild once per document, even after a partial sync
+            if changed:
+                self.keyword_index.publish(user_id)
+        
+        return added, len(seen) - added, len(stale_ids)
+
     def process_documents(self, user_id: str, db: Session) -> List[IngestResponse]:
         results = []
         # Fetch pending documents for user
@@ -50,38 +271,55 @@ class RAGService:
             Document.status == "pending"
         ).all()
         
-        for doc in documents:
+        # Extraction runs in worker processes a few documents ahead of embedding
+        window = max(1, self.extraction_pool.max_workers) * 2
+        extractions = deque()
+        
+        def submit(doc):
             try:
-                text = ""
-                full_path = self.file_storage.get_full_path(doc.file_path)
-                
-                if not os.path.exists(full_path):
-                     raise FileNotFoundError(f"File not found at {full_path}")
-
-                if doc.filename.endswith(".pdf"):
-                    reader = PdfReader(full_path)
-                    for page in reader.pages:
-                        text += page.extract_text() + "\n"
+                if self.file_storage.is_remote(doc.file_path):
+                    # Not on this node: PDFs are parsed from ranged reads, not downloaded
+                    future = self.extraction_pool.submit_stored(doc.file_path, doc.filename)
                 else:
-                    with open(full_path, "r", encoding="utf-8") as f:
-                        text = f.read()
-                
-                chunks = recursive_character_text_splitter(text)
-                ids = [str(uuid.uuid4()) for _ in chunks]
-                # Embed chunks with user_id metadata for filtering
-                metadatas = [{"filename": doc.filename, "chunk_index": i, "user_id": user_id} for i in range(len(chunks))]
-                
-                if chunks:
-                    self.vector_db.add_documents(documents=chunks, metadatas=metadatas, ids=ids)
+                    full_path = self.file_storage.get_full_path(doc.file_path)
+                    if not os.path.exists(full_path):
+                         raise FileNotFoundError(f"File not found at {full_path}")
+                    future = self.extraction_pool.submit(full_path, doc.filename)
+            except Exception as e:
+                future = Future()
+                future.set_exception(e)
+            extractions.append((doc, future))
+        
+        remaining = iter(documents)
+        for doc in itertools.islice(remaining, window):
+            submit(doc)
+        
+        while extractions:
+            doc, future = extractions.popleft()
+            next_doc = next(remaining, None)
+            if next_doc is not None:
+                submit(next_doc)
+            try:
+                extracted = future.result()
+                try:
+                    # Chunks are streamed from the text into embedding batches, so memory is
+                    # bounded by the batch size rather than the document size
+                    chunks = iter_text_chunks(iter_text_blocks(extracted.path))
+                    added, unchanged, deleted = self._sync_chunks(doc, chunks, user_id)
+                finally:
+                    if extracted.temporary:
+                        os.remove(extracted.path)
                 
                 doc.status = "processed"
                 results.append(IngestResponse(
                     filename=doc.filename,
-                    chunks_created=len(chunks),
+                    chunks_created=added,
+                    chunks_unchanged=unchanged,
+                    chunks_deleted=deleted,
                     status="success"
                 ))
             except Exception as e:
-                print(f"Error processing {doc.filename}: {e}")
+                logger.exception("Error processing %s: %s", doc.filename, e)
                 doc.status = "error"
                 doc.error_message = str(e)
                 results.append(IngestResponse(
@@ -91,6 +329,9 @@ class RAGService:
                 ))
         
         db.commit()
+        if documents:
+            # Knowledge base changed, cached answers may be stale
+            response_cache.invalidate(user_id)
         return results
 
     def list_documents(self, user_id: str, db: Session) -> List[dict]:
@@ -107,36 +348,69 @@ class RAGService:
             for doc in docs
         ]
 
-    def query(self, text: str, user_id: str) -> List[str]:
+    @tracer.start_as_current_span("rag.query_chunks")
+    def query_chunks(self, text: str, user_id: str, n_results: int = 5) -> List[dict]:
+        """
+        Hybrid retrieval: Chroma vector similarity + per-tenant BM25, fused with
+        reciprocal rank fusion. BM25 catches exact tokens (SKUs, prices, policy numbers)
+        that embeddings rank poorly.
+
+        Returns:
+            Up to n_results {"id", "text", "metadata"} dicts, most relevant first
+        """
+        candidates = n_results * HYBRID_CANDIDATE_MULTIPLIER
+        chunks = {}
+
         # Query with user_id filter
-        results = self.vector_db.query(text, where={"user_id": user_id})
-        if results and results['documents']:
-            return results['documents'][0]
-        if results and results['documents']:
-            return results['documents'][0]
-        return []
+        vector_ids = []
+        results = self.vector_db.query(text, n_results=candidates, where={"user_id": user_id})
+        if results and results['documents'] and results['documents'][0]:
+            vector_ids = list(results['ids'][0])
+            metadatas = (results.get('metadatas') or [None])[0] or [{}] * len(vector_ids)
+            for doc_id, doc_text, metadata in zip(vector_ids, results['documents'][0], metadatas):
+                chunks[doc_id] = {"id": doc_id, "text": doc_text, "metadata": metadata or {}}
+
+        keyword_ids = []
+        try:
+            with tracer.start_as_current_span("rag.keyword_search"):
+                started = time.perf_counter()
+                for doc_id, doc_text, metadata in self.keyword_index.search(user_id, text, n_results=candidates):
+                    keyword_ids.append(doc_id)
+                    chunks.setdefault(doc_id, {"id": doc_id, "text": doc_text, "metadata": metadata})
+                retrieval_duration.observe(time.perf_counter() - started, retriever="keyword")
+                retrieval_results.observe(len(keyword_ids), retriever="keyword")
+        except Exception as e:
+            # Keyword retrieval is additive; fall back to vector-only results
+            logger.warning("Keyword index search failed for %s: %s", user_id, e)
+
+        if not keyword_ids:
+            return [chunks[doc_id] for doc_id in vector_ids[:n_results]]
+
+        fused = reciprocal_rank_fusion([vector_ids, keyword_ids])
+        return [chunks[doc_id] for doc_id in fused[:n_results]]
+
+    def query(self, text: str, user_id: str, n_results: int = 5) -> List[str]:
+        return [chunk["text"] for chunk in self.query_chunks(text, user_id, n_results)]
 
     def delete_document(self, document_id: str, user_id: str, db: Session) -> bool:
         doc = db.query(Document).filter(Document.id == document_id, Document.user_id == user_id).first()
         if not doc:
             return False
             
-        # Delete from Chroma
-        # Delete from Chroma
-        # Using $and operator for multiple conditions as required by newer Chroma versions
-        self.vector_db.delete(where={"$and": [{"filename": doc.filename}, {"user_id": user_id}]})
-        
-        # Delete file
-        try:
-            self.file_storage.delete(doc.file_path)
-        except Exception:
-            # Continue even if file delete fails (maybe already gone)
-            pass
+        # Delete this document's chunks by id: another document may have the same filename
+        chunk_ids, _ = self._document_chunks(doc, user_id)
+        if chunk_ids:
+            self.vector_db.delete(ids=chunk_ids)
+            self.keyword_index.delete_ids(user_id, chunk_ids)
+            self.keyword_index.publish(user_id)
         
-        # Delete from DB
+        # Delete from DB, then the file unless another document shares its content
+        file_path = doc.file_path
         db.delete(doc)
         db.commit()
+        self._delete_file_if_unreferenced(file_path, db)
         
+        response_cache.invalidate(user_id)
         return True
 
 rag_service = RAGService()
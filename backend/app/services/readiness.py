@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.metrics import Gauge, registry
+from app.core.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# --- Readiness ---
+# /health only says the process is up. /ready says this worker has already paid the
+# cold-start costs (Chroma open, embedding model load, DB connections, ADK import), so a
+# load balancer can keep chat traffic away until the first turn is as fast as the rest.
+# Warm-up runs in the background from the lifespan handler; /health stays instant.
+# A failed component is retried with exponential backoff until it succeeds, so a transient
+# failure at boot (database restarting, model download hiccup) does not leave /ready at 503.
+# A thread cannot be cancelled, so a step that times out keeps running; its retries wait
+# for that attempt instead of starting another thread beside it.
+
+PENDING = "pending"
+OK = "ok"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+# (component name, blocking warm-up returning optional detail)
+WarmupStep = Tuple[str, Callable[[], Optional[Dict[str, Any]]]]
+
+
+def warm_database() -> Dict[str, Any]:
+    """Open up to pool_size connections at once so the pool is full before traffic arrives."""
+    from app.db.session import engine
+
+    size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    connections = []
+    try:
+        for _ in range(max(size, 1)):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.execute(text("SELECT 1"))
+    finally:
+        for connection in connections:
+            connection.close()
+    return {"connections": len(connections)}
+
+
+def warm_vector_db() -> Dict[str, Any]:
+    from app.services.vector_db import get_vector_db
+
+    vector_db = get_vector_db()
+    vector_db.client.heartbeat()
+    return {"chunks": vector_db.collection.count()}
+
+
+def warm_embeddings() -> Dict[str, Any]:
+    from app.services.vector_db import get_vector_db
+    from app.services.agent_system.intent_router import intent_router
+
+    dimensions = len(get_vector_db().embed(["warm-up"])[0])
+    intent_router.warm_up()
+    return {"dimensions": dimensions}
+
+
+def warm_agent() -> None:
+    # Imports google.adk/litellm and builds (but never runs) an agent; no LLM call is made
+    from google.adk.runners import Runner
+    from app.services.agent_system.agent_factory import AgentFactory
+    from app.services.agent_system.service import get_session_service, session_exists
+
+    agent = AgentFactory.create_rag_agent("warmup", api_key="warmup")
+    Runner(agent=agent, app_name="warmup", session_service=get_session_service())
+    # One query through the ADK session engine opens its first connection
+    session_exists("warmup", "warmup", "warmup")
+
+
+DEFAULT_STEPS: List[WarmupStep] = [
+    ("database", warm_database),
+    ("vector_db", warm_vector_db),
+    ("embeddings", warm_embeddings),
+    ("agent", warm_agent),
+]
+
+
+class Readiness:
+    """Runs warm-up steps concurrently in threads and records per-component status and timing."""
+
+    def __init__(self, steps: List[WarmupStep], timeout: float = 300.0,
+                 retry_base: float = 1.0, retry_max: float = 60.0):
+        self.steps = steps
+        self.timeout = timeout
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.components: Dict[str, Dict[str, Any]] = {name: {"status": PENDING} for name, _ in steps}
+        self._task: Optional[asyncio.Task] = None
+        # Per component, the attempt still running in its thread after a timeout
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    @property
+    def ready(self) -> bool:
+        return all(c["status"] in (OK, SKIPPED) for c in self.components.values())
+
+    def skip(self) -> None:
+        for component in self.components.values():
+            component["status"] = SKIPPED
+
+    async def _run_step(self, name: str, step: Callable[[], Optional[Dict[str, Any]]], attempt: int = 1) -> bool:
+        started = time.perf_counter()
+        try:
+            with tracer.start_as_current_span(f"warmup.{name}"):
+                detail = await self._attempt(name, step)
+        except asyncio.TimeoutError:
+            status, error, detail = FAILED, f"timed out after {self.timeout:g}s", None
+        except Exception as e:
+            status, error, detail = FAILED, f"{type(e).__name__}: {e}", None
+        else:
+            status, error = OK, None
+
+        component = {"status": status, "seconds": round(time.perf_counter() - started, 3)}
+        if attempt > 1:
+            component["attempts"] = attempt
+        if error:
+            component["error"] = error
+            logger.warning("Warm-up of %s failed (attempt %d): %s", name, attempt, error)
+        else:
+            logger.info("Warm-up of %s finished in %.2fs", name, component["seconds"])
+        if detail:
+            component.update(detail)
+        self.components[name] = component
+        return status == OK
+
+    async def _attempt(self, name: str, step: Callable[[], Optional[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        """Wait up to `timeout` for the step, rejoining the previous attempt if it is still running."""
+        future = self._in_flight.get(name)
+        if future is None:
+            future = self._in_flight[name] = asyncio.ensure_future(asyncio.to_thread(step))
+        # Shielded: a timeout stops the wait, not the thread, which is kept for the next attempt
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.timeout)
+        finally:
+            if future.done():
+                del self._in_flight[name]
+
+    async def _run_step_until_ok(self, name: str, step: Callable[[], Optional[Dict[str, Any]]]) -> None:
+        attempt = 1
+        delay = self.retry_base
+        while not await self._run_step(name, step, attempt):
+            await asyncio.sleep(delay)
+            attempt += 1
+            delay = min(delay * 2, self.retry_max)
+
+    async def warm_up(self) -> None:
+        """Run every step once."""
+        await asyncio.gather(*(self._run_step(name, step) for name, step in self.steps))
+
+    async def warm_up_until_ready(self) -> None:
+        """Run every step, retrying failed ones with exponential backoff until all succeed."""
+        await asyncio.gather(*(self._run_step_until_ok(name, step) for name, step in self.steps))
+
+    def start(self) -> None:
+        """Schedule the warm-up on the running loop without waiting for it."""
+        if self._task is None:
+            self._task = asyncio.create_task(self.warm_up_until_ready())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def snapshot(self) -> Dict[str, Any]:
+        if self.ready:
+            status = "ready"
+        elif any(c["status"] == PENDING for c in self.components.values()):
+            status = "warming"
+        else:
+            status = "not_ready"
+        return {"status": status, "components": {name: dict(c) for name, c in self.components.items()}}
+
+
+readiness = Readiness(
+    DEFAULT_STEPS,
+    timeout=settings.WARMUP_TIMEOUT_SECONDS,
+    retry_base=settings.WARMUP_RETRY_BASE_SECONDS,
+    retry_max=settings.WARMUP_RETRY_MAX_SECONDS,
+)
+
+
+def _warmup_seconds() -> Dict[Tuple[str, ...], float]:
+    return {(name,): c["seconds"] for name, c in readiness.components.items() if "seconds" in c}
+
+
+registry.register(Gauge("taimako_ready", "1 once every warm-up component succeeded", callback=lambda: int(readiness.ready)))
+registry.register(Gauge(
+    "taimako_warmup_duration_seconds", "Time each warm-up component took at startup",
+    labelnames=("component",), callback=_warmup_seconds,
+))
@@ -0,0 +1,250 @@
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import DateTime, Integer, bindparam, case, func, select
+
+from app.core.config import settings
+from app.core.metrics import Gauge, registry, session_stats_batch, session_stats_flushes
+from app.models.chat_session import ChatSession
+from app.models.widget import GuestUser
+from app.utils.dates import as_utc
+
+logger = logging.getLogger(__name__)
+
+# --- Session Statistics ---
+# Message counters, durations and guest visit stats are analytics bookkeeping: the chat
+# reply must not wait for them. Handlers record deltas in memory; a background task folds
+# everything recorded for a session (or guest) during one flush interval into a single
+# relative UPDATE, so concurrent workers never overwrite each other's counts.
+# Deltas still pending when a worker is killed (not shut down) are lost, and checks that read
+# the counters (max_messages_per_session) miss other workers' deltas until they are flushed.
+
+_sessions = ChatSession.__table__
+_guests = GuestUser.__table__
+
+# executemany: one UPDATE per session; counters are incremented, not overwritten
+SESSION_UPDATE = _sessions.update().where(_sessions.c.id == bindparam("b_id")).values(
+    total_messages=func.coalesce(_sessions.c.total_messages, 0) + 2 * bindparam("b_turns", type_=Integer),
+    user_messages=func.coalesce(_sessions.c.user_messages, 0) + bindparam("b_turns", type_=Integer),
+    ai_messages=func.coalesce(_sessions.c.ai_messages, 0) + bindparam("b_turns", type_=Integer),
+    last_message_at=func.coalesce(bindparam("b_last_message_at", type_=DateTime), _sessions.c.last_message_at),
+    session_duration=func.coalesce(bindparam("b_duration", type_=Integer), _sessions.c.session_duration),
+    # Only the first answered turn ever sets it
+    first_response_time=func.coalesce(_sessions.c.first_response_time, bindparam("b_first_response", type_=Integer)),
+)
+
+GUEST_UPDATE = _guests.update().where(_guests.c.id == bindparam("b_id")).values(
+    last_seen_at=bindparam("b_last_seen_at", type_=DateTime),
+    total_sessions=func.coalesce(_guests.c.total_sessions, 0) + bindparam("b_sessions", type_=Integer),
+    is_returning=case(
+        (func.coalesce(_guests.c.total_sessions, 0) + bindparam("b_sessions", type_=Integer) > 1, True),
+        else_=_guests.c.is_returning,
+    ),
+)
+
+
+@dataclass
+class SessionDelta:
+    turns: int = 0
+    last_message_at: Optional[datetime] = None
+    last_reply_at: Optional[datetime] = None
+    first_response_time: Optional[int] = None
+
+
+@dataclass
+class GuestDelta:
+    sessions: int = 0
+    last_seen_at: Optional[datetime] = None
+
+
+class SessionStatsQueue:
+    def __init__(self, session_factory: Callable, flush_interval: float = 1.0, max_pending: int = 5000):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._sessions: Dict[str, SessionDelta] = {}
+        self._guests: Dict[str, GuestDelta] = {}
+        # The batch being written, so pending counts stay visible until it is committed
+        self._flushing: Dict[str, SessionDelta] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    # --- Recording (called from request handlers; never touches the database) ---
+
+    def touch(self, session_id: str, at: datetime) -> None:
+        """A guest message arrived in the session."""
+        with self._lock:
+            delta = self._sessions.setdefault(session_id, SessionDelta())
+            delta.last_message_at = max(filter(None, (delta.last_message_at, as_utc(at))), default=None)
+        self._schedule()
+
+    def record_turn(self, session_id: str, guest_message_at: datetime, reply_at: datetime) -> None:
+        """One guest message answered by one AI message."""
+        guest_message_at, reply_at = as_utc(guest_message_at), as_utc(reply_at)
+        with self._lock:
+            delta = self._sessions.setdefault(session_id, SessionDelta())
+            delta.turns += 1
+            delta.last_reply_at = max(filter(None, (delta.last_reply_at, reply_at)), default=None)
+            if delta.first_response_time is None and guest_message_at and reply_at:
+                delta.first_response_time = int((reply_at - guest_message_at).total_seconds())
+        self._schedule()
+
+    def record_guest_session(self, guest_id: str, at: datetime) -> None:
+        """The guest started a new chat session."""
+        with self._lock:
+            delta = self._guests.setdefault(guest_id, GuestDelta())
+            delta.sessions += 1
+            delta.last_seen_at = max(filter(None, (delta.last_seen_at, as_utc(at))), default=None)
+        self._schedule()
+
+    def pending_user_messages(self, session_id: str) -> int:
+        """Guest messages answered in this worker but not yet written (for limit checks)."""
+        with self._lock:
+            return sum(batch[session_id].turns for batch in (self._sessions, self._flushing) if session_id in batch)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._sessions) + len(self._guests)
+
+    # --- Flushing ---
+
+    def flush(self) -> int:
+        """Write everything recorded so far; returns the number of rows updated. Blocking."""
+        with self._flush_lock:
+            with self._lock:
+                sessions, self._sessions = self._sessions, {}
+                guests, self._guests = self._guests, {}
+                self._flushing = sessions
+            if not sessions and not guests:
+                return 0
+            db = self.session_factory()
+            try:
+                session_rows = self._session_rows(db, sessions)
+                if session_rows:
+                    db.execute(SESSION_UPDATE, session_rows)
+                if guests:
+                    db.execute(GUEST_UPDATE, [
+                        {"b_id": guest_id, "b_sessions": delta.sessions, "b_last_seen_at": delta.last_seen_at}
+                        for guest_id, delta in guests.items()
+                    ])
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._requeue(sessions, guests)
+                session_stats_flushes.inc(outcome="error")
+                raise
+            finally:
+                db.close()
+                with self._lock:
+                    self._flushing = {}
+            rows = len(session_rows) + len(guests)
+            session_stats_flushes.inc(outcome="ok")
+            session_stats_batch.observe(rows)
+            return rows
+
+    def _session_rows(self, db, sessions: Dict[str, SessionDelta]) -> List[dict]:
+        # Duration runs from the session's creation to its latest reply: one SELECT per batch
+        created = dict(db.execute(
+            select(_sessions.c.id, _sessions.c.created_at).where(_sessions.c.id.in_(list(sessions)))
+        ).all())
+        rows = []
+        for session_id, delta in sessions.items():
+            if session_id not in created:
+                continue
+            created_at = as_utc(created[session_id])
+            duration = None
+            if delta.last_reply_at and created_at:
+                duration = int((delta.last_reply_at - created_at).total_seconds())
+            rows.append({
+                "b_id": session_id,
+                "b_turns": delta.turns,
+                "b_last_message_at": delta.last_message_at,
+                "b_duration": duration,
+                "b_first_response": delta.first_response_time,
+            })
+        return rows
+
+    def _requeue(self, sessions: Dict[str, SessionDelta], guests: Dict[str, GuestDelta]) -> None:
+        """Merge a failed batch back so the next flush retries it (dropped past max_pending)."""
+        with self._lock:
+            self._flushing = {}
+            if len(self._sessions) + len(self._guests) + len(sessions) + len(guests) > self.max_pending:
+                logger.error("Dropping %d session stat updates after a failed flush", len(sessions) + len(guests))
+                return
+            for session_id, old in sessions.items():
+                new = self._sessions.setdefault(session_id, SessionDelta())
+                new.turns += old.turns
+                new.last_message_at = max(filter(None, (new.last_message_at, old.last_message_at)), default=None)
+                new.last_reply_at = max(filter(None, (new.last_reply_at, old.last_reply_at)), default=None)
+                new.first_response_time = old.first_response_time if old.first_response_time is not None else new.first_response_time
+            for guest_id, old in guests.items():
+                new = self._guests.setdefault(guest_id, GuestDelta())
+                new.sessions += old.sessions
+                new.last_seen_at = max(filter(None, (new.last_seen_at, old.last_seen_at)), default=None)
+
+    # --- Background task ---
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self._flush_logged)
+
+    def _schedule(self) -> None:
+        try:
+            self.start()
+        except RuntimeError:
+            return  # no running loop (scripts, sync tests): flushed by an explicit flush()
+        if self.pending() >= self.max_pending:
+            self._wakeup.set()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await asyncio.to_thread(self._flush_logged)
+
+    def _flush_logged(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning("Session stats flush failed: %s", e)
+
+
+def get_session_stats() -> SessionStatsQueue:
+    from app.db.session import SessionLocal
+
+    return SessionStatsQueue(
+        SessionLocal,
+        flush_interval=settings.SESSION_STATS_FLUSH_SECONDS,
+        max_pending=settings.SESSION_STATS_MAX_PENDING,
+    )
+
+
+session_stats = get_session_stats()
+
+registry.register(Gauge(
+    "taimako_session_stats_pending", "Sessions and guests with statistics waiting to be written",
+    callback=session_stats.pending,
+))
@@ -1,13 +1,27 @@
-import chromadb
-from chromadb.config import Settings as ChromaSettings
+import threading
+import time
 from app.core.config import settings
-from typing import List, Dict, Any
+from app.core.tracing import tracer
+from app.core.metrics import retrieval_duration, retrieval_results
+from typing import List, Dict, Any, Optional
+
+# chromadb (and its embedding model) is imported when the first VectorDBService is
+# built, not when this module is imported, so workers boot without paying for it.
 
 class VectorDBService:
-    def __init__(self):
-        self.client = chromadb.PersistentClient(path=settings.CHROMA_DB_DIR)
-        self.collection = self.client.get_or_create_collection(name="rag_documents")
+    def __init__(self, path: Optional[str] = None, embedding_function=None):
+        import chromadb
+        from chromadb.utils import embedding_functions
+
+        self.client = chromadb.PersistentClient(path=path or settings.CHROMA_DB_DIR)
+        # Explicit so callers can embed text in the same space as the stored chunks
+        self.embedding_function = embedding_function or embedding_functions.DefaultEmbeddingFunction()
+        self.collection = self.client.get_or_create_collection(
+            name="rag_documents",
+            embedding_function=self.embedding_function
+        )
 
+    @tracer.start_as_current_span("chroma.add")
     def add_documents(self, documents: List[str], metadatas: List[Dict[str, Any]], ids: List[str]):
         self.collection.add(
             documents=documents,
@@ -15,14 +29,49 @@ class VectorDBService:
             ids=ids
         )
 
+    @tracer.start_as_current_span("chroma.query")
     def query(self, query_text: str, n_results: int = 5, where: Dict[str, Any] = None):
-        return self.collection.query(
+        started = time.perf_counter()
+        results = self.collection.query(
             query_texts=[query_text],
             n_results=n_results,
             where=where
         )
+        retrieval_duration.observe(time.perf_counter() - started, retriever="vector")
+        ids = (results or {}).get("ids") or [[]]
+        retrieval_results.observe(len(ids[0]) if ids else 0, retriever="vector")
+        return results
+
+    @tracer.start_as_current_span("chroma.get")
+    def get(self, where: Dict[str, Any] = None, ids: List[str] = None, include: List[str] = None):
+        return self.collection.get(
+            where=where,
+            ids=ids,
+            include=include or ["documents", "metadatas"]
+        )
+
+    @tracer.start_as_current_span("chroma.embed")
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        return [list(map(float, e)) for e in self.embedding_function(texts)]
+
+    @tracer.start_as_current_span("chroma.update")
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        # Metadata-only update: embeddings are left untouched
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    @tracer.start_as_current_span("chroma.delete")
+    def delete(self, where: Dict[str, Any] = None, ids: List[str] = None):
+        self.collection.delete(where=where, ids=ids)
+
+_vector_db: Optional[VectorDBService] = None
+_vector_db_lock = threading.Lock()
 
-    def delete(self, where: Dict[str, Any]):
-        self.collection.delete(where=where)
 
-vector_db = VectorDBService()
+def get_vector_db() -> VectorDBService:
+    """Process-wide VectorDBService, opened on first use."""
+    global _vector_db
+    if _vector_db is None:
+        with _vector_db_lock:
+            if _vector_db is None:
+                _vector_db = VectorDBService()
+    return _vector_db
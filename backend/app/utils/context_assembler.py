@@ -0,0 +1,134 @@
+import re
+from typing import Dict, List, Optional, Set
+
+# Rough chars-per-token for English text with Gemini/GPT-style tokenizers
+CHARS_PER_TOKEN = 4
+# Longest overlap searched for when stitching neighbouring chunks (splitter default is 200)
+MAX_STITCH_OVERLAP = 400
+# Shortest suffix/prefix match accepted as a real overlap rather than a coincidence
+MIN_STITCH_OVERLAP = 20
+# Word-shingle Jaccard similarity above which two passages count as duplicates
+NEAR_DUPLICATE_THRESHOLD = 0.8
+SHINGLE_SIZE = 5
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def _stitch(left: str, right: str) -> str:
+    """Concatenate two neighbouring chunks, dropping the text they share."""
+    if right in left:
+        return left
+    for size in range(min(len(left), len(right), MAX_STITCH_OVERLAP), MIN_STITCH_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return left.rstrip() + "\n" + right.lstrip()
+
+
+def _shingles(text: str) -> Set[tuple]:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _is_near_duplicate(candidate: Set[tuple], kept: List[Set[tuple]]) -> bool:
+    if not candidate:
+        return True
+    for other in kept:
+        overlap = len(candidate & other)
+        # Containment in an already kept passage, or high mutual similarity
+        if overlap == len(candidate) or overlap / len(candidate | other) >= NEAR_DUPLICATE_THRESHOLD:
+            return True
+    return False
+
+
+def _truncate_to_budget(text: str, max_tokens: int) -> str:
+    limit = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    # Prefer ending on a sentence or line boundary
+    for boundary in ["\n\n", "\n", ". "]:
+        pos = cut.rfind(boundary)
+        if pos > limit // 2:
+            return cut[:pos + len(boundary)].rstrip()
+    return cut.rstrip()
+
+
+def merge_adjacent_chunks(chunks: List[Dict]) -> List[Dict]:
+    """
+    Merge retrieved chunks that are neighbours in the same file (by `chunk_index`).
+
+    Args:
+        chunks: {"text", "metadata"} dicts, most relevant first
+
+    Returns:
+        {"text", "rank"} passages where rank is the best rank among merged chunks
+    """
+    groups: Dict[str, List[tuple]] = {}
+    passages = []
+    for rank, chunk in enumerate(chunks):
+        metadata = chunk.get("metadata") or {}
+        index = metadata.get("chunk_index")
+        if index is None or metadata.get("filename") is None:
+            passages.append({"text": chunk["text"], "rank": rank})
+            continue
+        groups.setdefault(metadata["filename"], []).append((int(index), rank, chunk["text"]))
+
+    for members in groups.values():
+        members.sort()
+        current_index, best_rank, text = members[0]
+        for index, rank, chunk_text in members[1:]:
+            if index == current_index:
+                # Same chunk retrieved twice
+                best_rank = min(best_rank, rank)
+                continue
+            if index == current_index + 1:
+                text = _stitch(text, chunk_text)
+                best_rank = min(best_rank, rank)
+            else:
+                passages.append({"text": text, "rank": best_rank})
+                text, best_rank = chunk_text, rank
+            current_index = index
+        passages.append({"text": text, "rank": best_rank})
+
+    passages.sort(key=lambda p: p["rank"])
+    return passages
+
+
+def assemble_context(chunks: List[Dict], max_tokens: Optional[int] = None, separator: str = "\n\n") -> str:
+    """
+    Build the prompt context from retrieved chunks.
+
+    Neighbouring chunks are stitched back together (removing the splitter's overlap),
+    near-duplicate passages are dropped, and the rest is packed by relevance into
+    `max_tokens` (estimated). A passage that does not fit is skipped in favour of
+    smaller, less relevant ones; the most relevant passage is truncated rather than lost.
+    """
+    kept_texts: List[str] = []
+    kept_shingles: List[Set[tuple]] = []
+    used_tokens = 0
+    separator_tokens = estimate_tokens(separator)
+
+    for passage in merge_adjacent_chunks(chunks):
+        text = passage["text"].strip()
+        shingles = _shingles(text)
+        if _is_near_duplicate(shingles, kept_shingles):
+            continue
+
+        cost = estimate_tokens(text) + (separator_tokens if kept_texts else 0)
+        if max_tokens is not None and used_tokens + cost > max_tokens:
+            if kept_texts:
+                continue
+            text = _truncate_to_budget(text, max_tokens)
+            cost = estimate_tokens(text)
+
+        kept_texts.append(text)
+        kept_shingles.append(shingles)
+        used_tokens += cost
+
+    return separator.join(kept_texts)
@@ -0,0 +1,9 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Treat naive datetimes as UTC (SQLite and naive DateTime columns hand them back that way)."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
@@ -0,0 +1,43 @@
+import codecs
+import mmap
+import os
+from typing import BinaryIO, Iterator
+
+# Bytes decoded per block when streaming text files; bounds the decoded text held at once
+READ_BLOCK_SIZE = 256 * 1024
+
+
+def iter_text_blocks(path: str, encoding: str = "utf-8", block_size: int = READ_BLOCK_SIZE) -> Iterator[str]:
+    """
+    Yield the decoded text of a file block by block.
+
+    The file is memory-mapped and decoded from slices of the mapping, so pages are faulted
+    in on demand and dropped by the OS once consumed instead of being read into one string.
+    Multi-byte characters split across blocks are handled by an incremental decoder.
+    """
+    if os.path.getsize(path) == 0:
+        return
+    decoder = codecs.getincrementaldecoder(encoding)(errors="strict")
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mapped)
+        try:
+            for offset in range(0, len(mapped), block_size):
+                text = decoder.decode(view[offset:offset + block_size])
+                if text:
+                    yield text
+        finally:
+            view.release()
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def iter_pdf_text(stream: BinaryIO) -> Iterator[str]:
+    """Yield the extracted text of a PDF page by page."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(stream)
+    for page in reader.pages:
+        yield page.extract_text() + "\n"
@@ -0,0 +1,36 @@
+import hashlib
+from typing import BinaryIO, Optional
+
+
+class ReadLimitExceeded(ValueError):
+    """Raised when a stream yields more bytes than allowed."""
+
+
+def sha256_text(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class HashingReader:
+    """
+    Read-only file-like wrapper that SHA-256 hashes bytes as they are consumed.
+    With `max_bytes`, raises ReadLimitExceeded as soon as the stream runs past the limit,
+    so oversized uploads are rejected without being read to the end.
+    """
+
+    def __init__(self, file_obj: BinaryIO, max_bytes: Optional[int] = None):
+        self._file = file_obj
+        self._digest = hashlib.sha256()
+        self.max_bytes = max_bytes
+        self.bytes_read = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._file.read(size)
+        if data:
+            self.bytes_read += len(data)
+            if self.max_bytes is not None and self.bytes_read > self.max_bytes:
+                raise ReadLimitExceeded(f"File exceeds the {self.max_bytes} byte limit")
+            self._digest.update(data)
+        return data
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
@@ -0,0 +1,28 @@
+import math
+from typing import Dict, Hashable, List, Sequence
+
+
+def cosine_similarity(a: Sequence[float], b: Sequence[float]) -> float:
+    """Cosine similarity of two equal-length vectors. Returns 0.0 for zero vectors."""
+    dot = 0.0
+    norm_a = 0.0
+    norm_b = 0.0
+    for x, y in zip(a, b):
+        dot += x * y
+        norm_a += x * x
+        norm_b += y * y
+    if norm_a == 0.0 or norm_b == 0.0:
+        return 0.0
+    return dot / (math.sqrt(norm_a) * math.sqrt(norm_b))
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Hashable]:
+    """
+    Fuse several best-first rankings with Reciprocal Rank Fusion: score = sum(1 / (k + rank)).
+    Items are returned best first; ties keep first-seen order.
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=lambda item: scores[item], reverse=True)
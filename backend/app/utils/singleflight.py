@@ -0,0 +1,28 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one execution.
+
+    The first caller for a key starts the work; callers arriving while it is in flight
+    await the same result (or exception). Nothing is cached once the call completes.
+    """
+
+    def __init__(self, on_coalesce: Optional[Callable[[], None]] = None):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.on_coalesce = on_coalesce
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            if self.on_coalesce is not None:
+                self.on_coalesce()
+            # Shield: one waiter being cancelled must not cancel the shared call
+            return await asyncio.shield(future)
+
+        future = asyncio.ensure_future(fn())
+        self._inflight[key] = future
+        future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(future)
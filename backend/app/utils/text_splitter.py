@@ -1,30 +1,52 @@
 import re
+from typing import Iterable, Iterator
 
-def recursive_character_text_splitter(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> list[str]:
-    if not text:
-        return []
-    
-    chunks = []
+def iter_text_chunks(blocks: Iterable[str], chunk_size: int = 1000, chunk_overlap: int = 200) -> Iterator[str]:
+    """
+    Split text arriving as a stream of blocks, yielding chunks as soon as they are final.
+
+    Each split only looks at the next `chunk_size` characters, so holding slightly more than
+    one chunk of text is enough to produce exactly the chunks the whole text would give.
+    """
+    text = ""
     start = 0
-    text_len = len(text)
+    exhausted = False
+    blocks = iter(blocks)
     
-    while start < text_len:
+    while True:
+        # Buffer until the window past `start` is fully known (or the input ends)
+        while not exhausted and len(text) - start <= chunk_size:
+            block = next(blocks, None)
+            if block is None:
+                exhausted = True
+            elif block:
+                # Drop consumed text so the buffer stays around one chunk long
+                text = text[start:] + block
+                start = 0
+        
+        text_len = len(text)
+        if start >= text_len:
+            return
+        
         end = start + chunk_size
         if end >= text_len:
-            chunks.append(text[start:])
-            break
+            yield text[start:]
+            return
             
         # Try to find a natural break point (newline, period, space)
-        # Look back from 'end' to find the best split point
+        # Look back from 'end' to find the best split point. Only breaks that end within
+        # the overlap are skipped: the next chunk would start at or before this one and the
+        # splitter would creep forward a character at a time, emitting near-duplicates.
+        # Any other break is the one the whole-range search picks, so boundaries are unchanged.
         split_point = -1
         for char in ['\n\n', '\n', '. ', ' ']:
-            pos = text.rfind(char, start, end)
+            pos = text.rfind(char, start + chunk_overlap - len(char) + 1, end)
             if pos != -1:
                 split_point = pos + len(char)
                 break
         
         if split_point != -1:
-            chunks.append(text[start:split_point])
+            yield text[start:split_point]
             # Ensure we make progress to avoid infinite loops
             next_start = split_point - chunk_overlap
             if next_start <= start:
@@ -32,7 +54,10 @@ def recursive_character_text_splitter(text: str, chunk_size: int = 1000, chunk_o
             start = next_start
         else:
             # Hard split if no natural break found
-            chunks.append(text[start:end])
+            yield text[start:end]
             start = end - chunk_overlap
-            
-    return chunks
+
+def recursive_character_text_splitter(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> list[str]:
+    if not text:
+        return []
+    return list(iter_text_chunks([text], chunk_size=chunk_size, chunk_overlap=chunk_overlap))
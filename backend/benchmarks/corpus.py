@@ -0,0 +1,196 @@
+"""
+Deterministic synthetic documents for ingestion benchmarks.
+
+Every generator writes a file of roughly `size_bytes` from a seeded RNG, so the same
+arguments produce byte-identical corpora on every machine and commit.
+"""
+import csv
+import random
+import zipfile
+from typing import Callable, Dict, List
+from xml.sax.saxutils import escape
+
+WORDS = (
+    "order refund delivery warranty invoice account password shipping return exchange "
+    "appointment booking cancellation discount voucher subscription payment receipt store "
+    "opening hours branch manager support ticket product size colour stock supplier policy"
+).split()
+
+
+def sentences(rng: random.Random):
+    """Endless stream of FAQ-like sentences."""
+    while True:
+        words = [rng.choice(WORDS) for _ in range(rng.randint(8, 20))]
+        yield " ".join(words).capitalize() + f" (ref {rng.randint(1000, 99999)})."
+
+
+def paragraphs(rng: random.Random, size_bytes: int) -> List[str]:
+    """Paragraphs of 3-8 sentences totalling about `size_bytes` characters."""
+    stream = sentences(rng)
+    result, total = [], 0
+    while total < size_bytes:
+        paragraph = " ".join(next(stream) for _ in range(rng.randint(3, 8)))
+        result.append(paragraph)
+        total += len(paragraph) + 2
+    return result
+
+
+def write_text(path: str, size_bytes: int, seed: int) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        written = 0
+        stream = sentences(rng)
+        while written < size_bytes:
+            paragraph = " ".join(next(stream) for _ in range(rng.randint(3, 8))) + "\n\n"
+            f.write(paragraph)
+            written += len(paragraph)
+
+
+def write_markdown(path: str, size_bytes: int, seed: int) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        written, section = 0, 0
+        stream = sentences(rng)
+        while written < size_bytes:
+            section += 1
+            block = [f"## Section {section}\n\n", " ".join(next(stream) for _ in range(4)) + "\n\n"]
+            block.append("| Item | Price | Stock |\n|---|---:|---|\n")
+            for _ in range(rng.randint(3, 10)):
+                block.append(f"| {rng.choice(WORDS)} {rng.randint(1, 999)} | {rng.randint(1, 500)}.99 | {rng.randint(0, 80)} |\n")
+            block.append("\n")
+            text = "".join(block)
+            f.write(text)
+            written += len(text)
+
+
+def write_csv(path: str, size_bytes: int, seed: int) -> None:
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["sku", "name", "price", "stock", "description"])
+        written, n = 0, 0
+        stream = sentences(rng)
+        while written < size_bytes:
+            n += 1
+            row = [f"SKU-{n:07d}", f"{rng.choice(WORDS)} {rng.choice(WORDS)}", f"{rng.randint(1, 500)}.{rng.randint(0, 99):02d}",
+                   rng.randint(0, 200), next(stream)]
+            writer.writerow(row)
+            written += sum(len(str(c)) for c in row) + 6
+
+
+def write_html(path: str, size_bytes: int, seed: int) -> None:
+    rng = random.Random(seed)
+    chrome = (
+        "<header><nav><a href='/'>Home</a><a href='/shop'>Shop</a><a href='/faq'>FAQ</a></nav></header>"
+        "<div class='cookie-banner'>We use cookies to improve your experience.</div>"
+        "<script>window.analytics = {track: function () {}};</script>"
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("<!DOCTYPE html><html><head><title>Help centre</title><style>body{font:14px sans-serif}</style></head><body>")
+        f.write(chrome)
+        f.write("<main>")
+        written = 0
+        for i, paragraph in enumerate(paragraphs(rng, size_bytes)):
+            if i % 5 == 0:
+                f.write(f"<h2>Topic {i // 5}</h2>")
+            f.write(f"<p>{escape(paragraph)}</p>")
+            written += len(paragraph)
+        f.write("</main><footer>&copy; Example Ltd. All rights reserved.</footer></body></html>")
+
+
+def write_docx(path: str, size_bytes: int, seed: int) -> None:
+    """Minimal but valid WordprocessingML package: paragraphs plus a price table."""
+    rng = random.Random(seed)
+    body = []
+    for paragraph in paragraphs(rng, size_bytes):
+        body.append(f"<w:p><w:r><w:t>{escape(paragraph)}</w:t></w:r></w:p>")
+    rows = [("Item", "Price")] + [(rng.choice(WORDS), f"{rng.randint(1, 500)}.99") for _ in range(10)]
+    table = "".join(
+        "<w:tr>" + "".join(f"<w:tc><w:p><w:r><w:t>{escape(c)}</w:t></w:r></w:p></w:tc>" for c in row) + "</w:tr>"
+        for row in rows
+    )
+    body.append(f"<w:tbl>{table}</w:tbl>")
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+        f"<w:body>{''.join(body)}</w:body></w:document>"
+    )
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/word/document.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+        "</Types>"
+    )
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", content_types)
+        archive.writestr("word/document.xml", document)
+
+
+def write_pdf(path: str, size_bytes: int, seed: int) -> None:
+    """Text PDF with Helvetica pages of ~3 KB each, written without any PDF library."""
+    rng = random.Random(seed)
+    stream = sentences(rng)
+    pages: List[List[str]] = []
+    total = 0
+    while total < size_bytes:
+        lines = []
+        for _ in range(40):
+            line = next(stream)[:90]
+            lines.append(line)
+            total += len(line)
+        pages.append(lines)
+
+    def pdf_string(text: str) -> str:
+        return "(" + text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+    objects: Dict[int, bytes] = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    kids = []
+    for i, lines in enumerate(pages):
+        page_id, content_id = 4 + 2 * i, 5 + 2 * i
+        kids.append(f"{page_id} 0 R")
+        content = "BT /F1 10 Tf 14 TL 40 800 Td " + " ".join(f"{pdf_string(l)} '" for l in lines) + " ET"
+        objects[content_id] = f"<< /Length {len(content)} >>\nstream\n{content}\nendstream".encode("latin-1")
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode()
+    objects[2] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(pages)} >>".encode()
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = {}
+        for obj_id in sorted(objects):
+            offsets[obj_id] = f.tell()
+            f.write(f"{obj_id} 0 obj\n".encode() + objects[obj_id] + b"\nendobj\n")
+        xref = f.tell()
+        count = max(objects) + 1
+        f.write(f"xref\n0 {count}\n0000000000 65535 f \n".encode())
+        for obj_id in range(1, count):
+            f.write(f"{offsets[obj_id]:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {count} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+
+
+# Format name -> (file extension, generator)
+GENERATORS: Dict[str, tuple] = {
+    "txt": (".txt", write_text),
+    "md": (".md", write_markdown),
+    "csv": (".csv", write_csv),
+    "html": (".html", write_html),
+    "docx": (".docx", write_docx),
+    "pdf": (".pdf", write_pdf),
+}
+
+
+def parse_size(value: str) -> int:
+    """Parse sizes such as "1KB", "10MB" or "4096"."""
+    units = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+    value = value.strip().upper()
+    for suffix, factor in units.items():
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * factor)
+    return int(value)
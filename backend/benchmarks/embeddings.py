@@ -0,0 +1,78 @@
+"""
+Deterministic, dependency-free Chroma embedding functions for benchmarks.
+
+They need no network or model download and give identical vectors on every machine,
+so benchmark numbers only move when the code under test does.
+"""
+import hashlib
+import math
+import re
+import zlib
+
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _normalise(vector):
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class HashingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """Hashed character trigrams, L2-normalised. Good enough for retrieval quality comparisons."""
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            vector = [0.0] * self.dimensions
+            padded = f"  {text.lower()}  "
+            for i in range(len(padded) - 2):
+                digest = hashlib.blake2b(padded[i:i + 3].encode(), digest_size=4).digest()
+                vector[int.from_bytes(digest, "little") % self.dimensions] += 1.0
+            vectors.append(_normalise(vector))
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "hashing_trigram"
+
+    def get_config(self) -> dict:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "HashingEmbeddingFunction":
+        return HashingEmbeddingFunction(**config)
+
+
+class TokenHashingEmbeddingFunction(EmbeddingFunction[Documents]):
+    """
+    Hashed word tokens (CRC32), L2-normalised. Several times cheaper than trigrams, so
+    throughput benchmarks on large corpora measure the pipeline rather than the embedder.
+    """
+
+    def __init__(self, dimensions: int = 384):
+        self.dimensions = dimensions
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            vector = [0.0] * self.dimensions
+            for word in _WORD_RE.findall(text.lower()):
+                vector[zlib.crc32(word.encode()) % self.dimensions] += 1.0
+            vectors.append(_normalise(vector))
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "hashing_token"
+
+    def get_config(self) -> dict:
+        return {"dimensions": self.dimensions}
+
+    @staticmethod
+    def build_from_config(config: dict) -> "TokenHashingEmbeddingFunction":
+        return TokenHashingEmbeddingFunction(**config)
@@ -0,0 +1,269 @@
+"""
+Ingestion throughput benchmark for the RAG pipeline.
+
+For each format and size it generates a deterministic document (benchmarks/corpus.py),
+then times every ingestion stage separately against a throwaway on-disk Chroma store:
+
+    extraction  - sniffing + extractor (text file written for chunking)
+    splitting   - mmap'd incremental read + iter_text_chunks
+    embedding   - the embedding function on EMBED_BATCH_SIZE batches
+    insert      - collection.add with precomputed embeddings
+
+and finally runs the same file through RAGService.process_documents (SQLite + Chroma)
+for an end-to-end number. Embeddings are deterministic (hashed tokens by default), so
+results are comparable across commits; use --compare to diff against a previous run.
+
+Usage (from backend/):
+    uv run python -m benchmarks.ingestion_benchmark
+    uv run python -m benchmarks.ingestion_benchmark --formats txt pdf --sizes 1KB 1MB 100MB --output ingest.json
+    uv run python -m benchmarks.ingestion_benchmark --compare ingest.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db.base import Base
+from app.models.user import User # Import models to register them
+from app.models.document import Document
+from app.models.business import Business
+from app.models.widget import WidgetSettings, GuestUser, GuestMessage
+from app.models.chat_session import ChatSession
+from app.models.analytics import AnalyticsDailySummary
+from app.models.cache_generation import CacheGeneration
+from app.services import rag_service as rag_module
+from app.services.cache_generations import CacheGenerations
+from app.services.extractors import ExtractionPool, extract_to_file
+from app.services.keyword_index import KeywordIndexService
+from app.services.rag_service import RAGService
+from app.services.vector_db import VectorDBService
+from app.utils.document_reader import iter_text_blocks
+from app.utils.text_splitter import iter_text_chunks
+from benchmarks.corpus import GENERATORS, parse_size
+from benchmarks.embeddings import HashingEmbeddingFunction, TokenHashingEmbeddingFunction
+
+STAGES = ["extraction", "splitting", "embedding", "insert"]
+EMBEDDINGS = {"token": TokenHashingEmbeddingFunction, "trigram": HashingEmbeddingFunction}
+
+
+class TimedIterator:
+    """Wraps an iterator and accumulates the time spent producing its items."""
+
+    def __init__(self, iterable: Iterable):
+        self._iterator = iter(iterable)
+        self.seconds = 0.0
+
+    def __iter__(self) -> Iterator:
+        return self
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            return next(self._iterator)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def measure_stages(path: str, workdir: str, vector_db: VectorDBService, case: str) -> dict:
+    timings = dict.fromkeys(STAGES, 0.0)
+
+    started = time.perf_counter()
+    extracted = extract_to_file(path, os.path.basename(path), workdir)
+    timings["extraction"] = time.perf_counter() - started
+
+    chunks = TimedIterator(iter_text_chunks(iter_text_blocks(extracted.path)))
+    embed = vector_db.embedding_function
+    count = 0
+    for batch in batched(chunks, rag_module.EMBED_BATCH_SIZE):
+        started = time.perf_counter()
+        embeddings = embed(batch)
+        timings["embedding"] += time.perf_counter() - started
+
+        ids = [f"{case}-{count + i}" for i in range(len(batch))]
+        metadatas = [{"user_id": case, "filename": case, "chunk_index": count + i} for i in range(len(batch))]
+        started = time.perf_counter()
+        vector_db.collection.add(ids=ids, documents=batch, embeddings=embeddings, metadatas=metadatas)
+        timings["insert"] += time.perf_counter() - started
+        count += len(batch)
+    timings["splitting"] = chunks.seconds
+
+    text_bytes = os.path.getsize(extracted.path)
+    if extracted.temporary:
+        os.remove(extracted.path)
+    return {"timings": timings, "chunks": count, "text_bytes": text_bytes}
+
+
+def measure_end_to_end(path: str, filename: str, rag: RAGService, session_factory, case: str) -> dict:
+    db = session_factory()
+    try:
+        db.add(Document(user_id=case, filename=filename, file_path=path, status="pending"))
+        db.commit()
+        started = time.perf_counter()
+        result = rag.process_documents(case, db)[0]
+        seconds = time.perf_counter() - started
+    finally:
+        db.close()
+    if not result.status == "success":
+        raise RuntimeError(f"{filename}: {result.status}")
+    return {"seconds": seconds, "chunks": result.chunks_created}
+
+
+def run(args) -> dict:
+    report = {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": {
+            "formats": args.formats,
+            "sizes": args.sizes,
+            "embedding": args.embedding,
+            "embed_batch_size": rag_module.EMBED_BATCH_SIZE,
+            "workers": args.workers,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "cases": {},
+    }
+
+    with tempfile.TemporaryDirectory(prefix="ingest_bench_") as workdir:
+        vector_db = VectorDBService(path=os.path.join(workdir, "chroma"), embedding_function=EMBEDDINGS[args.embedding]())
+        rag = RAGService()
+        rag.vector_db = vector_db
+        rag.keyword_index = KeywordIndexService(vector_db)
+        rag.extraction_pool = ExtractionPool(max_workers=args.workers)
+
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, 'bench.db')}")
+        Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(bind=engine)
+        # Processing invalidates the response cache; keep its counters in the throwaway
+        # database instead of the app's SessionLocal
+        app_generations = rag_module.response_cache.generations
+        rag_module.response_cache.generations = CacheGenerations(session_factory)
+
+        try:
+            for fmt in args.formats:
+                ext, generate = GENERATORS[fmt]
+                for size_label in args.sizes:
+                    case = f"{fmt}-{size_label}"
+                    path = os.path.join(workdir, f"{case}{ext}")
+                    generate(path, parse_size(size_label), args.seed)
+                    input_bytes = os.path.getsize(path)
+
+                    runs = []
+                    for attempt in range(args.repeat):
+                        run_id = f"{case}-{attempt}"
+                        stages = measure_stages(path, workdir, vector_db, run_id)
+                        end_to_end = measure_end_to_end(path, f"{case}{ext}", rag, session_factory, f"e2e-{run_id}")
+                        runs.append((stages, end_to_end))
+
+                    # Report the fastest run per stage: least disturbed by the rest of the machine
+                    timings = {stage: min(r[0]["timings"][stage] for r in runs) for stage in STAGES}
+                    e2e_seconds = min(r[1]["seconds"] for r in runs)
+                    chunks = runs[0][0]["chunks"]
+                    megabytes = input_bytes / 1024 ** 2
+                    report["cases"][case] = {
+                        "format": fmt,
+                        "input_bytes": input_bytes,
+                        "text_bytes": runs[0][0]["text_bytes"],
+                        "chunks": chunks,
+                        "stage_seconds": {stage: round(t, 4) for stage, t in timings.items()},
+                        "stage_share": {
+                            stage: round(t / sum(timings.values()), 3) if sum(timings.values()) else 0.0
+                            for stage, t in timings.items()
+                        },
+                        "end_to_end_seconds": round(e2e_seconds, 4),
+                        "end_to_end_mb_per_s": round(megabytes / e2e_seconds, 3) if e2e_seconds else None,
+                        "end_to_end_chunks_per_s": round(chunks / e2e_seconds, 1) if e2e_seconds else None,
+                    }
+                    os.remove(path)
+        finally:
+            rag.extraction_pool.shutdown()
+            rag_module.response_cache.generations = app_generations
+
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report["meta"]["max_rss_mb"] = round(maxrss / (1024 ** 2 if sys.platform == "darwin" else 1024), 1)
+    return report
+
+
+def compare(current: dict, baseline: dict) -> dict:
+    """Ratio current / baseline of each timing; below 1.0 means faster than the baseline."""
+    diff = {"baseline_commit": baseline.get("meta", {}).get("git_commit"), "cases": {}}
+    for case, result in current["cases"].items():
+        previous = baseline.get("cases", {}).get(case)
+        if not previous:
+            continue
+        ratios = {
+            stage: round(t / previous["stage_seconds"][stage], 3)
+            for stage, t in result["stage_seconds"].items()
+            if previous["stage_seconds"].get(stage)
+        }
+        if previous.get("end_to_end_seconds"):
+            ratios["end_to_end"] = round(result["end_to_end_seconds"] / previous["end_to_end_seconds"], 3)
+        diff["cases"][case] = ratios
+    return diff
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", nargs="+", choices=sorted(GENERATORS), default=["txt", "pdf"])
+    parser.add_argument("--sizes", nargs="+", default=["1KB", "100KB", "1MB", "10MB"],
+                        help="Document sizes, e.g. 1KB 1MB 100MB")
+    parser.add_argument("--embedding", choices=sorted(EMBEDDINGS), default="token")
+    parser.add_argument("--workers", type=int, default=0, help="Extraction processes for the end-to-end run")
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per case; the fastest is reported")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--compare", help="Previous JSON report to compare against")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    if args.compare:
+        with open(args.compare) as f:
+            report["comparison"] = compare(report, json.load(f))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
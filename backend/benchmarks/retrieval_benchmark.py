@@ -0,0 +1,192 @@
+"""
+Recall / latency benchmark for vector-only, BM25-only and hybrid (RRF) retrieval.
+
+Seeds a synthetic FAQ corpus (product sheets with SKUs and prices, numbered policies,
+free-text FAQ answers) into a throwaway on-disk Chroma collection and runs three query
+families against it: exact identifiers, prices and natural-language paraphrases.
+
+Usage (from backend/):
+    uv run python -m benchmarks.retrieval_benchmark
+    uv run python -m benchmarks.retrieval_benchmark --embedding hash --products 500 --output bench.json
+
+`--embedding default` uses Chroma's default MiniLM model (downloaded on first use);
+`--embedding hash` uses a deterministic hashed character-trigram embedding that needs
+no network and is reproducible across machines.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from app.services.keyword_index import KeywordIndexService
+from app.services.rag_service import RAGService
+from app.services.vector_db import VectorDBService
+from benchmarks.embeddings import HashingEmbeddingFunction
+
+TENANT = "bench_tenant"
+TOP_K = 5
+
+ADJECTIVES = ["compact", "deluxe", "travel", "smart", "classic", "heavy-duty", "eco", "premium"]
+NOUNS = ["kettle", "blender", "toaster", "air fryer", "coffee grinder", "rice cooker", "juicer", "mixer"]
+COLORS = ["red", "blue", "black", "white", "silver", "green"]
+
+FAQ_TOPICS = [
+    ("Refunds are issued to the original payment method within 14 business days of us receiving the return.",
+     ["How long until I get my money back?", "when will my refund arrive"]),
+    ("Standard shipping takes 3 to 5 working days; express delivery arrives the next day if ordered before noon.",
+     ["How fast is delivery?", "how many days does shipping take"]),
+    ("You can change or cancel an order free of charge until it has been dispatched from our warehouse.",
+     ["Can I cancel my order?", "is it possible to modify an order after placing it"]),
+    ("All appliances include a two year manufacturer warranty covering defects in materials and workmanship.",
+     ["What warranty do products have?", "is my blender covered if it breaks"]),
+    ("Our support team is available by live chat and phone from 8am to 8pm, Monday to Saturday.",
+     ["When can I reach customer service?", "what are your support opening hours"]),
+    ("We ship to the UK, Ireland and most EU countries; import duties for non-EU destinations are paid by the customer.",
+     ["Do you deliver internationally?", "which countries do you ship to"]),
+]
+
+
+def build_corpus(products: int, policies: int, seed: int) -> Tuple[Dict[str, str], List[Tuple[str, str, str]]]:
+    """Return ({doc_id: text}, [(query_family, query, relevant_doc_id)])."""
+    rng = random.Random(seed)
+    docs: Dict[str, str] = {}
+    queries: List[Tuple[str, str, str]] = []
+
+    used_skus = set()
+    for i in range(products):
+        sku = f"SKU-{rng.randint(10000, 99999)}"
+        while sku in used_skus:
+            sku = f"SKU-{rng.randint(10000, 99999)}"
+        used_skus.add(sku)
+        price = f"{rng.randint(15, 400)}.{rng.randint(0, 99):02d}"
+        name = f"{rng.choice(COLORS)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+        doc_id = f"product-{i}"
+        docs[doc_id] = (
+            f"Product sheet: the {name} ({sku}) retails at ${price}. "
+            f"It has a {rng.randint(500, 2400)}W motor and a {rng.choice([1, 2, 3])} year warranty."
+        )
+        queries.append(("sku", f"Do you have {sku} in stock?", doc_id))
+        queries.append(("price", f"which item is ${price}", doc_id))
+
+    for i in range(policies):
+        number = f"POL-{rng.randint(100, 999)}/{rng.choice('ABCDEF')}"
+        doc_id = f"policy-{i}"
+        docs[doc_id] = (
+            f"Policy {number} applies to orders shipped to region {rng.randint(1, 40)} and "
+            f"limits returns to {rng.choice([14, 30, 60])} days."
+        )
+        queries.append(("policy_number", f"What does {number} say?", doc_id))
+
+    for i, (answer, paraphrases) in enumerate(FAQ_TOPICS):
+        doc_id = f"faq-{i}"
+        docs[doc_id] = answer
+        for paraphrase in paraphrases:
+            queries.append(("paraphrase", paraphrase, doc_id))
+
+    return docs, queries
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run(args) -> dict:
+    docs, queries = build_corpus(args.products, args.policies, args.seed)
+    embedding_function = HashingEmbeddingFunction() if args.embedding == "hash" else None
+
+    with tempfile.TemporaryDirectory(prefix="retrieval_bench_") as chroma_dir:
+        vector_db = VectorDBService(path=chroma_dir, embedding_function=embedding_function)
+        keyword_index = KeywordIndexService(vector_db)
+        rag = RAGService()
+        rag.vector_db = vector_db
+        rag.keyword_index = keyword_index
+
+        ids = list(docs)
+        texts = [docs[i] for i in ids]
+        metadatas = [{"user_id": TENANT, "filename": "faq.txt", "chunk_index": n} for n in range(len(ids))]
+        started = time.perf_counter()
+        for start in range(0, len(ids), 256):
+            vector_db.add_documents(texts[start:start + 256], metadatas[start:start + 256], ids[start:start + 256])
+        ingest_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        keyword_index.get_index(TENANT)
+        index_build_seconds = time.perf_counter() - started
+
+        retrievers = {
+            "vector": lambda q: list(vector_db.query(q, n_results=TOP_K, where={"user_id": TENANT})["ids"][0]),
+            "bm25": lambda q: [hit[0] for hit in keyword_index.search(TENANT, q, n_results=TOP_K)],
+            "hybrid": lambda q: [chunk["id"] for chunk in rag.query_chunks(q, TENANT, n_results=TOP_K)],
+        }
+
+        report = {
+            "config": {
+                "products": args.products,
+                "policies": args.policies,
+                "seed": args.seed,
+                "embedding": args.embedding,
+                "documents": len(docs),
+                "queries": len(queries),
+                "top_k": TOP_K,
+            },
+            "ingest_seconds": round(ingest_seconds, 4),
+            "bm25_index_build_seconds": round(index_build_seconds, 4),
+            "retrievers": {},
+        }
+
+        families = sorted({family for family, _, _ in queries})
+        for name, retrieve in retrievers.items():
+            latencies = []
+            hits = {family: [0, 0] for family in families}
+            reciprocal_ranks = []
+            for family, query, relevant in queries:
+                started = time.perf_counter()
+                ranked = retrieve(query)
+                latencies.append((time.perf_counter() - started) * 1000)
+                hits[family][1] += 1
+                if relevant in ranked:
+                    hits[family][0] += 1
+                    reciprocal_ranks.append(1.0 / (ranked.index(relevant) + 1))
+                else:
+                    reciprocal_ranks.append(0.0)
+
+            total_hits = sum(h for h, _ in hits.values())
+            report["retrievers"][name] = {
+                f"recall_at_{TOP_K}": round(total_hits / len(queries), 4),
+                "mrr": round(statistics.fmean(reciprocal_ranks), 4),
+                "recall_by_family": {family: round(h / n, 4) for family, (h, n) in hits.items()},
+                "latency_ms": {
+                    "p50": round(percentile(latencies, 50), 3),
+                    "p95": round(percentile(latencies, 95), 3),
+                    "mean": round(statistics.fmean(latencies), 3),
+                },
+            }
+
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=200)
+    parser.add_argument("--policies", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--embedding", choices=["default", "hash"], default="default")
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    report = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
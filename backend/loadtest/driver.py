@@ -0,0 +1,240 @@
+"""
+Concurrent widget-guest load driver.
+
+Simulates `--guests` visitors, at most `--concurrency` at a time, walking the widget flow
+of the tenants in a loadtest/seed.py manifest:
+
+    POST /widgets/guest/start/{public_widget_id}
+    POST /widgets/guest/session/init/{public_widget_id}   (first question)
+    POST /widgets/chat/{public_widget_id}/session/{id}    (--messages - 1 follow-ups)
+
+and reports per-endpoint p50/p95/p99 latency, throughput and errors as JSON. Answers
+that are the chat fallbacks ("I'm having trouble connecting ...") arrive as 200s but are
+counted as `degraded`, so LLM failures are not mistaken for fast successes.
+
+Run the backend against the fake LLM (loadtest/fake_llm.py) to avoid spending real quota,
+and with RATE_LIMIT_ENABLED=false (or generous RATE_LIMIT_* values): every simulated guest
+comes from the driver's IP, so the per-IP limit would otherwise show up as http_429 errors.
+
+Usage (from backend/):
+    uv run python -m loadtest.driver --manifest loadtest_manifest.json --guests 200 --concurrency 50
+    uv run python -m loadtest.driver --base-url http://127.0.0.1:8000 --llm-url http://127.0.0.1:8100 --output run.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.corpus import WORDS
+
+ENDPOINTS = ["guest_start", "session_init", "chat"]
+
+# Canned answers process_chat_message returns instead of raising
+FALLBACK_PREFIXES = (
+    "I'm having trouble connecting",
+    "Service unavailable:",
+    "Session message limit reached",
+    "We're receiving a lot of messages",
+)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Linear-interpolated percentile (q in 0..100) of an unsorted list."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low, high = math.floor(rank), math.ceil(rank)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+class Recorder:
+    """Collects (latency, outcome) samples per endpoint."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, endpoint: str, seconds: float, outcome: str) -> None:
+        self.latencies[endpoint].append(seconds)
+        self.outcomes[endpoint][outcome] += 1
+
+    def summary(self, wall_seconds: float) -> dict:
+        def describe(latencies: List[float], outcomes: Dict[str, int]) -> dict:
+            return {
+                "requests": len(latencies),
+                "ok": outcomes.get("ok", 0),
+                "degraded": outcomes.get("degraded", 0),
+                "errors": {k: v for k, v in sorted(outcomes.items()) if k not in ("ok", "degraded")},
+                "throughput_rps": round(len(latencies) / wall_seconds, 2) if wall_seconds else None,
+                "latency_ms": {
+                    "mean": round(1000 * sum(latencies) / len(latencies), 1) if latencies else None,
+                    **{
+                        f"p{q}": round(1000 * percentile(latencies, q), 1) if latencies else None
+                        for q in (50, 95, 99)
+                    },
+                    "max": round(1000 * max(latencies), 1) if latencies else None,
+                },
+            }
+
+        endpoints = {name: describe(self.latencies[name], self.outcomes[name]) for name in ENDPOINTS if name in self.latencies}
+        all_outcomes: Dict[str, int] = defaultdict(int)
+        for outcomes in self.outcomes.values():
+            for outcome, count in outcomes.items():
+                all_outcomes[outcome] += count
+        overall = describe([s for name in self.latencies for s in self.latencies[name]], all_outcomes)
+        return {"endpoints": endpoints, "overall": overall}
+
+
+def make_question(rng: random.Random, unique_tag: Optional[str] = None) -> str:
+    words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 7)))
+    question = f"What is your policy on {words}?"
+    return f"{question} ({unique_tag})" if unique_tag else question
+
+
+def _unwrap(body: dict) -> dict:
+    # Tolerate the success_response envelope as well as bare response models
+    return body["data"] if isinstance(body, dict) and isinstance(body.get("data"), dict) else body
+
+
+async def timed_post(client: httpx.AsyncClient, recorder: Recorder, endpoint: str, url: str, payload: dict) -> Optional[dict]:
+    started = time.perf_counter()
+    try:
+        response = await client.post(url, json=payload)
+    except httpx.HTTPError as e:
+        recorder.record(endpoint, time.perf_counter() - started, type(e).__name__)
+        return None
+    seconds = time.perf_counter() - started
+    if response.status_code >= 400:
+        recorder.record(endpoint, seconds, f"http_{response.status_code}")
+        return None
+    body = _unwrap(response.json())
+    answer = (body.get("response") or {}).get("message_text", "") if endpoint != "guest_start" else ""
+    recorder.record(endpoint, seconds, "degraded" if answer.startswith(FALLBACK_PREFIXES) else "ok")
+    return body
+
+
+async def run_guest(client: httpx.AsyncClient, recorder: Recorder, tenant: dict, guest_number: int, args, rng: random.Random) -> None:
+    widget_id = tenant["public_widget_id"]
+    unique = lambda n: f"guest {guest_number} msg {n}" if args.unique_questions else None
+
+    started = await timed_post(client, recorder, "guest_start", f"/widgets/guest/start/{widget_id}", {
+        "name": f"Load Guest {guest_number}",
+        "email": f"guest{guest_number}@loadtest.example.com",
+    })
+    if not started:
+        return
+
+    # Passing the country skips the GeoIP lookup so runs don't depend on ip-api.com
+    session = await timed_post(client, recorder, "session_init", f"/widgets/guest/session/init/{widget_id}", {
+        "guest_id": started["guest_id"],
+        "message": make_question(rng, unique(0)),
+        "origin": "manual",
+        "context": {"country": "Loadtest", "city": "Loadtest", "device_type": "desktop", "browser": "httpx"},
+    })
+    if not session:
+        return
+    session_id = session["message"]["session_id"]
+
+    for n in range(1, args.messages):
+        if args.think_time:
+            await asyncio.sleep(rng.uniform(0, 2 * args.think_time))
+        await timed_post(client, recorder, "chat", f"/widgets/chat/{widget_id}/session/{session_id}", {
+            "message": make_question(rng, unique(n)),
+        })
+
+
+async def run_load(args, tenants: List[dict]) -> dict:
+    recorder = Recorder()
+    rng = random.Random(args.seed)
+    semaphore = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        async def guest(number: int):
+            async with semaphore:
+                tenant = tenants[number % len(tenants)]
+                await run_guest(client, recorder, tenant, number, args, random.Random(rng.random()))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(guest(i) for i in range(args.guests)))
+        wall_seconds = time.perf_counter() - started
+
+    report = recorder.summary(wall_seconds)
+    report["wall_seconds"] = round(wall_seconds, 2)
+    return report
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--manifest", default="loadtest_manifest.json", help="Output of loadtest.seed")
+    parser.add_argument("--guests", type=int, default=50, help="Guests simulated in total")
+    parser.add_argument("--concurrency", type=int, default=10, help="Guests active at the same time")
+    parser.add_argument("--messages", type=int, default=3, help="Messages per guest session, including the first")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean pause between a guest's messages (s)")
+    parser.add_argument("--unique-questions", action="store_true", help="Tag questions so the semantic cache never hits")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--llm-url", help="Fake LLM base URL; its /stats are included in the report")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    with open(args.manifest) as f:
+        tenants = json.load(f)["tenants"]
+    if not tenants:
+        parser.error(f"{args.manifest} has no tenants; run loadtest.seed first")
+
+    report = {
+        "meta": {
+            "git_commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+        },
+        "config": {
+            "base_url": args.base_url,
+            "tenants": len(tenants),
+            "guests": args.guests,
+            "concurrency": args.concurrency,
+            "messages": args.messages,
+            "think_time": args.think_time,
+            "unique_questions": args.unique_questions,
+        },
+        **asyncio.run(run_load(args, tenants)),
+    }
+    if args.llm_url:
+        try:
+            report["llm"] = httpx.get(f"{args.llm_url.rstrip('/')}/stats", timeout=5).json()
+        except httpx.HTTPError as e:
+            report["llm"] = {"error": str(e)}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
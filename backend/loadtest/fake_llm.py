@@ -0,0 +1,237 @@
+"""
+Local OpenAI-compatible LLM server for load tests.
+
+Speaks just enough of POST /v1/chat/completions (plain and SSE streaming) for LiteLlm
+and the ADK agents: when the request offers tools and the last message is not a tool
+result it calls `get_context` with the user's question, otherwise it answers from the
+tool output. Latency is modelled as time-to-first-token plus a fixed token rate, and a
+fraction of requests can be failed on purpose.
+
+Point the backend at it with:
+    LLM_API_BASE=http://127.0.0.1:8100/v1 LLM_MODEL=openai/fake-llm uv run uvicorn app.main:app
+
+Usage (from backend/):
+    uv run python -m loadtest.fake_llm --port 8100 --ttft-ms 400 --tokens-per-second 60
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class FakeLLMConfig:
+    ttft_ms: float = 300.0  # Time to first token
+    jitter_ms: float = 50.0  # Uniform +/- noise on the time to first token
+    tokens_per_second: float = 50.0  # 0 = emit every token at once
+    answer_tokens: int = 60  # Words in a final answer
+    error_rate: float = 0.0  # Fraction of requests answered with `error_status`
+    error_status: int = 429
+    seed: Optional[int] = None
+
+
+@dataclass
+class FakeLLMStats:
+    requests: int = 0
+    tool_calls: int = 0
+    answers: int = 0
+    errors: int = 0
+    in_flight: int = 0
+    max_in_flight: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    started_at: float = field(default_factory=time.time)
+
+
+def _text(content: Any) -> str:
+    """Message content is either a string or a list of typed parts."""
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return ""
+
+
+def _count_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(len(_text(m.get("content")).split()) for m in messages)
+
+
+def plan_reply(messages: List[Dict[str, Any]], tools: List[Dict[str, Any]], answer_tokens: int) -> Dict[str, Any]:
+    """Decide the assistant turn: a get_context tool call or a final text answer.
+
+    Returns:
+        {"tool_call": {"name", "arguments"}} or {"content": str}
+    """
+    last = messages[-1] if messages else {}
+    question = next((_text(m.get("content")) for m in reversed(messages) if m.get("role") == "user"), "")
+    tool_names = [t.get("function", {}).get("name") for t in tools or []]
+
+    if last.get("role") != "tool" and "get_context" in tool_names:
+        return {"tool_call": {"name": "get_context", "arguments": {"user_input": question}}}
+
+    context = _text(last.get("content")) if last.get("role") == "tool" else ""
+    # ADK wraps function results as {"result": "..."}
+    try:
+        context = json.loads(context).get("result", context)
+    except (ValueError, AttributeError):
+        pass
+    words = str(context).split() or f"I could not find anything about {question} in our documents".split()
+    reply = ["Based", "on", "our", "records:"]
+    while len(reply) < answer_tokens:
+        reply.extend(words[:answer_tokens - len(reply)])
+    return {"content": " ".join(reply)}
+
+
+def create_app(config: Optional[FakeLLMConfig] = None) -> FastAPI:
+    config = config or FakeLLMConfig()
+    rng = random.Random(config.seed)
+    stats = FakeLLMStats()
+    app = FastAPI(title="Fake LLM")
+    app.state.config = config
+    app.state.stats = stats
+
+    def first_token_delay() -> float:
+        return max(0.0, config.ttft_ms + rng.uniform(-config.jitter_ms, config.jitter_ms)) / 1000
+
+    def token_delay() -> float:
+        return 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+    @app.get("/health")
+    def health():
+        return {"status": "ok"}
+
+    @app.get("/stats")
+    def get_stats():
+        return {**asdict(stats), "uptime_seconds": round(time.time() - stats.started_at, 1), "config": asdict(config)}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats.requests += 1
+        stats.in_flight += 1
+        stats.max_in_flight = max(stats.max_in_flight, stats.in_flight)
+        try:
+            if config.error_rate and rng.random() < config.error_rate:
+                stats.errors += 1
+                await asyncio.sleep(first_token_delay())
+                return JSONResponse(
+                    status_code=config.error_status,
+                    content={"error": {"message": "Injected failure", "type": "fake_llm_error", "code": config.error_status}},
+                )
+
+            messages = body.get("messages", [])
+            plan = plan_reply(messages, body.get("tools"), config.answer_tokens)
+            completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+            model = body.get("model", "fake-llm")
+            prompt_tokens = _count_tokens(messages)
+            stats.prompt_tokens += prompt_tokens
+
+            if "tool_call" in plan:
+                stats.tool_calls += 1
+                tool_call = {
+                    "id": f"call_{uuid.uuid4().hex[:24]}",
+                    "type": "function",
+                    "function": {"name": plan["tool_call"]["name"], "arguments": json.dumps(plan["tool_call"]["arguments"])},
+                }
+                tokens = [tool_call]
+                completion_tokens = len(tool_call["function"]["arguments"].split())
+            else:
+                stats.answers += 1
+                tokens = [word + " " for word in plan["content"].split()]
+                completion_tokens = len(tokens)
+            stats.completion_tokens += completion_tokens
+            usage = {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }
+            finish_reason = "tool_calls" if "tool_call" in plan else "stop"
+
+            if body.get("stream"):
+                return StreamingResponse(
+                    _stream(completion_id, model, tokens, finish_reason, usage),
+                    media_type="text/event-stream",
+                )
+
+            await asyncio.sleep(first_token_delay() + token_delay() * completion_tokens)
+            if "tool_call" in plan:
+                message = {"role": "assistant", "content": None, "tool_calls": tokens}
+            else:
+                message = {"role": "assistant", "content": "".join(tokens).strip()}
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            }
+        finally:
+            stats.in_flight -= 1
+
+    async def _stream(completion_id: str, model: str, tokens: list, finish_reason: str, usage: dict):
+        def chunk(delta: dict, finish: Optional[str] = None, **extra) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+                **extra,
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        await asyncio.sleep(first_token_delay())
+        for i, token in enumerate(tokens):
+            if i:
+                await asyncio.sleep(token_delay())
+            if isinstance(token, dict):
+                delta = {"role": "assistant", "tool_calls": [{"index": 0, **token}]}
+            else:
+                delta = {"role": "assistant", "content": token} if i == 0 else {"content": token}
+            yield chunk(delta)
+        yield chunk({}, finish_reason, usage=usage)
+        yield "data: [DONE]\n\n"
+
+    return app
+
+
+def main(argv=None) -> int:
+    import uvicorn
+
+    defaults = FakeLLMConfig()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--ttft-ms", type=float, default=defaults.ttft_ms)
+    parser.add_argument("--jitter-ms", type=float, default=defaults.jitter_ms)
+    parser.add_argument("--tokens-per-second", type=float, default=defaults.tokens_per_second)
+    parser.add_argument("--answer-tokens", type=int, default=defaults.answer_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    config = FakeLLMConfig(
+        ttft_ms=args.ttft_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        answer_tokens=args.answer_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
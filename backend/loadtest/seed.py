@@ -0,0 +1,140 @@
+"""
+Seed businesses, widgets and knowledge-base documents for load tests.
+
+Each tenant gets a user, a business with an (encrypted) placeholder Gemini key - real
+calls go to the fake LLM via LLM_API_BASE - a widget whose per-session and per-day limits
+are high enough not to cut the run short, and a few deterministic FAQ documents from
+benchmarks/corpus.py ingested through RAGService. Re-running is idempotent: tenants are
+matched by email and their documents re-synced incrementally.
+
+The manifest written at the end is the input of loadtest/driver.py.
+
+Usage (from backend/):
+    uv run python -m loadtest.seed --businesses 5 --documents 3 --output loadtest_manifest.json
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from app.db.base import Base
+from app.db.session import SessionLocal, engine, SQLALCHEMY_DATABASE_URL
+from app.models.user import User # Import models to register them
+from app.models.document import Document
+from app.models.business import Business
+from app.models.widget import WidgetSettings, GuestUser, GuestMessage
+from app.models.chat_session import ChatSession
+from app.models.analytics import AnalyticsDailySummary
+from app.core.security import get_password_hash
+from app.core.security_utils import encrypt_string
+from app.services.rag_service import rag_service
+from app.utils.hashing import HashingReader
+from benchmarks.corpus import write_text, parse_size
+
+EMAIL_TEMPLATE = "loadtest-{}@loadtest.example.com"
+PLACEHOLDER_API_KEY = "fake-llm-key"
+
+
+def seed_tenant(db, index: int, args) -> dict:
+    email = EMAIL_TEMPLATE.format(index)
+    user = db.query(User).filter(User.email == email).first()
+    if not user:
+        user = User(email=email, name=f"Load Test {index}", hashed_password=get_password_hash("loadtest"))
+        db.add(user)
+        db.flush()
+
+    business = db.query(Business).filter(Business.user_id == user.id).first()
+    if not business:
+        business = Business(user_id=user.id, business_name=f"Load Test Shop {index}")
+        db.add(business)
+    business.gemini_api_key = encrypt_string(PLACEHOLDER_API_KEY)
+    business.intents = ["orders", "refunds", "delivery"]
+
+    widget = db.query(WidgetSettings).filter(WidgetSettings.user_id == user.id).first()
+    if not widget:
+        widget = WidgetSettings(user_id=user.id)
+        db.add(widget)
+    widget.max_messages_per_session = args.max_messages_per_session
+    widget.max_sessions_per_day = args.max_sessions_per_day
+    widget.whitelisted_domains = None
+    db.commit()
+
+    return {
+        "user_id": user.id,
+        "email": email,
+        "business_name": business.business_name,
+        "public_widget_id": widget.public_widget_id,
+    }
+
+
+def seed_documents(db, tenant: dict, index: int, args, workdir: str) -> int:
+    user_id = tenant["user_id"]
+    for n in range(args.documents):
+        filename = f"faq_{n}.txt"
+        source = os.path.join(workdir, f"{user_id}_{filename}")
+        # Seed per tenant and document so every knowledge base differs but is reproducible
+        write_text(source, parse_size(args.document_size), seed=args.seed + 1000 * index + n)
+        with open(source, "rb") as f:
+            reader = HashingReader(f)
+            file_path = rag_service.file_storage.save(reader, filename, user_id)
+
+        doc = db.query(Document).filter(Document.user_id == user_id, Document.filename == filename).first()
+        if doc and doc.content_hash == reader.hexdigest() and doc.status == "processed":
+            continue
+        if not doc:
+            doc = Document(user_id=user_id, filename=filename)
+            db.add(doc)
+        doc.file_path = file_path
+        doc.content_hash = reader.hexdigest()
+        doc.size_bytes = reader.bytes_read
+        doc.status = "pending"
+        db.commit()
+
+    if args.skip_ingest:
+        return 0
+    results = rag_service.process_documents(user_id, db)
+    failed = [r for r in results if r.status != "success"]
+    if failed:
+        raise RuntimeError(f"Ingestion failed for {tenant['email']}: {[(r.filename, r.status) for r in failed]}")
+    return sum(r.chunks_created for r in results)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--businesses", type=int, default=3)
+    parser.add_argument("--documents", type=int, default=2, help="FAQ documents per business")
+    parser.add_argument("--document-size", default="20KB")
+    parser.add_argument("--max-messages-per-session", type=int, default=10_000)
+    parser.add_argument("--max-sessions-per-day", type=int, default=100_000)
+    parser.add_argument("--skip-ingest", action="store_true", help="Register documents without embedding them")
+    parser.add_argument("--create-tables", action="store_true", help="create_all() first (throwaway SQLite databases)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="loadtest_manifest.json")
+    args = parser.parse_args(argv)
+
+    if args.create_tables:
+        Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    tenants = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="loadtest_seed_") as workdir:
+            for i in range(args.businesses):
+                tenant = seed_tenant(db, i, args)
+                tenant["chunks"] = seed_documents(db, tenant, i, args, workdir)
+                tenants.append(tenant)
+                print(f"Seeded {tenant['business_name']}: widget {tenant['public_widget_id']}, {tenant['chunks']} chunks")
+    finally:
+        db.close()
+
+    manifest = {"database_url": SQLALCHEMY_DATABASE_URL, "tenants": tenants}
+    with open(args.output, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    print(f"Manifest written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
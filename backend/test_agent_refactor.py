@@ -1,6 +1,6 @@
 import asyncio
 import os
-from app.services.agent_service import run_conversation, session_service, APP_NAME, USER_ID, SESSION_ID
+from app.services.agent_service import run_conversation, get_session_service, APP_NAME, USER_ID, SESSION_ID
 
 async def verify_refactor():
     print("--- Starting Verification ---")
@@ -38,7 +38,7 @@ async def verify_refactor():
     # 4. Test Session State - Checks if output_key worked (depends on previous tests)
     print("\n[Test 4] Session State: Check output_key")
     try:
-        session = await session_service.get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
+        session = await get_session_service().get_session(app_name=APP_NAME, user_id=USER_ID, session_id=SESSION_ID)
         last_response = session.state.get("last_agent_response")
         print(f"Last Agent Response in State: {last_response}")
         # If Guardrail passed, last_response should be the block message
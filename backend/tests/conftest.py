@@ -8,6 +8,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 # Mock external services before importing app
 sys.modules['chromadb'] = MagicMock()
 sys.modules['chromadb.config'] = MagicMock()
+sys.modules['chromadb.utils'] = MagicMock()
 sys.modules['google.generativeai'] = MagicMock()
 
 from app.db.session import get_db
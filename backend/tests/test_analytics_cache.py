@@ -0,0 +1,78 @@
+import threading
+import time
+import pytest
+from app.services.analytics_cache import AnalyticsCache
+
+
+def test_results_are_cached_per_widget_panel_and_window():
+    cache = AnalyticsCache(ttl_seconds=60)
+    calls = []
+
+    def compute(value):
+        def run():
+            calls.append(value)
+            return value
+        return run
+
+    assert cache.get_or_compute("w1", "overview", 30, compute("a")) == "a"
+    assert cache.get_or_compute("w1", "overview", 30, compute("b")) == "a"
+    assert cache.get_or_compute("w1", "overview", 7, compute("c")) == "c"
+    assert cache.get_or_compute("w2", "overview", 30, compute("d")) == "d"
+    assert calls == ["a", "c", "d"]
+
+
+def test_new_session_invalidates_only_that_widget():
+    cache = AnalyticsCache(ttl_seconds=60)
+    cache.get_or_compute("w1", "trend", 30, lambda: 1)
+    cache.get_or_compute("w2", "trend", 30, lambda: 1)
+
+    cache.invalidate("w1")
+
+    assert cache.get_or_compute("w1", "trend", 30, lambda: 2) == 2
+    assert cache.get_or_compute("w2", "trend", 30, lambda: 2) == 1
+
+
+def test_expired_entries_are_recomputed():
+    cache = AnalyticsCache(ttl_seconds=0.01)
+    cache.get_or_compute("w1", "intents", 30, lambda: 1)
+    time.sleep(0.02)
+    assert cache.get_or_compute("w1", "intents", 30, lambda: 2) == 2
+
+
+def test_concurrent_misses_compute_once():
+    cache = AnalyticsCache(ttl_seconds=60)
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        started.set()
+        release.wait(timeout=5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("w1", "sources", 30, slow)))
+               for _ in range(5)]
+    threads[0].start()
+    started.wait(timeout=5)
+    for thread in threads[1:]:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+
+
+def test_failed_computation_is_not_cached():
+    cache = AnalyticsCache(ttl_seconds=60)
+
+    def fail():
+        raise RuntimeError("database unavailable")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute("w1", "overview", 30, fail)
+    assert cache.get_or_compute("w1", "overview", 30, lambda: "ok") == "ok"
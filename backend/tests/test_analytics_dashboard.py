@@ -0,0 +1,96 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.base import Base
+from app.models.chat_session import ChatSession
+from app.models.widget import GuestUser, WidgetSettings
+from app.api.analytics import (
+    _compute_dashboard,
+    _compute_intents,
+    _compute_locations,
+    _compute_overview,
+    _compute_sources,
+    _compute_trend,
+    summarize_sessions,
+)
+
+NOW = datetime.utcnow()
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    session.add(WidgetSettings(id="w1", user_id="u1"))
+    session.add(WidgetSettings(id="w2", user_id="u2"))
+    session.add_all([
+        GuestUser(id="g1", widget_id="w1", name="Ada", is_lead=True, is_returning=True),
+        GuestUser(id="g2", widget_id="w1", name="Bo"),
+        GuestUser(id="g3", widget_id="w1", name="Cy", is_returning=True),
+        GuestUser(id="g4", widget_id="w2", name="Other widget", is_lead=True),
+    ])
+    sessions = [
+        ("g1", 1, 120, "Pricing", "NG", "Lagos", "google.com"),
+        ("g1", 2, 60, "Pricing", "NG", "Lagos", "google.com"),
+        ("g1", 2, 0, "Pricing", "NG", "Lagos", "twitter.com"),
+        ("g2", 3, 30, "Support", "NG", None, "google.com"),
+        ("g3", 3, 90, None, None, None, None),
+        ("g3", 45, 500, "Support", "GH", "Accra", "bing.com"),  # outside the 30 day window
+        ("g4", 1, 10, "Pricing", "US", "Austin", "google.com"),  # another widget
+    ]
+    for guest_id, days_ago, duration, intent, country, city, referrer in sessions:
+        session.add(ChatSession(
+            guest_id=guest_id, created_at=NOW - timedelta(days=days_ago), session_duration=duration,
+            top_intent=intent, country=country, city=city, referrer=referrer,
+        ))
+    session.commit()
+    yield session
+    session.close()
+
+
+def test_dashboard_matches_the_per_panel_endpoints(db):
+    widget = db.get(WidgetSettings, "w1")
+
+    dashboard = _compute_dashboard(db, widget, 30)
+
+    assert dashboard["overview"] == _compute_overview(db, widget, 30)
+    assert dashboard["intents"] == _compute_intents(db, widget, 30)
+    assert dashboard["locations"] == _compute_locations(db, widget, 30)
+    assert dashboard["sources"] == _compute_sources(db, widget, 30)
+    assert dashboard["trend"] == _compute_trend(db, widget, 30)
+    assert dashboard["overview"] == {
+        "total_sessions": 5,
+        "total_guests": 3,
+        "leads_captured": 1,
+        "avg_session_duration": 60,
+        "returning_guests_percentage": 66,
+    }
+
+
+def test_dashboard_reads_the_window_in_one_statement(db):
+    widget = db.get(WidgetSettings, "w1")
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+
+    _compute_dashboard(db, widget, 30)
+
+    assert len(statements) == 1
+
+
+def test_empty_window():
+    assert summarize_sessions([]) == {
+        "overview": {
+            "total_sessions": 0,
+            "total_guests": 0,
+            "leads_captured": 0,
+            "avg_session_duration": 0,
+            "returning_guests_percentage": 0,
+        },
+        "intents": [],
+        "locations": [],
+        "sources": [],
+        "trend": [],
+    }
@@ -0,0 +1,49 @@
+from app.utils.context_assembler import assemble_context, estimate_tokens, merge_adjacent_chunks
+from app.utils.text_splitter import recursive_character_text_splitter
+
+HANDBOOK = " ".join(f"Section {i}: employees accrue {i} days of leave after {i * 3} months of service." for i in range(60))
+
+
+def chunk_dicts(filename="handbook.txt"):
+    chunks = recursive_character_text_splitter(HANDBOOK)
+    return [{"text": c, "metadata": {"filename": filename, "chunk_index": i}} for i, c in enumerate(chunks)]
+
+
+def test_adjacent_chunks_are_stitched_without_overlap():
+    chunks = chunk_dicts()
+    retrieved = [chunks[2], chunks[1], chunks[3]]
+
+    passages = merge_adjacent_chunks(retrieved)
+
+    assert len(passages) == 1
+    assert passages[0]["rank"] == 0
+    assert passages[0]["text"] in HANDBOOK
+    assert len(passages[0]["text"]) < sum(len(c["text"]) for c in retrieved)
+
+
+def test_non_adjacent_chunks_stay_separate_in_relevance_order():
+    chunks = chunk_dicts()
+    passages = merge_adjacent_chunks([chunks[5], chunks[1]])
+
+    assert [p["text"] for p in passages] == [chunks[5]["text"], chunks[1]["text"]]
+
+
+def test_near_duplicates_from_reuploaded_file_are_dropped():
+    original = chunk_dicts("handbook.txt")[0]
+    reupload = {"text": original["text"] + " Updated.", "metadata": {"filename": "handbook_v2.txt", "chunk_index": 0}}
+
+    context = assemble_context([original, reupload])
+
+    assert context == original["text"].strip()
+
+
+def test_budget_keeps_most_relevant_and_skips_what_does_not_fit():
+    short = {"text": "Returns are accepted within 30 days.", "metadata": {}}
+    long = {"text": "Warranty details. " * 200, "metadata": {}}
+
+    context = assemble_context([short, long], max_tokens=50)
+    assert context == short["text"]
+
+    truncated = assemble_context([long, short], max_tokens=50)
+    assert truncated.startswith("Warranty details.")
+    assert estimate_tokens(truncated) <= 50
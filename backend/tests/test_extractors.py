@@ -0,0 +1,140 @@
+import os
+import zipfile
+import pytest
+from app.models.document import Document
+from app.services import extractors
+from app.services.extractors import (
+    CSV, DOCX, HTML, MARKDOWN, PDF, PLAIN_TEXT,
+    ExtractionPool, UnsupportedFileType, extract_text, sniff_mime,
+)
+from app.services.rag_service import rag_service
+from tests.test_streaming_ingestion import CountingVectorDB, NullKeywordIndex
+
+W = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+
+def write(tmp_path, name, content):
+    path = tmp_path / name
+    if isinstance(content, bytes):
+        path.write_bytes(content)
+    else:
+        path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def write_docx(tmp_path, name, body):
+    path = tmp_path / name
+    with zipfile.ZipFile(path, "w") as archive:
+        archive.writestr("word/document.xml", f"<w:document {W}><w:body>{body}</w:body></w:document>")
+    return str(path)
+
+
+def text_of(path, filename=None):
+    return "".join(extract_text(path, filename or os.path.basename(path)))
+
+
+def test_sniffing_prefers_content_over_extension(tmp_path):
+    assert sniff_mime(write(tmp_path, "scan.txt", b"%PDF-1.4\n..."), "scan.txt") == PDF
+    assert sniff_mime(write(tmp_path, "page.txt", "  <!DOCTYPE html><html></html>"), "page.txt") == HTML
+    assert sniff_mime(write_docx(tmp_path, "notes.bin", ""), "notes.bin") == DOCX
+    assert sniff_mime(write(tmp_path, "prices.csv", "a,b\n1,2\n"), "prices.csv") == CSV
+    assert sniff_mime(write(tmp_path, "faq.md", "# FAQ\n"), "faq.md") == MARKDOWN
+    assert sniff_mime(write(tmp_path, "faq", "plain words"), "faq") == PLAIN_TEXT
+
+
+def test_unsupported_binary_is_rejected(tmp_path):
+    path = write(tmp_path, "photo.txt", b"\x89PNG\r\n\x1a\n\x00\x00")
+    with pytest.raises(UnsupportedFileType):
+        text_of(path)
+
+
+def test_html_boilerplate_is_removed(tmp_path):
+    path = write(tmp_path, "help.html", """<!DOCTYPE html><html><head><title>Help</title>
+        <style>p { color: red }</style><script>var tracking = 1;</script></head><body>
+        <header><nav><a href="/">Home</a> <a href="/shop">Shop</a></nav></header>
+        <div class="cookie-banner">We use cookies</div>
+        <main><h1>Returns</h1><p>Returns are accepted within &lt;30&gt; days.</p>
+        <table><tr><th>Size</th><th>Fee</th></tr><tr><td>Large</td><td>$5</td></tr></table></main>
+        <footer>All rights reserved</footer></body></html>""")
+
+    text = text_of(path)
+
+    assert "Returns are accepted within <30> days." in text
+    assert "Large" in text and "$5" in text
+    for noise in ["tracking", "color", "Shop", "cookies", "rights reserved"]:
+        assert noise not in text
+
+
+def test_docx_paragraphs_and_tables(tmp_path):
+    row = lambda *cells: "<w:tr>" + "".join(f"<w:tc><w:p><w:r><w:t>{c}</w:t></w:r></w:p></w:tc>" for c in cells) + "</w:tr>"
+    path = write_docx(tmp_path, "policy.docx", (
+        "<w:p><w:r><w:t>Opening hours</w:t></w:r><w:r><w:tab/><w:t>9 to 5</w:t></w:r></w:p>"
+        f"<w:tbl>{row('Plan', 'Price')}{row('Basic', '$10')}{row('Pro', '$25')}</w:tbl>"
+    ))
+
+    text = text_of(path)
+
+    assert "Opening hours\t9 to 5" in text
+    assert "Plan: Basic | Price: $10" in text
+    assert "Plan: Pro | Price: $25" in text
+
+
+def test_csv_rows_carry_their_headers(tmp_path):
+    path = write(tmp_path, "stock.csv", "sku;name;price\nSKU-1;Kettle;19.99\nSKU-2;\"Toaster; 2 slot\";24.50\n")
+
+    lines = text_of(path).splitlines()
+
+    assert lines == ["sku: SKU-1 | name: Kettle | price: 19.99", "sku: SKU-2 | name: Toaster; 2 slot | price: 24.50"]
+
+
+def test_markdown_tables_are_flattened(tmp_path):
+    path = write(tmp_path, "menu.md", "# Menu\n\n| Dish | Price |\n|---|---:|\n| Soup | 4 |\n| Pie | 6 |\n\nAll dishes are vegan | gluten free.\n")
+
+    text = text_of(path)
+
+    assert "# Menu" in text
+    assert "Dish: Soup | Price: 4" in text and "Dish: Pie | Price: 6" in text
+    assert "All dishes are vegan | gluten free." in text
+
+
+def test_pool_extracts_in_worker_processes(tmp_path):
+    path = write(tmp_path, "faq.html", "<html><body><p>Worker extracted</p></body></html>")
+    pool = ExtractionPool(max_workers=1)
+    try:
+        # Never forked from the (threaded) API process
+        assert pool._get_executor()._mp_context.get_start_method() == "spawn"
+        extracted = pool.submit(path, "faq.html").result(timeout=30)
+    finally:
+        pool.shutdown()
+
+    assert extracted.temporary and extracted.mime_type == HTML
+    with open(extracted.path, encoding="utf-8") as f:
+        assert "Worker extracted" in f.read()
+    os.remove(extracted.path)
+
+
+def test_process_documents_ingests_mixed_formats(db_session, tmp_path, monkeypatch):
+    store = CountingVectorDB()
+    monkeypatch.setattr(rag_service, "vector_db", store)
+    monkeypatch.setattr(rag_service, "keyword_index", NullKeywordIndex())
+    monkeypatch.setattr(rag_service, "extraction_pool", ExtractionPool(max_workers=0))
+    files = {
+        "a.html": write(tmp_path, "a.html", "<html><body><p>Refunds take 14 days.</p></body></html>"),
+        "b.csv": write(tmp_path, "b.csv", "q,a\nHours?,9-5\n"),
+        "c.docx": write_docx(tmp_path, "c.docx", "<w:p><w:r><w:t>Warranty is two years.</w:t></w:r></w:p>"),
+        "d.zip": write(tmp_path, "d.zip", b"PK\x03\x04 not really a zip"),
+    }
+    monkeypatch.setattr(rag_service.file_storage, "get_full_path", lambda file_path: files[file_path])
+    leftovers = lambda: {f for f in os.listdir(extractors.tempfile.gettempdir()) if f.startswith("extracted_")}
+    before = leftovers()
+    for name in files:
+        db_session.add(Document(user_id="u1", filename=name, file_path=name, status="pending"))
+    db_session.commit()
+
+    results = {r.filename: r for r in rag_service.process_documents("u1", db_session)}
+
+    assert [results[n].status for n in ["a.html", "b.csv", "c.docx"]] == ["success"] * 3
+    assert results["d.zip"].status.startswith("error")
+    assert results["d.zip"].status == "error: Unsupported file type: application/zip"
+    # Extracted text files are cleaned up after ingestion
+    assert leftovers() == before
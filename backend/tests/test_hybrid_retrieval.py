@@ -0,0 +1,144 @@
+import threading
+import time
+import pytest
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.base import Base
+from app.models.cache_generation import CacheGeneration # Import to register the table
+from app.services.cache_generations import CacheGenerations
+from app.services.keyword_index import BM25Index, KeywordIndexService, tokenize
+from app.services.rag_service import rag_service
+from app.utils.similarity import reciprocal_rank_fusion
+
+
+def test_tokenize_keeps_compound_tokens():
+    tokens = tokenize("Order SKU-48213 costs $49.99")
+    assert "sku-48213" in tokens
+    assert "48213" in tokens
+    assert "49.99" in tokens
+
+
+def test_bm25_ranks_exact_sku_first_and_supports_delete():
+    index = BM25Index()
+    index.add("a", "The blue kettle, SKU-10001, holds 1.7 litres.", {"filename": "kettles.txt"})
+    index.add("b", "The red kettle, SKU-10002, holds 1.5 litres.", {"filename": "kettles.txt"})
+    index.add("c", "Refunds are processed within 14 days.", {"filename": "policy.txt"})
+
+    assert index.search("Is SKU-10002 in stock?", n_results=1)[0][0] == "b"
+
+    assert index.remove_where(filename="kettles.txt") == 2
+    assert len(index) == 1
+    assert index.search("SKU-10002") == []
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "a", "d"]])
+    assert fused[0] == "a"
+    assert set(fused) == {"a", "b", "c", "d"}
+
+
+@pytest.fixture
+def hybrid_rag(monkeypatch):
+    vector_db = MagicMock()
+    vector_db.get.return_value = {
+        "ids": ["c1", "c2", "c3"],
+        "documents": ["Kettle SKU-10001 is blue.", "Kettle SKU-10002 is red.", "Shipping takes 3 days."],
+        "metadatas": [{"user_id": "u1", "filename": "f.txt"}] * 3,
+    }
+    # Embeddings put the wrong kettle first and miss the right one entirely
+    vector_db.query.return_value = {"ids": [["c1", "c3"]], "documents": [["Kettle SKU-10001 is blue.", "Shipping takes 3 days."]]}
+    monkeypatch.setattr(rag_service, "vector_db", vector_db)
+    monkeypatch.setattr(rag_service, "keyword_index", KeywordIndexService(vector_db))
+    return vector_db
+
+
+def test_query_fuses_keyword_hits(hybrid_rag):
+    results = rag_service.query("Do you sell SKU-10002?", "u1", n_results=2)
+
+    assert "Kettle SKU-10002 is red." in results
+    hybrid_rag.get.assert_called_once_with(where={"user_id": "u1"})
+
+
+def test_query_falls_back_to_vector_only(hybrid_rag, monkeypatch):
+    broken = MagicMock()
+    broken.search.side_effect = RuntimeError("index unavailable")
+    monkeypatch.setattr(rag_service, "keyword_index", broken)
+
+    assert rag_service.query("SKU-10002", "u1", n_results=2) == ["Kettle SKU-10001 is blue.", "Shipping takes 3 days."]
+
+
+def tenant_store(rows):
+    """A vector store whose rows (id -> (user_id, text)) can change between loads."""
+    vector_db = MagicMock()
+
+    def get(where):
+        hits = [(doc_id, text) for doc_id, (user_id, text) in rows.items() if user_id == where["user_id"]]
+        return {
+            "ids": [h[0] for h in hits],
+            "documents": [h[1] for h in hits],
+            "metadatas": [{"user_id": where["user_id"], "filename": "f.txt"}] * len(hits),
+        }
+
+    vector_db.get.side_effect = get
+    return vector_db
+
+
+def test_indexes_are_capped_least_recently_used_first():
+    rows = {f"{user}-{i}": (user, f"chunk {i} of {user}") for user in ("u1", "u2", "u3") for i in range(2)}
+    service = KeywordIndexService(tenant_store(rows), max_chunks=4)
+
+    service.search("u1", "chunk")
+    service.search("u2", "chunk")
+    service.search("u1", "chunk")
+    service.search("u3", "chunk")
+
+    assert set(service._indexes) == {"u1", "u3"}
+
+
+def test_changes_on_another_worker_rebuild_in_the_background():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(bind=engine)
+    rows = {"c1": ("u1", "Kettle SKU-10001 is blue."), "c2": ("u1", "Kettle SKU-10002 is red.")}
+    vector_db = tenant_store(rows)
+    worker_a = KeywordIndexService(vector_db, generations=CacheGenerations(session_factory, 0))
+    worker_b = KeywordIndexService(vector_db, generations=CacheGenerations(session_factory, 0))
+    assert [hit[0] for hit in worker_b.search("u1", "10002")] == ["c2"]
+
+    # The document is deleted through worker A
+    del rows["c2"]
+    worker_a.delete_ids("u1", ["c2"])
+    worker_a.publish("u1")
+
+    # Worker B answers from its current index and rebuilds it off the request path
+    assert [hit[0] for hit in worker_b.search("u1", "10002")] == ["c2"]
+    deadline = time.monotonic() + 5
+    while worker_b.search("u1", "10002") and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert worker_b.search("u1", "10002") == []
+    assert vector_db.get.call_count == 2
+
+
+def test_index_can_be_searched_while_it_is_updated():
+    index = BM25Index()
+    for i in range(200):
+        index.add(f"seed-{i}", f"kettle {i} stock")
+    errors = []
+
+    def search():
+        try:
+            for _ in range(200):
+                index.search_chunks("kettle stock", n_results=5)
+        except Exception as e:
+            errors.append(e)
+
+    reader = threading.Thread(target=search)
+    reader.start()
+    for i in range(2000):
+        index.add(f"new-{i}", f"kettle {i} stock level")
+        index.remove(f"new-{i - 1}")
+    reader.join()
+
+    assert errors == []
@@ -0,0 +1,142 @@
+import asyncio
+import io
+import pytest
+from unittest.mock import MagicMock
+from app.services.file_storage import LocalFileStorage
+from app.services.keyword_index import KeywordIndexService
+from app.services.rag_service import rag_service
+from app.models.document import Document
+
+
+class FakeVectorDB:
+    """In-memory stand-in for VectorDBService that records embedding work."""
+
+    def __init__(self):
+        self.rows = {}
+        self.embedded = 0
+
+    def add_documents(self, documents, metadatas, ids):
+        self.embedded += len(documents)
+        for doc_id, text, metadata in zip(ids, documents, metadatas):
+            self.rows[doc_id] = (text, metadata)
+
+    def update_metadatas(self, ids, metadatas):
+        for doc_id, metadata in zip(ids, metadatas):
+            self.rows[doc_id] = (self.rows[doc_id][0], metadata)
+
+    def _matches(self, metadata, where):
+        clauses = where.get("$and", [where])
+        return all(metadata.get(k) == v for clause in clauses for k, v in clause.items())
+
+    def get(self, where=None, ids=None, include=None):
+        hits = [(i, t, m) for i, (t, m) in self.rows.items() if self._matches(m, where)]
+        return {"ids": [h[0] for h in hits], "documents": [h[1] for h in hits], "metadatas": [h[2] for h in hits]}
+
+    def delete(self, where=None, ids=None):
+        doomed = ids or [i for i, (_, m) in self.rows.items() if self._matches(m, where)]
+        for doc_id in doomed:
+            self.rows.pop(doc_id, None)
+
+
+@pytest.fixture
+def ingestion(tmp_path, monkeypatch):
+    vector_db = FakeVectorDB()
+    monkeypatch.setattr(rag_service, "vector_db", vector_db)
+    monkeypatch.setattr(rag_service, "keyword_index", KeywordIndexService(vector_db))
+    monkeypatch.setattr(rag_service, "file_storage", LocalFileStorage(base_dir=str(tmp_path / "uploads")))
+    return vector_db
+
+
+def upload(db_session, name, content):
+    file = MagicMock()
+    file.filename = name
+    file.file = io.BytesIO(content.encode())
+    return asyncio.new_event_loop().run_until_complete(rag_service.upload_document(file, "u1", db_session))
+
+
+HANDBOOK = "\n\n".join(f"Section {i}. " + ("Leave policy details. " * 30) + f"End of section {i}." for i in range(10))
+
+
+def test_identical_reupload_is_a_noop(db_session, ingestion):
+    upload(db_session, "handbook.txt", HANDBOOK)
+    rag_service.process_documents("u1", db_session)
+
+    upload(db_session, "handbook.txt", HANDBOOK)
+
+    docs = db_session.query(Document).filter(Document.user_id == "u1").all()
+    assert len(docs) == 1
+    assert docs[0].status == "processed"
+    assert len(docs[0].content_hash) == 64
+
+
+def test_edited_reupload_embeds_only_the_diff(db_session, ingestion):
+    upload(db_session, "handbook.txt", HANDBOOK)
+    first = rag_service.process_documents("u1", db_session)[0]
+    embedded_initially = ingestion.embedded
+    assert first.chunks_created == embedded_initially > 3
+
+    edited = HANDBOOK.replace("End of section 9.", "End of section 9, revised.")
+    upload(db_session, "handbook.txt", edited)
+    second = rag_service.process_documents("u1", db_session)[0]
+
+    assert second.chunks_created == 1
+    assert second.chunks_deleted == 1
+    assert second.chunks_unchanged == first.chunks_created - 1
+    assert ingestion.embedded == embedded_initially + 1
+    assert sorted(m["chunk_index"] for _, m in ingestion.rows.values()) == list(range(first.chunks_created))
+
+    # The superseded file is removed, the document row is reused
+    docs = db_session.query(Document).filter(Document.user_id == "u1").all()
+    assert len(docs) == 1
+    assert rag_service.file_storage.list_files("u1") == [docs[0].file_path.rsplit("/", 1)[-1]]
+
+
+def test_same_name_different_content_does_not_overwrite(tmp_path):
+    storage = LocalFileStorage(base_dir=str(tmp_path))
+    first = storage.save(io.BytesIO(b"v1"), "faq.txt", "u1")
+    second = storage.save(io.BytesIO(b"v2"), "faq.txt", "u1")
+
+    assert first != second
+    assert open(first, "rb").read() == b"v1"
+    # Identical content under another name shares the stored file
+    assert storage.save(io.BytesIO(b"v1"), "copy.txt", "u1") == first
+
+
+class CountingGenerations:
+    def __init__(self):
+        self.bumps = 0
+
+    def current(self, scope, key):
+        return self.bumps
+
+    def bump(self, scope, key):
+        self.bumps += 1
+        return self.bumps
+
+
+def test_keyword_index_change_is_published_once_per_document(db_session, ingestion, monkeypatch):
+    generations = CountingGenerations()
+    monkeypatch.setattr(rag_service, "keyword_index", KeywordIndexService(ingestion, generations=generations))
+    monkeypatch.setattr("app.services.rag_service.EMBED_BATCH_SIZE", 2)
+
+    upload(db_session, "handbook.txt", HANDBOOK)
+    result = rag_service.process_documents("u1", db_session)[0]
+
+    assert result.chunks_created > 2
+    assert generations.bumps == 1
+
+
+def test_deleting_a_document_keeps_a_same_named_documents_chunks(db_session, ingestion):
+    upload(db_session, "faq.txt", "Refunds take five days.")
+    rag_service.process_documents("u1", db_session)
+    keep = db_session.query(Document).filter(Document.user_id == "u1").one()
+    path = rag_service.file_storage.save(io.BytesIO(b"Shipping is free over 50 euros."), "faq.txt", "u1")
+    doomed = Document(user_id="u1", filename="faq.txt", file_path=path, status="pending")
+    db_session.add(doomed)
+    db_session.commit()
+    rag_service.process_documents("u1", db_session)
+
+    assert rag_service.delete_document(doomed.id, "u1", db_session)
+
+    assert [m["document_id"] for _, m in ingestion.rows.values()] == [keep.id]
+    assert [text for text, _ in ingestion.rows.values()] == ["Refunds take five days."]
@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.services.agent_system.intent_router import IntentRouter, GREETING, FAREWELL
+
+
+@pytest.mark.parametrize("message,expected", [
+    ("Hi!", GREETING),
+    ("hello there", GREETING),
+    ("Good morning", GREETING),
+    ("ok bye then", FAREWELL),
+    ("Thanks, bye!", FAREWELL),
+    ("see you later", FAREWELL),
+    ("hi, what are your prices?", None),
+    ("What is your refund policy", None),
+    ("hi bye", None),
+    ("have you", None),
+    ("hi 12345", None),
+    ("hello order 4411", None),
+    ("hey, sku-991", None),
+    ("hello there partner", None),
+])
+def test_keyword_routing(message, expected):
+    assert IntentRouter().classify(message) == expected
+
+
+def test_embedding_fallback_uses_threshold():
+    from app.services.agent_system.intent_router import PHRASE_BANK
+
+    def fake_embed(texts):
+        # Greeting bank -> x axis, farewell bank -> y axis, everything else by lookup
+        lookup = {"hullo": [0.99, 0.1], "shipping": [0.7, 0.7]}
+        return [
+            [1.0, 0.0] if t in PHRASE_BANK[GREETING]
+            else [0.0, 1.0] if t in PHRASE_BANK[FAREWELL]
+            else lookup[t]
+            for t in texts
+        ]
+
+    router = IntentRouter(embed_fn=fake_embed)
+    assert router.classify("hullo") == GREETING
+    # Equally (and weakly) close to both intents -> uncertain, falls through
+    assert router.classify("shipping") is None
+
+
+def test_embedding_errors_fall_through():
+    def broken_embed(texts):
+        raise RuntimeError("model not loaded")
+
+    assert IntentRouter(embed_fn=broken_embed).classify("hullo") is None
+
+
+def test_embedding_failures_back_off(monkeypatch):
+    from app.services.agent_system import intent_router as module
+
+    calls = []
+
+    def broken_embed(texts):
+        calls.append(texts)
+        raise RuntimeError("model not loaded")
+
+    clock = [1000.0]
+    monkeypatch.setattr(module.time, "monotonic", lambda: clock[0])
+    router = IntentRouter(embed_fn=broken_embed)
+
+    assert router.classify("hullo") is None
+    assert router.classify("heyyy") is None
+    assert len(calls) == 1
+
+    clock[0] += module.EMBEDDING_RETRY_SECONDS + 1
+    assert router.classify("hullo") is None
+    assert len(calls) == 2
+
+
+def test_run_conversation_skips_agent_for_greeting():
+    from app.services import agent_service
+
+    with patch.object(agent_service.AgentFactory, "create_rag_agent") as create_agent:
+        response = asyncio.new_event_loop().run_until_complete(
+            agent_service.run_conversation("hello", user_id="u1", api_key="key")
+        )
+
+    create_agent.assert_not_called()
+    assert response.startswith("Hello")
+
+
+def test_embedding_fallback_runs_off_the_event_loop():
+    import threading
+    from app.services.agent_system.intent_router import PHRASE_BANK
+
+    embed_threads = set()
+
+    def fake_embed(texts):
+        embed_threads.add(threading.current_thread())
+        return [[0.0, 1.0] if t in PHRASE_BANK[FAREWELL] else [1.0, 0.0] for t in texts]
+
+    router = IntentRouter(embed_fn=fake_embed)
+    router.warm_up()
+    embed_threads.clear()
+
+    response = asyncio.new_event_loop().run_until_complete(router.respond_async("hullo"))
+
+    assert response.startswith("Hello")
+    assert embed_threads and threading.main_thread() not in embed_threads
@@ -0,0 +1,201 @@
+import asyncio
+import pytest
+from app.services.agent_system.llm_scheduler import (
+    KeyScheduler,
+    LLMOverloaded,
+    LLMScheduler,
+    is_rate_limited,
+)
+from app.utils.singleflight import SingleFlight
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_concurrency_is_capped_per_key():
+    scheduler = LLMScheduler(max_concurrency=2, queue_timeout=5)
+    peak = {"a": 0, "b": 0}
+    active = {"a": 0, "b": 0}
+
+    async def call(key):
+        async with scheduler.slot(key):
+            active[key] += 1
+            peak[key] = max(peak[key], active[key])
+            await asyncio.sleep(0.01)
+            active[key] -= 1
+
+    async def go():
+        await asyncio.gather(*(call(key) for key in "ab" * 6))
+
+    run(go())
+    assert peak == {"a": 2, "b": 2}
+    assert scheduler.usage() == {("active",): 0, ("queued",): 0}
+
+
+def test_admission_rejects_when_queue_cannot_drain_before_deadline():
+    clock = FakeClock()
+    key = KeyScheduler(max_concurrency=1, clock=clock)
+    key.avg_call_seconds = 10.0
+
+    async def go():
+        assert await key.acquire(deadline=clock.now + 1) == 0.0
+        # One call in flight taking ~10s: a 1s deadline cannot be met
+        with pytest.raises(LLMOverloaded):
+            await key.acquire(deadline=clock.now + 1)
+        assert key.queued == 0
+
+    run(go())
+
+
+def test_waiter_times_out_at_deadline_and_leaves_queue():
+    scheduler = LLMScheduler(max_concurrency=1, queue_timeout=0.05)
+    key = scheduler.for_key("k")
+    key.avg_call_seconds = 0.01
+
+    async def go():
+        async with scheduler.slot("k"):
+            with pytest.raises(LLMOverloaded):
+                async with scheduler.slot("k"):
+                    pass
+        assert key.active == 0 and key.queued == 0
+
+    run(go())
+
+
+def test_rate_limit_halves_limit_and_cools_down_then_recovers():
+    scheduler = LLMScheduler(max_concurrency=4, queue_timeout=5)
+    key = scheduler.for_key("k")
+
+    async def go():
+        async with scheduler.slot("k") as slot:
+            slot.rate_limited(0.05)
+        assert key.limit == 2
+        assert key.estimated_wait() > 0
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with scheduler.slot("k"):
+            pass
+        assert loop.time() - started >= 0.04
+        for _ in range(10):
+            async with scheduler.slot("k"):
+                pass
+        assert key.limit == 4
+
+    run(go())
+
+
+def test_backoff_is_jittered_exponential_and_honours_retry_after():
+    scheduler = LLMScheduler(backoff_base=1, backoff_max=8)
+    for attempt, step in [(0, 1), (1, 2), (2, 4), (5, 8)]:
+        delay = scheduler.backoff(attempt)
+        assert step / 2 <= delay <= step
+    assert scheduler.backoff(0, retry_after=3) == 3
+    assert scheduler.backoff(0, retry_after=60) == 8
+    assert is_rate_limited(RateLimitError())
+    assert not is_rate_limited(ValueError())
+
+
+def test_turn_shares_one_deadline_and_admit_rejects():
+    scheduler = LLMScheduler(max_concurrency=1, queue_timeout=0.5)
+    key = scheduler.for_key("k")
+    key.active = 1
+    key.avg_call_seconds = 5.0
+
+    with scheduler.turn():
+        with pytest.raises(LLMOverloaded):
+            scheduler.admit("k")
+    scheduler.admit("other")
+
+
+def test_scheduled_model_retries_rate_limits_within_one_call(monkeypatch):
+    from google.adk.models.lite_llm import LiteLlm
+    from app.services.agent_system import scheduled_model
+    from app.services.agent_system.scheduled_model import ScheduledLiteLlm
+
+    scheduler = LLMScheduler(max_concurrency=2, queue_timeout=5, max_retries=2, backoff_base=0.001)
+    monkeypatch.setattr(scheduled_model, "llm_scheduler", scheduler)
+    attempts = []
+
+    async def flaky(self, llm_request, stream=False):
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise RateLimitError("quota")
+        yield "answer"
+
+    monkeypatch.setattr(LiteLlm, "generate_content_async", flaky)
+    model = ScheduledLiteLlm(model="gemini/gemini-2.0-flash", api_key="k")
+
+    async def collect():
+        return [r async for r in model.generate_content_async(None)]
+
+    assert run(collect()) == ["answer"]
+    assert len(attempts) == 3
+    assert scheduler.for_key("k").cooldown_until > 0
+
+    attempts.clear()
+    scheduler.max_retries = 0
+    with pytest.raises(RateLimitError):
+        run(collect())
+    assert len(attempts) == 1
+
+
+def test_scheduled_model_releases_its_slot_before_yielding(monkeypatch):
+    from google.adk.models.lite_llm import LiteLlm
+    from app.services.agent_system import scheduled_model
+    from app.services.agent_system.scheduled_model import ScheduledLiteLlm
+
+    scheduler = LLMScheduler(max_concurrency=1, queue_timeout=0.5)
+    monkeypatch.setattr(scheduled_model, "llm_scheduler", scheduler)
+
+    async def answer(self, llm_request, stream=False):
+        yield llm_request or "transfer"
+
+    monkeypatch.setattr(LiteLlm, "generate_content_async", answer)
+    model = ScheduledLiteLlm(model="gemini/gemini-2.0-flash", api_key="k")
+
+    async def turn():
+        results = []
+        async for response in model.generate_content_async(None):
+            # What ADK does with a held response: run a transfer whose sub-agent calls the model
+            results.append(response)
+            results.extend([r async for r in model.generate_content_async("sub-agent answer")])
+        return results
+
+    assert run(turn()) == ["transfer", "sub-agent answer"]
+    assert scheduler.for_key("k").active == 0
+
+
+def test_singleflight_coalesces_concurrent_calls():
+    coalesced = []
+    flights = SingleFlight(on_coalesce=lambda: coalesced.append(1))
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["chunk"]
+
+    async def go():
+        results = await asyncio.gather(*(flights.do(("biz", "refunds?"), fetch) for _ in range(5)))
+        other = await flights.do(("biz", "hours?"), fetch)
+        again = await flights.do(("biz", "refunds?"), fetch)
+        return results, other, again
+
+    results, other, again = run(go())
+    assert results == [["chunk"]] * 5
+    assert len(coalesced) == 4
+    assert len(calls) == 3  # nothing is cached once the shared call finished
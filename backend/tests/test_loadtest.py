@@ -0,0 +1,85 @@
+import asyncio
+import json
+import httpx
+import pytest
+from loadtest.driver import Recorder, percentile
+from loadtest.fake_llm import FakeLLMConfig, create_app, plan_reply
+
+TOOLS = [{"type": "function", "function": {"name": "get_context", "parameters": {}}}]
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def post(app, payload):
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://fake") as client:
+            return await client.post("/v1/chat/completions", json=payload)
+    return run(go())
+
+
+def test_plan_reply_calls_tool_then_answers_from_result():
+    messages = [{"role": "system", "content": "Be helpful"}, {"role": "user", "content": "Refund policy?"}]
+    plan = plan_reply(messages, TOOLS, answer_tokens=10)
+    assert plan == {"tool_call": {"name": "get_context", "arguments": {"user_input": "Refund policy?"}}}
+
+    messages.append({"role": "tool", "content": json.dumps({"result": "Refunds take 14 days"})})
+    plan = plan_reply(messages, TOOLS, answer_tokens=10)
+    assert plan["content"].startswith("Based on our records: Refunds take 14 days")
+    assert len(plan["content"].split()) == 10
+
+
+def test_fake_llm_returns_openai_tool_call():
+    app = create_app(FakeLLMConfig(ttft_ms=0, jitter_ms=0, tokens_per_second=0))
+    response = post(app, {"model": "fake", "messages": [{"role": "user", "content": "Opening hours?"}], "tools": TOOLS})
+
+    assert response.status_code == 200
+    choice = response.json()["choices"][0]
+    assert choice["finish_reason"] == "tool_calls"
+    call = choice["message"]["tool_calls"][0]
+    assert call["function"]["name"] == "get_context"
+    assert json.loads(call["function"]["arguments"]) == {"user_input": "Opening hours?"}
+    assert app.state.stats.tool_calls == 1
+
+
+def test_fake_llm_streams_answer_chunks():
+    app = create_app(FakeLLMConfig(ttft_ms=0, jitter_ms=0, tokens_per_second=0, answer_tokens=8))
+    response = post(app, {"model": "fake", "stream": True, "messages": [{"role": "user", "content": "Hi"}]})
+
+    events = [line[len("data: "):] for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(e) for e in events[:-1]]
+    text = "".join(c["choices"][0]["delta"].get("content", "") for c in chunks)
+    assert len(text.split()) == 8
+    assert chunks[-1]["choices"][0]["finish_reason"] == "stop"
+
+
+def test_fake_llm_injects_errors():
+    app = create_app(FakeLLMConfig(ttft_ms=0, jitter_ms=0, error_rate=1.0, error_status=503))
+    response = post(app, {"model": "fake", "messages": [{"role": "user", "content": "Hi"}]})
+    assert response.status_code == 503
+    assert app.state.stats.errors == 1
+
+
+def test_percentile_interpolates():
+    values = [float(v) for v in range(1, 101)]
+    assert percentile(values, 50) == pytest.approx(50.5)
+    assert percentile(values, 99) == pytest.approx(99.01)
+    assert percentile([], 95) is None
+
+
+def test_recorder_summary_separates_degraded_and_errors():
+    recorder = Recorder()
+    recorder.record("chat", 0.1, "ok")
+    recorder.record("chat", 0.3, "degraded")
+    recorder.record("chat", 0.2, "http_500")
+    summary = recorder.summary(wall_seconds=1.0)
+
+    chat = summary["endpoints"]["chat"]
+    assert chat["requests"] == 3
+    assert (chat["ok"], chat["degraded"], chat["errors"]) == (1, 1, {"http_500": 1})
+    assert chat["latency_ms"]["p50"] == pytest.approx(200.0)
+    assert chat["throughput_rps"] == 3.0
+    assert summary["overall"]["requests"] == 3
@@ -0,0 +1,82 @@
+import asyncio
+import json
+import logging
+import queue
+import httpx
+from fastapi import FastAPI
+from app.core.logging_config import (
+    DebugSamplingFilter,
+    JsonFormatter,
+    NonBlockingQueueHandler,
+    RequestIdFilter,
+    RequestIdMiddleware,
+    parse_levels,
+    request_id_var,
+)
+
+
+def make_record(level=logging.INFO, msg="hello %s", args=("world",), **extra):
+    record = logging.LogRecord("app.test", level, __file__, 1, msg, args, None)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_json_formatter_emits_request_id_and_extra_fields():
+    token = request_id_var.set("req-123")
+    try:
+        record = make_record(user_id="u1")
+        RequestIdFilter().filter(record)
+    finally:
+        request_id_var.reset(token)
+
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "hello world"
+    assert entry["level"] == "INFO"
+    assert entry["logger"] == "app.test"
+    assert entry["request_id"] == "req-123"
+    assert entry["user_id"] == "u1"
+
+
+def test_debug_sampling_only_thins_debug_records():
+    never = DebugSamplingFilter(rate=0.0)
+    assert not never.filter(make_record(level=logging.DEBUG))
+    assert never.filter(make_record(level=logging.INFO))
+    assert DebugSamplingFilter(rate=1.0).filter(make_record(level=logging.DEBUG))
+
+
+def test_queue_handler_drops_instead_of_blocking_when_full():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    for _ in range(5):
+        handler.handle(make_record())
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+
+
+def test_parse_levels():
+    assert parse_levels("app.services=debug, app.auth=WARNING,,bad") == {
+        "app.services": "DEBUG",
+        "app.auth": "WARNING",
+    }
+
+
+def test_request_id_middleware_propagates_and_echoes_id():
+    app = FastAPI()
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.get("/whoami")
+    def whoami():
+        return {"request_id": request_id_var.get()}
+
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            given = await client.get("/whoami", headers={"X-Request-ID": "abc"})
+            generated = await client.get("/whoami")
+        return given, generated
+
+    given, generated = asyncio.new_event_loop().run_until_complete(go())
+    assert given.json()["request_id"] == "abc"
+    assert given.headers["x-request-id"] == "abc"
+    assert len(generated.json()["request_id"]) == 32
+    assert generated.headers["x-request-id"] == generated.json()["request_id"]
+    assert request_id_var.get() == "-"
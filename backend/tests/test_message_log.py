@@ -0,0 +1,144 @@
+import os
+import pytest
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.base import Base
+from app.models.chat_session import ChatSession
+from app.models.widget import GuestMessage, GuestUser
+from app.services.message_log import MessageLog
+
+
+@pytest.fixture
+def factory():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add(GuestUser(id="g1", widget_id="w1", name="Ada"))
+    db.add(ChatSession(id="s1", guest_id="g1"))
+    db.add(ChatSession(id="s2", guest_id="g1"))
+    db.commit()
+    db.close()
+    Session.engine = engine
+    return Session
+
+
+def stored(factory, **filters):
+    db = factory()
+    try:
+        return db.query(GuestMessage).filter_by(**filters).count()
+    finally:
+        db.close()
+
+
+def test_appends_are_buffered_then_written_in_one_statement(factory, tmp_path):
+    log = MessageLog(factory, wal_dir=str(tmp_path))
+    first = log.append("g1", "s1", "guest", "Do you ship abroad?")
+    log.append("g1", "s1", "ai", "Yes, to 30 countries.")
+    log.append("g1", "s2", "guest", "Hi")
+
+    assert first.created_at.tzinfo is not None and first.id
+    assert len(os.listdir(tmp_path)) == 1  # the WAL segment
+    assert stored(factory) == 0
+    db = factory()
+    assert [m.message_text for m in log.for_session(db, "s1")] == ["Do you ship abroad?", "Yes, to 30 countries."]
+    assert len(log.for_guest(db, "g1")) == 3
+    db.close()
+
+    statements = []
+    event.listen(factory.engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    assert log.flush() == 3
+    assert [s.split()[0] for s in statements] == ["INSERT"]
+    assert stored(factory) == 3 and log.pending() == 0
+    assert os.listdir(tmp_path) == []
+
+    # Persisted and buffered messages are merged in order without duplicates
+    log.append("g1", "s1", "guest", "How long does it take?")
+    db = factory()
+    messages = log.for_session(db, "s1")
+    db.close()
+    assert [m.message_text for m in messages][-1] == "How long does it take?"
+    assert len(messages) == 3 and messages[0].id == first.id
+
+
+def test_segments_of_a_dead_worker_are_replayed_once(factory, tmp_path):
+    crashed = MessageLog(factory, wal_dir=str(tmp_path))
+    ids = [crashed.append("g1", "s1", sender, text).id for sender, text in [("guest", "Hi"), ("ai", "Hello!")]]
+    # The crash tore the last write
+    segment = os.path.join(tmp_path, os.listdir(tmp_path)[0])
+    with open(segment, "a") as f:
+        f.write('{"id": "torn", "guest_')
+
+    restarted = MessageLog(factory, wal_dir=str(tmp_path))  # same pid, new instance
+    assert restarted.recover() == 2
+    assert os.listdir(tmp_path) == []
+    db = factory()
+    assert [m.id for m in restarted.for_session(db, "s1")] == ids
+    db.close()
+
+    # Messages that were already committed are skipped, not duplicated
+    assert crashed.flush() == 2
+    assert stored(factory) == 2
+
+
+def test_live_segments_are_not_recovered(factory, tmp_path):
+    log = MessageLog(factory, wal_dir=str(tmp_path))
+    log.append("g1", "s1", "guest", "Hi")
+    assert log.recover() == 0
+    assert len(os.listdir(tmp_path)) == 1 and log.pending() == 1
+
+
+def test_failed_flush_keeps_messages_readable_and_logged(factory, tmp_path):
+    broken = {"on": True}
+
+    def flaky_factory():
+        db = factory()
+        if broken["on"]:
+            db.commit = lambda: (_ for _ in ()).throw(ConnectionError("db down"))
+        return db
+
+    log = MessageLog(flaky_factory, wal_dir=str(tmp_path))
+    log.append("g1", "s1", "guest", "first")
+    with pytest.raises(ConnectionError):
+        log.flush()
+    log.append("g1", "s1", "ai", "second")
+
+    db = factory()
+    assert [m.message_text for m in log.for_session(db, "s1")] == ["first", "second"]
+    db.close()
+    assert len(os.listdir(tmp_path)) == 2
+
+    broken["on"] = False
+    assert log.flush() == 2
+    assert stored(factory, session_id="s1") == 2
+    assert os.listdir(tmp_path) == []
+
+
+def test_failed_replay_keeps_the_segment_for_the_next_start(factory, tmp_path):
+    crashed = MessageLog(factory, wal_dir=str(tmp_path))
+    crashed.append("g1", "s1", "guest", "Hi")
+    segment = os.listdir(tmp_path)[0]
+
+    def broken_factory():
+        db = factory()
+        db.commit = lambda: (_ for _ in ()).throw(ConnectionError("db down"))
+        return db
+
+    assert MessageLog(broken_factory, wal_dir=str(tmp_path)).recover() == 0
+    assert os.listdir(tmp_path) == [segment]
+
+    assert MessageLog(factory, wal_dir=str(tmp_path)).recover() == 1
+    assert os.listdir(tmp_path) == [] and stored(factory) == 1
+
+
+def test_claims_left_by_a_dead_recovery_are_taken_over(factory, tmp_path):
+    crashed = MessageLog(factory, wal_dir=str(tmp_path))
+    crashed.append("g1", "s1", "guest", "Hi")
+    segment = os.listdir(tmp_path)[0]
+    # A worker claimed the segment, then died before replaying it
+    os.rename(os.path.join(tmp_path, segment), os.path.join(tmp_path, f"{segment}.999999999.recovering"))
+
+    assert MessageLog(factory, wal_dir=str(tmp_path)).recover() == 1
+    assert os.listdir(tmp_path) == []
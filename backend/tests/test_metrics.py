@@ -0,0 +1,101 @@
+import asyncio
+from types import SimpleNamespace
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from app.core.metrics import (
+    Counter,
+    Gauge,
+    MetricsMiddleware,
+    MetricsRegistry,
+    db_queries_per_request,
+    instrument_engine,
+    llm_requests,
+    llm_tokens,
+)
+from app.main import app as main_app
+from app.services.agent_system.callbacks import record_llm_failure, record_llm_usage, track_llm_call_start
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def get(app, path):
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path)
+    return run(go())
+
+
+def test_counter_and_gauge_render():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("demo_total", "Demo", labelnames=("outcome",)))
+    counter.inc(outcome="ok")
+    counter.inc(2, outcome="ok")
+    registry.register(Gauge("demo_pool", "Pool", labelnames=("state",), callback=lambda: {("idle",): 3}))
+    registry.register(Gauge("demo_broken", "Broken", callback=lambda: 1 / 0))
+
+    text_ = registry.render()
+    assert "# TYPE demo_total counter" in text_
+    assert 'demo_total{outcome="ok"} 3.0' in text_
+    assert 'demo_pool{state="idle"} 3.0' in text_
+    # A failing callback drops its samples but keeps the scrape alive
+    assert "# TYPE demo_broken gauge" in text_
+    assert counter.value(outcome="ok") == 3
+
+
+def test_middleware_counts_queries_per_request():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/three")
+    def three_queries():
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+        return {}
+
+    before = db_queries_per_request.snapshot().get((), {"count": 0, "sum": 0})
+    assert get(app, "/three").status_code == 200
+    after = db_queries_per_request.snapshot()[()]
+    assert after["count"] == before["count"] + 1
+    assert after["sum"] == before["sum"] + 3
+
+
+def test_llm_callbacks_record_latency_tokens_and_failures():
+    context = SimpleNamespace(state={"user_id": "biz-metrics"})
+    request = SimpleNamespace(model="gemini-test")
+    usage = SimpleNamespace(prompt_token_count=120, candidates_token_count=30)
+    response = SimpleNamespace(partial=False, error_code=None, usage_metadata=usage)
+
+    track_llm_call_start(context, request)
+    assert record_llm_usage(context, response) is None
+    assert llm_requests.value(business="biz-metrics", model="gemini-test", operation="chat", outcome="success") == 1
+    assert llm_tokens.value(business="biz-metrics", model="gemini-test", kind="prompt") == 120
+    assert llm_tokens.value(business="biz-metrics", model="gemini-test", kind="completion") == 30
+
+    # No call in flight: nothing to attribute the failure to
+    record_llm_failure("biz-metrics")
+    assert llm_requests.value(business="biz-metrics", model="gemini-test", operation="chat", outcome="error") == 0
+
+    track_llm_call_start(context, request)
+    record_llm_failure("biz-metrics")
+    assert llm_requests.value(business="biz-metrics", model="gemini-test", operation="chat", outcome="error") == 1
+
+
+def test_metrics_endpoint_exposes_application_metrics():
+    response = get(main_app, "/metrics")
+    assert response.status_code == 200
+    for name in (
+        "taimako_llm_requests_total",
+        "taimako_retrieval_duration_seconds",
+        "taimako_db_queries_per_request",
+        "taimako_db_pool_connections",
+        "taimako_chat_limit_rejections_total",
+        "taimako_geoip_lookups_total",
+    ):
+        assert f"# TYPE {name} " in response.text
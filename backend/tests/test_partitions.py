@@ -0,0 +1,75 @@
+from datetime import date
+from unittest.mock import MagicMock
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+from app.db.base import Base
+from app.db.partitions import (
+    add_months,
+    archive_cold_partitions,
+    create_partition,
+    create_partition_sql,
+    ensure_partitions,
+    month_start,
+    parse_partition_name,
+    partition_name,
+)
+
+
+def test_month_arithmetic_crosses_year_boundaries():
+    assert month_start(date(2026, 3, 17)) == date(2026, 3, 1)
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert add_months(date(2026, 1, 1), -1) == date(2025, 12, 1)
+
+
+def test_partition_names_round_trip():
+    name = partition_name("guest_messages", date(2026, 2, 1))
+    assert name == "guest_messages_p2026_02"
+    assert parse_partition_name(name) == ("guest_messages", date(2026, 2, 1))
+    assert parse_partition_name("guest_messages_default") is None
+    assert create_partition_sql("chat_sessions", date(2026, 12, 1)) == (
+        "CREATE TABLE IF NOT EXISTS chat_sessions_p2026_12 PARTITION OF chat_sessions "
+        "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+    )
+
+
+def test_maintenance_is_a_no_op_on_sqlite(tmp_path):
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    assert ensure_partitions(engine, months_ahead=3, today=date(2026, 5, 4)) == []
+    assert archive_cold_partitions(engine, keep_months=1, archive_dir=str(tmp_path)) == []
+
+
+class RecordingConnection:
+    """Records SQL; `default_rows` says whether the DEFAULT partition has rows in range."""
+
+    def __init__(self, default_rows):
+        self.default_rows = default_rows
+        self.statements = []
+
+    def execute(self, statement):
+        sql = str(statement)
+        self.statements.append(sql)
+        result = MagicMock()
+        result.first.return_value = (1,) if self.default_rows and sql.startswith("SELECT 1") else None
+        result.rowcount = 7
+        return result
+
+
+def test_new_partition_is_created_directly_when_default_is_clear():
+    conn = RecordingConnection(default_rows=False)
+    assert create_partition(conn, "chat_sessions", date(2026, 6, 1)) == 0
+    assert conn.statements[-1] == create_partition_sql("chat_sessions", date(2026, 6, 1))
+
+
+def test_rows_already_in_default_are_moved_into_the_new_partition():
+    conn = RecordingConnection(default_rows=True)
+    assert create_partition(conn, "chat_sessions", date(2026, 6, 1)) == 7
+
+    in_range = "created_at >= '2026-06-01' AND created_at < '2026-07-01'"
+    assert conn.statements[1:] == [
+        "ALTER TABLE chat_sessions DETACH PARTITION chat_sessions_default",
+        create_partition_sql("chat_sessions", date(2026, 6, 1)),
+        f"INSERT INTO chat_sessions_p2026_06 SELECT * FROM chat_sessions_default WHERE {in_range}",
+        f"DELETE FROM chat_sessions_default WHERE {in_range}",
+        "ALTER TABLE chat_sessions ATTACH PARTITION chat_sessions_default DEFAULT",
+    ]
@@ -9,6 +9,7 @@ def mock_file_storage(monkeypatch):
     mock = MagicMock()
     mock.save.return_value = "saved/path/test.txt"
     mock.get_full_path.return_value = "/tmp/saved/path/test.txt"
+    mock.is_remote.return_value = False
     monkeypatch.setattr(rag_service, "file_storage", mock)
     return mock
 
@@ -39,7 +40,7 @@ def test_upload_document_scoped(db_session, mock_file_storage):
     assert doc.filename == "test.txt"
     assert doc.status == "pending"
 
-def test_process_documents_scoped(db_session, mock_file_storage, mock_vector_db_service):
+def test_process_documents_scoped(db_session, mock_file_storage, mock_vector_db_service, tmp_path):
     user1 = "u1"
     user2 = "u2"
     
@@ -49,26 +50,27 @@ def test_process_documents_scoped(db_session, mock_file_storage, mock_vector_db_
     db_session.add_all([doc1, doc2])
     db_session.commit()
     
-    # Mock file content
-    with patch("builtins.open", new_callable=MagicMock) as mock_open:
-        mock_open.return_value.__enter__.return_value.read.return_value = "content"
-        with patch("os.path.exists", return_value=True):
-            # Process for User 1
-            results = rag_service.process_documents(user1, db_session)
-            
-            assert len(results) == 1
-            assert results[0].filename == "doc1.txt"
-            
-            # Verify DB updates
-            db_session.refresh(doc1)
-            db_session.refresh(doc2)
-            assert doc1.status == "processed"
-            assert doc2.status == "pending" # User 2 doc untouched
-            
-            # Verify Vector DB add with user metadata
-            args, kwargs = mock_vector_db_service.add_documents.call_args
-            metadatas = kwargs['metadatas']
-            assert metadatas[0]['user_id'] == user1
+    # File content (read via mmap, so it has to be a real file)
+    content_path = tmp_path / "test.txt"
+    content_path.write_text("content")
+    mock_file_storage.get_full_path.return_value = str(content_path)
+    with patch("os.path.exists", return_value=True):
+        # Process for User 1
+        results = rag_service.process_documents(user1, db_session)
+        
+        assert len(results) == 1
+        assert results[0].filename == "doc1.txt"
+        
+        # Verify DB updates
+        db_session.refresh(doc1)
+        db_session.refresh(doc2)
+        assert doc1.status == "processed"
+        assert doc2.status == "pending" # User 2 doc untouched
+        
+        # Verify Vector DB add with user metadata
+        args, kwargs = mock_vector_db_service.add_documents.call_args
+        metadatas = kwargs['metadatas']
+        assert metadatas[0]['user_id'] == user1
 
 def test_list_documents_scoped(db_session):
     db_session.add(Document(user_id="u1", filename="a.txt", file_path="p", status="processed"))
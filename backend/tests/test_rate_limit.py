@@ -0,0 +1,187 @@
+import asyncio
+import httpx
+import pytest
+from fastapi import HTTPException
+from app.api import widget as widget_api
+from app.core.rate_limit import (
+    InMemoryRateLimiter,
+    RateLimit,
+    RateLimitService,
+    RedisRateLimiter,
+    TOKEN_BUCKET_SCRIPT,
+    client_ip,
+    parse_proxies,
+    parse_rate,
+)
+from app.db.session import get_db
+from app.main import app
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeRedis:
+    """Stand-in for the redis-py client: runs the token-bucket script's logic over a dict."""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.hashes = {}
+        self.scripts = []
+
+    def register_script(self, script):
+        self.scripts.append(script)
+
+        def run(keys, args):
+            capacity, rate, cost = (float(a) for a in args)
+            now = self.clock()
+            tokens, ts = self.hashes.get(keys[0], (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self.hashes[keys[0]] = (tokens, now)
+            return str(wait).encode()
+
+        return run
+
+
+class BrokenBackend:
+    def acquire(self, key, limit, cost=1.0):
+        raise ConnectionError("redis down")
+
+
+def test_parse_rate():
+    assert parse_rate("30/minute") == RateLimit(capacity=30, period=60)
+    assert parse_rate(" 5 / Second ") == RateLimit(capacity=5, period=1)
+    assert parse_rate("") is None
+    assert parse_rate("0/hour") is None
+    with pytest.raises(ValueError):
+        parse_rate("30 per minute")
+
+
+@pytest.mark.parametrize("make_backend", [
+    lambda clock: InMemoryRateLimiter(clock=clock),
+    lambda clock: RedisRateLimiter(client=FakeRedis(clock)),
+])
+def test_token_bucket_allows_burst_then_refills(make_backend):
+    clock = FakeClock()
+    backend = make_backend(clock)
+    limit = RateLimit(capacity=3, period=60)  # one token every 20s
+
+    assert [backend.acquire("ip:1.2.3.4", limit) for _ in range(3)] == [0, 0, 0]
+    assert backend.acquire("ip:1.2.3.4", limit) == pytest.approx(20)
+    assert backend.acquire("ip:5.6.7.8", limit) == 0
+
+    clock.now += 20
+    assert backend.acquire("ip:1.2.3.4", limit) == 0
+    assert backend.acquire("ip:1.2.3.4", limit) > 0
+
+
+def test_redis_backend_prefixes_keys_and_registers_script():
+    fake = FakeRedis(FakeClock())
+    RedisRateLimiter(client=fake, prefix="test:").acquire("guest:g1", RateLimit(capacity=2, period=1))
+    assert fake.scripts == [TOKEN_BUCKET_SCRIPT]
+    assert list(fake.hashes) == ["test:guest:g1"]
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = InMemoryRateLimiter(max_keys=2, clock=FakeClock())
+    limit = RateLimit(capacity=1, period=60)
+    for key in ("a", "b", "c"):
+        backend.acquire(key, limit)
+    assert list(backend._buckets) == ["b", "c"]
+
+
+def test_service_rejects_with_retry_after_and_fails_open():
+    clock = FakeClock()
+    service = RateLimitService(InMemoryRateLimiter(clock=clock), {"ip": RateLimit(1, 10), "guest": None})
+
+    service.enforce([("ip", "1.2.3.4"), ("guest", "g1"), ("widget", "w1")])
+    with pytest.raises(HTTPException) as exc:
+        service.enforce([("ip", "1.2.3.4")])
+    assert exc.value.status_code == 429
+    assert exc.value.headers == {"Retry-After": "10"}
+
+    # Missing identifiers and unconfigured scopes are never limited
+    service.enforce([("ip", None), ("guest", "g1"), ("guest", "g1")])
+
+    broken = RateLimitService(BrokenBackend(), {"ip": RateLimit(1, 10)})
+    for _ in range(3):
+        broken.enforce([("ip", "1.2.3.4")])
+
+    disabled = RateLimitService(InMemoryRateLimiter(clock=clock), {"ip": RateLimit(1, 10)}, enabled=False)
+    for _ in range(3):
+        disabled.enforce([("ip", "1.2.3.4")])
+
+
+def test_widget_endpoints_reject_before_touching_the_database(monkeypatch):
+    limiter = RateLimitService(InMemoryRateLimiter(), {"ip": RateLimit(1, 60)})
+    monkeypatch.setattr(widget_api, "rate_limiter", limiter)
+    # The test client connects from 127.0.0.1, standing in for our load balancer
+    monkeypatch.setattr(widget_api, "trusted_proxies", parse_proxies("127.0.0.1"))
+    limiter.enforce([("ip", "203.0.113.9")])  # bucket for this client is now empty
+
+    class NoDatabase:
+        # The session itself is created during dependency resolution; using it is the failure
+        def __getattr__(self, name):
+            pytest.fail(f"rate-limited request reached the database (db.{name})")
+
+    def no_db():
+        yield NoDatabase()
+
+    app.dependency_overrides[get_db] = no_db
+    headers = {"X-Forwarded-For": "203.0.113.9"}
+
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            start = await client.post("/widgets/guest/start/w1", json={"name": "Ada"}, headers=headers)
+            init = await client.post(
+                "/widgets/guest/session/init/w1", json={"guest_id": "g1", "message": "hi"}, headers=headers
+            )
+            chat = await client.post("/widgets/chat/w1/session/s1", json={"message": "hi"}, headers=headers)
+        return start, init, chat
+
+    try:
+        responses = asyncio.new_event_loop().run_until_complete(go())
+    finally:
+        app.dependency_overrides.clear()
+
+    for response in responses:
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "60"
+        assert response.json()["error_code"] == "TOO_MANY_REQUESTS"
+
+
+def test_client_ip_only_believes_forwarded_for_from_trusted_proxies():
+    proxies = parse_proxies("10.0.0.0/8, 192.168.1.10")
+
+    # Spoofed hops on the left are skipped: the rightmost untrusted hop is the client
+    assert client_ip("10.0.0.5", "1.1.1.1, 203.0.113.9, 192.168.1.10", proxies) == "203.0.113.9"
+    # Not from one of our proxies, or no proxies configured: the header is ignored
+    assert client_ip("198.51.100.7", "1.1.1.1", proxies) == "198.51.100.7"
+    assert client_ip("10.0.0.5", "1.1.1.1", []) == "10.0.0.5"
+    assert client_ip("10.0.0.5", None, proxies) == "10.0.0.5"
+    # Every hop is internal
+    assert client_ip("10.0.0.5", "10.1.2.3", proxies) == "10.1.2.3"
+
+
+def test_forwarded_requests_from_a_private_peer_warn_once_without_proxies(monkeypatch, caplog):
+    from app.core import rate_limit
+
+    monkeypatch.setattr(rate_limit, "_warned_untrusted_proxy", False)
+    with caplog.at_level("WARNING", logger="app.core.rate_limit"):
+        assert client_ip("8.8.8.8", "1.1.1.1", []) == "8.8.8.8"
+        assert not caplog.records
+        client_ip("10.0.0.5", "1.1.1.1", [])
+        client_ip("10.0.0.6", "1.1.1.1", [])
+
+    assert len(caplog.records) == 1
+    assert "TRUSTED_PROXIES" in caplog.records[0].getMessage()
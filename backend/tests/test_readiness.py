@@ -0,0 +1,111 @@
+import asyncio
+import time
+import httpx
+import app.main as main_module
+from app.services.readiness import Readiness, warm_database
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def failing():
+    raise RuntimeError("model download failed")
+
+
+def test_warm_up_records_status_timing_and_errors():
+    readiness = Readiness(
+        [
+            ("database", lambda: {"connections": 5}),
+            ("embeddings", failing),
+            ("agent", lambda: time.sleep(1)),
+        ],
+        timeout=0.1,
+    )
+    assert readiness.snapshot()["status"] == "warming"
+
+    run(readiness.warm_up())
+    snapshot = readiness.snapshot()
+    components = snapshot["components"]
+    assert snapshot["status"] == "not_ready"
+    assert not readiness.ready
+    assert components["database"]["status"] == "ok"
+    assert components["database"]["connections"] == 5
+    assert components["embeddings"] == {
+        "status": "failed", "seconds": components["embeddings"]["seconds"],
+        "error": "RuntimeError: model download failed",
+    }
+    assert components["agent"]["status"] == "failed"
+    assert "timed out" in components["agent"]["error"]
+
+
+def test_steps_run_concurrently():
+    readiness = Readiness([(f"step{i}", lambda: time.sleep(0.2)) for i in range(4)])
+    started = time.perf_counter()
+    run(readiness.warm_up())
+    assert time.perf_counter() - started < 0.6
+    assert readiness.ready
+    assert readiness.snapshot()["status"] == "ready"
+
+
+def test_failed_steps_are_retried_until_ready():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionError("database restarting")
+        return {"connections": 5}
+
+    readiness = Readiness([("database", flaky), ("agent", lambda: None)], retry_base=0.01, retry_max=0.02)
+    run(readiness.warm_up_until_ready())
+
+    assert readiness.ready
+    assert len(calls) == 3
+    assert readiness.components["database"] == {
+        "status": "ok", "seconds": readiness.components["database"]["seconds"], "attempts": 3, "connections": 5,
+    }
+    assert "attempts" not in readiness.components["agent"]
+
+
+def test_warm_database_opens_connections():
+    assert warm_database()["connections"] >= 1
+
+
+def test_ready_endpoint_reflects_warm_up(monkeypatch):
+    readiness = Readiness([("database", lambda: None)])
+    monkeypatch.setattr(main_module, "readiness", readiness)
+
+    async def go():
+        transport = httpx.ASGITransport(app=main_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            cold = await client.get("/ready")
+            health = await client.get("/health")
+            await readiness.warm_up()
+            warm = await client.get("/ready")
+        return cold, health, warm
+
+    cold, health, warm = run(go())
+    assert cold.status_code == 503
+    assert cold.json() == {"status": "warming", "components": {"database": {"status": "pending"}}}
+    assert health.status_code == 200
+    assert warm.status_code == 200
+    assert warm.json()["components"]["database"]["status"] == "ok"
+
+
+def test_retry_waits_for_the_timed_out_attempt():
+    threads = []
+
+    def slow():
+        threads.append(1)
+        time.sleep(0.3)
+        return {"chunks": 7}
+
+    readiness = Readiness([("vector_db", slow)], timeout=0.1, retry_base=0.01, retry_max=0.01)
+    run(readiness.warm_up_until_ready())
+
+    # The timed-out attempt was rejoined rather than retried in a second thread
+    assert len(threads) == 1
+    assert readiness.components["vector_db"]["status"] == "ok"
+    assert readiness.components["vector_db"]["chunks"] == 7
+    assert readiness.components["vector_db"]["attempts"] > 1
@@ -0,0 +1,156 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from app.services import agent_service
+from app.services.agent_system import tools
+from app.services.agent_system.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+    CircuitOpen,
+)
+from app.services.agent_system.llm_scheduler import LLMScheduler
+from app.core.config import settings
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_breaker_opens_after_consecutive_failures_and_probes_once():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+
+    for _ in range(2):
+        assert breaker.before_call() is False
+        breaker.record_failure()
+    breaker.record_success()  # a success resets the streak
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    with pytest.raises(CircuitOpen) as exc:
+        breaker.before_call()
+    assert exc.value.retry_after == pytest.approx(20)
+
+    clock.now += 20
+    assert breaker.before_call() is True
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()  # only one probe at a time
+    breaker.record_failure()
+    assert breaker.state == OPEN
+
+    clock.now += 30
+    assert breaker.before_call() is True
+    breaker.release()  # probe ended without a verdict: the next turn may probe
+    assert breaker.before_call() is True
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.before_call() is False
+
+
+def test_run_conversation_fails_fast_while_breaker_open(monkeypatch):
+    breakers = CircuitBreakerRegistry(failure_threshold=2, reset_timeout=60)
+    monkeypatch.setattr(agent_service, "circuit_breakers", breakers)
+    monkeypatch.setattr(settings, "INTENT_ROUTER_ENABLED", False)
+    monkeypatch.setattr(settings, "SEMANTIC_CACHE_ENABLED", False)
+    monkeypatch.setattr(agent_service.AgentFactory, "create_rag_agent", staticmethod(lambda *a, **k: SimpleNamespace()))
+    monkeypatch.setattr("google.adk.runners.Runner", lambda **kwargs: None)
+    monkeypatch.setattr(agent_service, "get_session_service", lambda: None)
+
+    async def no_session(*args):
+        return None
+
+    monkeypatch.setattr(agent_service, "init_session", no_session)
+    calls = []
+
+    async def failing_agent(*args, **kwargs):
+        calls.append(1)
+        raise ConnectionError("provider down")
+
+    monkeypatch.setattr(agent_service, "call_agent_async", failing_agent)
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            run(agent_service.run_conversation("Refund policy?", user_id="biz-1"))
+    with pytest.raises(CircuitOpen):
+        run(agent_service.run_conversation("Refund policy?", user_id="biz-1"))
+    assert len(calls) == 2
+    assert breakers.states() == {("biz-1",): 2}
+
+    # Other businesses are unaffected
+    with pytest.raises(ConnectionError):
+        run(agent_service.run_conversation("Refund policy?", user_id="biz-2"))
+    assert len(calls) == 3
+
+
+def test_scheduled_model_times_out_hung_calls_and_retries(monkeypatch):
+    from google.adk.models.lite_llm import LiteLlm
+    from app.services.agent_system import scheduled_model
+    from app.services.agent_system.scheduled_model import ScheduledLiteLlm
+
+    scheduler = LLMScheduler(call_timeout=0.05, max_retries=2, backoff_base=0.001)
+    monkeypatch.setattr(scheduled_model, "llm_scheduler", scheduler)
+    attempts = []
+
+    async def hangs_once(self, llm_request, stream=False):
+        attempts.append(1)
+        if len(attempts) == 1:
+            await asyncio.sleep(10)
+        yield "answer"
+
+    monkeypatch.setattr(LiteLlm, "generate_content_async", hangs_once)
+    model = ScheduledLiteLlm(model="gemini/gemini-2.0-flash", api_key="k")
+
+    async def collect():
+        return [r async for r in model.generate_content_async(None)]
+
+    assert run(collect()) == ["answer"]
+    assert len(attempts) == 2
+    # A timeout is not a rate limit: the key keeps its full concurrency
+    assert scheduler.for_key("k").limit == scheduler.max_concurrency
+
+    async def bad_request(self, llm_request, stream=False):
+        attempts.append(1)
+        raise ValueError("invalid prompt")
+        yield
+
+    attempts.clear()
+    monkeypatch.setattr(LiteLlm, "generate_content_async", bad_request)
+    with pytest.raises(ValueError):
+        run(collect())
+    assert len(attempts) == 1
+
+
+def test_get_context_gives_up_on_slow_retrieval(monkeypatch):
+    import time
+
+    class SlowRAG:
+        def query_chunks(self, text, user_id, n_results=5):
+            time.sleep(0.3)
+            return [{"text": "Refunds within 30 days.", "metadata": {}}]
+
+    monkeypatch.setattr(tools, "rag_service", SlowRAG())
+    monkeypatch.setattr(settings, "RETRIEVAL_TIMEOUT_SECONDS", 0.05)
+    context = SimpleNamespace(state={"user_id": "biz-1"})
+
+    async def go():
+        timed_out = await tools.get_context("Refund policy?", context)
+        # The abandoned retrieval keeps running; a retry joins it instead of starting another
+        monkeypatch.setattr(settings, "RETRIEVAL_TIMEOUT_SECONDS", 5)
+        return timed_out, await tools.get_context("Refund policy?", context)
+
+    assert run(go()) == ("Context is temporarily unavailable.", "Refunds within 30 days.")
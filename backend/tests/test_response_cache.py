@@ -0,0 +1,77 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.base import Base
+from app.models.cache_generation import CacheGeneration # Import to register the table
+from app.services.agent_system.response_cache import SemanticResponseCache
+from app.services.cache_generations import CacheGenerations
+
+
+def fake_embed(texts):
+    # Refund questions share a direction, shipping questions another
+    return [[1.0, 0.05] if "refund" in t else [0.0, 1.0] for t in texts]
+
+
+def test_paraphrase_hits_and_reports_saved_latency():
+    cache = SemanticResponseCache(embed_fn=fake_embed)
+    assert cache.lookup("biz1", "What is your refund policy?") is None
+
+    cache.store("biz1", "What is your refund policy?", "30 days, no questions asked.", latency_seconds=2.5)
+    assert cache.lookup("biz1", "how do refunds work here") == "30 days, no questions asked."
+    assert cache.lookup("biz1", "how long does shipping take") is None
+
+    stats = cache.stats("biz1")
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["hit_rate"] == round(1 / 3, 4)
+    assert stats["saved_latency_seconds"] == 2.5
+
+
+def test_cache_is_scoped_per_business_and_invalidated():
+    cache = SemanticResponseCache(embed_fn=fake_embed)
+    cache.store("biz1", "What is your refund policy?", "30 days.", latency_seconds=1.0)
+
+    assert cache.lookup("biz2", "What is your refund policy?") is None
+
+    cache.invalidate("biz1")
+    assert cache.lookup("biz1", "What is your refund policy?") is None
+
+
+def test_short_and_fallback_messages_are_not_cached():
+    cache = SemanticResponseCache(embed_fn=fake_embed)
+    cache.store("biz1", "refund?", "30 days.", latency_seconds=1.0)
+    cache.store("biz1", "tell me about refunds", "Agent did not produce a final response.", latency_seconds=1.0)
+
+    assert cache.stats("biz1")["entries"] == 0
+
+
+@pytest.fixture
+def generations():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    # check_seconds=0: re-read the counter on every lookup
+    return CacheGenerations(sessionmaker(bind=engine), check_seconds=0)
+
+
+def test_invalidation_reaches_other_workers(generations):
+    worker_a = SemanticResponseCache(embed_fn=fake_embed, generations=generations)
+    worker_b = SemanticResponseCache(embed_fn=fake_embed, generations=CacheGenerations(generations.session_factory, 0))
+    generation = worker_b.generation("biz1")
+    worker_b.store("biz1", "What is your refund policy?", "30 days.", latency_seconds=1.0, generation=generation)
+    assert worker_b.lookup("biz1", "What is your refund policy?", worker_b.generation("biz1")) == "30 days."
+
+    # The documents change through worker A
+    worker_a.invalidate("biz1")
+
+    assert worker_b.lookup("biz1", "What is your refund policy?", worker_b.generation("biz1")) is None
+    assert worker_b.stats("biz1")["entries"] == 0
+
+
+def test_answers_built_before_an_invalidation_are_not_stored(generations):
+    cache = SemanticResponseCache(embed_fn=fake_embed, generations=generations)
+    generation = cache.generation("biz1")
+    cache.invalidate("biz1")  # while the agent was answering
+
+    cache.store("biz1", "What is your refund policy?", "Old answer.", latency_seconds=1.0, generation=generation)
+    assert cache.lookup("biz1", "What is your refund policy?", cache.generation("biz1")) is None
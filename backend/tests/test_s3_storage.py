@@ -0,0 +1,187 @@
+import io
+import os
+import pytest
+from app.services import file_storage as storage_module
+from app.services.file_storage import S3FileStorage
+from app.utils.hashing import sha256_text
+
+
+class FakeS3Error(Exception):
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {"Error": {"Code": code}}
+
+
+class FakeS3Client:
+    """In-memory stand-in for the subset of the boto3 S3 client used by S3FileStorage."""
+
+    def __init__(self):
+        self.objects = {}
+        self.uploads = {}
+        self.calls = []
+
+    def _get(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error("404")
+        return self.objects[(Bucket, Key)]
+
+    def put_object(self, Bucket, Key, Body):
+        self.calls.append("put_object")
+        self.objects[(Bucket, Key)] = Body.read()
+
+    def head_object(self, Bucket, Key):
+        return {"ContentLength": len(self._get(Bucket, Key))}
+
+    def get_object(self, Bucket, Key, Range=None):
+        data = self._get(Bucket, Key)
+        if Range:
+            start, end = Range.removeprefix("bytes=").split("-")
+            data = data[int(start):int(end) + 1]
+            self.calls.append(f"range:{Range}")
+        return {"Body": io.BytesIO(data)}
+
+    def create_multipart_upload(self, Bucket, Key):
+        self.calls.append("create_multipart_upload")
+        self.uploads["u1"] = {}
+        return {"UploadId": "u1"}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body):
+        self.uploads[UploadId][PartNumber] = Body
+        return {"ETag": f"etag-{PartNumber}"}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload):
+        parts = self.uploads.pop(UploadId)
+        self.objects[(Bucket, Key)] = b"".join(parts[p["PartNumber"]] for p in MultipartUpload["Parts"])
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId):
+        self.uploads.pop(UploadId, None)
+
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+
+    def get_paginator(self, name):
+        client = self
+
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = [k for b, k in client.objects if b == Bucket and k.startswith(Prefix)]
+                yield {"Contents": [{"Key": k} for k in keys]}
+
+        return Paginator()
+
+
+@pytest.fixture
+def s3(tmp_path):
+    client = FakeS3Client()
+    storage = S3FileStorage(bucket="docs", prefix="tenants", cache_dir=str(tmp_path / "cache"), client=client)
+    return storage, client
+
+
+def test_save_is_content_addressed_and_deduplicated(s3):
+    storage, client = s3
+    first = storage.save(io.BytesIO(b"refund policy"), "Policy.TXT", "u1")
+    second = storage.save(io.BytesIO(b"refund policy"), "copy.txt", "u1")
+
+    assert first == second == f"u1/{sha256_text('refund policy')}.txt"
+    assert client.objects[("docs", f"tenants/{first}")] == b"refund policy"
+    assert client.calls.count("put_object") == 1
+    assert storage.list_files("u1") == [os.path.basename(first)]
+
+
+def test_large_files_use_multipart_upload(s3, monkeypatch):
+    monkeypatch.setattr(storage_module, "MULTIPART_PART_SIZE", 1024)
+    storage, client = s3
+    payload = os.urandom(3000)
+
+    file_path = storage.save(io.BytesIO(payload), "big.bin", "u1")
+
+    assert "create_multipart_upload" in client.calls
+    assert client.objects[("docs", f"tenants/{file_path}")] == payload
+
+
+def test_read_through_cache_on_another_node(s3, tmp_path):
+    storage, client = s3
+    file_path = storage.save(io.BytesIO(b"hello from node a"), "a.txt", "u1")
+
+    other_node = S3FileStorage(bucket="docs", prefix="tenants", cache_dir=str(tmp_path / "node_b"), client=client)
+    local = other_node.get_full_path(file_path)
+
+    with open(local, "rb") as f:
+        assert f.read() == b"hello from node a"
+    assert local.startswith(str(tmp_path / "node_b"))
+
+
+def test_open_uses_ranged_reads_when_not_cached(s3, tmp_path, monkeypatch):
+    monkeypatch.setattr(storage_module, "RANGE_BLOCK_SIZE", 16)
+    storage, client = s3
+    payload = bytes(range(256)) * 4
+    file_path = storage.save(io.BytesIO(payload), "doc.pdf", "u1")
+
+    other_node = S3FileStorage(bucket="docs", prefix="tenants", cache_dir=str(tmp_path / "node_b"), client=client)
+    with other_node.open(file_path) as stream:
+        stream.seek(-8, io.SEEK_END)
+        assert stream.read() == payload[-8:]
+        stream.seek(100)
+        assert stream.read(4) == payload[100:104]
+
+    ranges = [c for c in client.calls if c.startswith("range:")]
+    assert ranges and all(int(r.split("-")[1]) - int(r.split("=")[1].split("-")[0]) < 64 for r in ranges)
+
+
+def test_cache_is_bounded_and_delete_removes_object(s3):
+    storage, client = s3
+    storage.cache_max_bytes = 10
+    first = storage.save(io.BytesIO(b"a" * 8), "a.txt", "u1")
+    os.utime(storage._cache_path(first), (1, 1))
+    storage.save(io.BytesIO(b"b" * 8), "b.txt", "u1")
+
+    assert not os.path.exists(storage._cache_path(first))
+    # Evicted entries are re-fetched transparently
+    with open(storage.get_full_path(first), "rb") as f:
+        assert f.read() == b"a" * 8
+
+    assert storage.delete(first) is True
+    assert ("docs", f"tenants/{first}") not in client.objects
+    assert storage.delete(first) is False
+    with pytest.raises(FileNotFoundError):
+        storage.get_full_path(first)
+
+
+def test_eviction_spares_the_returned_file_and_files_in_use(s3):
+    storage, client = s3
+    storage.cache_max_bytes = 10
+    old = storage.save(io.BytesIO(b"o" * 8), "old.txt", "u1")
+    in_use = storage.save(io.BytesIO(b"i" * 8), "in_use.txt", "u1")
+    os.utime(storage._cache_path(old), (1, 1))
+
+    # Larger than the whole cache: still returned, and the recently used file survives
+    big = storage.save(io.BytesIO(b"b" * 32), "big.txt", "u1")
+
+    assert os.path.exists(storage._cache_path(big))
+    assert os.path.exists(storage._cache_path(in_use))
+    assert not os.path.exists(storage._cache_path(old))
+
+
+def test_remote_pdfs_are_extracted_from_ranged_reads(s3, tmp_path, monkeypatch):
+    from pypdf import PdfWriter
+    from app.services.extractors import PDF, ExtractionPool
+
+    storage, client = s3
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    pdf = io.BytesIO()
+    writer.write(pdf)
+    file_path = storage.save(io.BytesIO(pdf.getvalue()), "manual.pdf", "u1")
+
+    other_node = S3FileStorage(bucket="docs", prefix="tenants", cache_dir=str(tmp_path / "node_b"), client=client)
+    monkeypatch.setattr(storage_module, "_file_storage", other_node)
+    assert other_node.is_remote(file_path)
+    client.calls.clear()
+
+    extracted = ExtractionPool(max_workers=0).submit_stored(file_path, "manual.pdf").result()
+    os.remove(extracted.path)
+
+    assert extracted.mime_type == PDF
+    assert client.calls and all(call.startswith("range:") for call in client.calls)
+    # Nothing was downloaded into the cache
+    assert other_node.is_remote(file_path)
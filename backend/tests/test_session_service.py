@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock
+from google.adk.sessions import DatabaseSessionService
+from app.services.agent_system import service
+
+
+@pytest.fixture
+def adk_sessions(tmp_path, monkeypatch):
+    svc = DatabaseSessionService(db_url=f"sqlite:///{tmp_path / 'adk.db'}")
+    monkeypatch.setattr(service, "session_service", svc)
+    monkeypatch.setattr(service, "_known_sessions", type(service._known_sessions)())
+    return svc
+
+
+def test_init_session_creates_then_uses_cache(adk_sessions, monkeypatch):
+    loop = asyncio.new_event_loop()
+
+    created = loop.run_until_complete(service.init_session("biz", "u1", "s1", {"response_style": "concise"}))
+    assert created is not None
+    assert created.state["user_id"] == "u1"
+    assert service.session_exists("biz", "u1", "s1")
+
+    # Second call must not touch the DB at all
+    probe = AsyncMock()
+    monkeypatch.setattr(adk_sessions, "get_session", probe)
+    monkeypatch.setattr(service, "session_exists", lambda *a: pytest.fail("cache miss"))
+    assert loop.run_until_complete(service.init_session("biz", "u1", "s1")) is None
+    probe.assert_not_called()
+
+
+def test_init_session_probe_skips_history_load(adk_sessions, monkeypatch):
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(adk_sessions.create_session(app_name="biz", user_id="u1", session_id="s2", state={}))
+
+    probe = AsyncMock()
+    monkeypatch.setattr(adk_sessions, "get_session", probe)
+    assert loop.run_until_complete(service.init_session("biz", "u1", "s2")) is None
+    probe.assert_not_called()
+    assert ("biz", "u1", "s2") in service._known_sessions
+
+
+def test_session_exists_is_scoped(adk_sessions):
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(adk_sessions.create_session(app_name="biz", user_id="u1", session_id="s3", state={}))
+
+    assert service.session_exists("biz", "u1", "s3")
+    assert not service.session_exists("biz", "u2", "s3")
+    assert not service.session_exists("other", "u1", "s3")
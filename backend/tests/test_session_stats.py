@@ -0,0 +1,116 @@
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.db.base import Base
+from app.models.chat_session import ChatSession
+from app.models.widget import GuestUser
+from app.services.session_stats import SessionStatsQueue
+
+START = datetime(2026, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def factory():
+    engine = create_engine("sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = Session()
+    db.add(GuestUser(id="g1", widget_id="w1", name="Ada", total_sessions=0))
+    db.add(ChatSession(id="s1", guest_id="g1", created_at=START))
+    db.add(ChatSession(id="s2", guest_id="g1", created_at=START))
+    db.commit()
+    db.close()
+    Session.engine = engine
+    return Session
+
+
+def count_statements(engine):
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_turns_are_coalesced_into_one_update_per_session(factory):
+    queue = SessionStatsQueue(factory)
+    for turn in range(3):
+        sent = START + timedelta(seconds=60 * turn)
+        queue.touch("s1", sent)
+        queue.record_turn("s1", sent, sent + timedelta(seconds=2 + turn))
+    queue.record_turn("s2", START, START + timedelta(seconds=5))
+    queue.record_guest_session("g1", START)
+    queue.record_guest_session("g1", START + timedelta(minutes=5))
+    assert queue.pending_user_messages("s1") == 3
+
+    statements = count_statements(factory.engine)
+    assert queue.flush() == 3
+    # One SELECT for creation times, one executemany UPDATE per table
+    assert [s.split()[0] for s in statements] == ["SELECT", "UPDATE", "UPDATE"]
+    assert queue.pending() == 0 and queue.pending_user_messages("s1") == 0
+
+    db = factory()
+    s1 = db.get(ChatSession, "s1")
+    assert (s1.total_messages, s1.user_messages, s1.ai_messages) == (6, 3, 3)
+    assert s1.first_response_time == 2
+    assert s1.session_duration == 124
+    assert s1.last_message_at.replace(tzinfo=timezone.utc) == START + timedelta(seconds=120)
+    assert db.get(ChatSession, "s2").total_messages == 2
+    guest = db.get(GuestUser, "g1")
+    assert guest.total_sessions == 2 and guest.is_returning
+    db.close()
+
+    # Increments are relative and the first response time is never overwritten
+    queue.record_turn("s1", START, START + timedelta(seconds=30))
+    queue.flush()
+    db = factory()
+    s1 = db.get(ChatSession, "s1")
+    assert (s1.total_messages, s1.first_response_time) == (8, 2)
+    db.close()
+
+
+def test_failed_flush_keeps_updates_for_the_next_one(factory):
+    healthy = factory
+    broken = {"on": True}
+
+    def flaky_factory():
+        db = healthy()
+        if broken["on"]:
+            db.execute = lambda *args, **kwargs: (_ for _ in ()).throw(ConnectionError("db down"))
+        return db
+
+    queue = SessionStatsQueue(flaky_factory)
+    queue.record_turn("s1", START, START + timedelta(seconds=1))
+    with pytest.raises(ConnectionError):
+        queue.flush()
+    queue.record_turn("s1", START, START + timedelta(seconds=3))
+    assert queue.pending_user_messages("s1") == 2
+
+    broken["on"] = False
+    queue.flush()
+    db = healthy()
+    s1 = db.get(ChatSession, "s1")
+    assert (s1.user_messages, s1.first_response_time) == (2, 1)
+    db.close()
+
+
+def test_background_task_flushes_on_interval_and_on_stop(factory):
+    queue = SessionStatsQueue(factory, flush_interval=0.05)
+
+    def user_messages():
+        db = factory()
+        try:
+            return db.get(ChatSession, "s1").user_messages
+        finally:
+            db.close()
+
+    async def go():
+        queue.record_turn("s1", START, START + timedelta(seconds=1))  # starts the flusher
+        await asyncio.sleep(0.2)
+        flushed_in_background = user_messages()
+        queue.record_turn("s1", START, START + timedelta(seconds=1))
+        await queue.stop()
+        return flushed_in_background, user_messages()
+
+    assert asyncio.new_event_loop().run_until_complete(go()) == (1, 2)
@@ -0,0 +1,32 @@
+import os
+import re
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Loaded on first chat turn / first retrieval, never while a worker boots
+DEFERRED_MODULES = ("google.adk", "google.genai", "litellm", "chromadb")
+
+# Cumulative `-X importtime` for app.main; ~1s locally, headroom for slow CI machines
+IMPORT_BUDGET_SECONDS = 3.0
+
+_IMPORTTIME_RE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile():
+    """{module: cumulative microseconds} for a fresh `import app.main`."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR, capture_output=True, text=True, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    return {m.group(3): int(m.group(1)) for m in map(_IMPORTTIME_RE.match, result.stderr.splitlines()) if m}
+
+
+def test_app_import_defers_heavy_dependencies_and_stays_within_budget():
+    profile = import_profile()
+
+    loaded = sorted(name for name in profile if name.startswith(DEFERRED_MODULES))
+    assert loaded == []
+    assert profile["app.main"] / 1e6 < IMPORT_BUDGET_SECONDS
@@ -0,0 +1,114 @@
+import tracemalloc
+import pytest
+from app.models.document import Document
+from app.services import rag_service as rag_module
+from app.services.rag_service import rag_service
+from app.utils.document_reader import iter_text_blocks
+from app.utils.text_splitter import iter_text_chunks, recursive_character_text_splitter
+
+
+class CountingVectorDB:
+    """Vector store stand-in that keeps only counts, so it adds no memory of its own."""
+
+    def __init__(self):
+        self.batches = []
+
+    def get(self, where=None, ids=None, include=None):
+        return {"ids": [], "documents": [], "metadatas": []}
+
+    def add_documents(self, documents, metadatas, ids):
+        self.batches.append(len(documents))
+
+    def update_metadatas(self, ids, metadatas):
+        pass
+
+    def delete(self, where=None, ids=None):
+        pass
+
+
+class NullKeywordIndex:
+    def add_documents(self, documents, metadatas, ids):
+        pass
+
+    def delete_ids(self, user_id, ids):
+        pass
+
+    def publish(self, user_id):
+        pass
+
+
+@pytest.fixture
+def counting_store(monkeypatch):
+    store = CountingVectorDB()
+    monkeypatch.setattr(rag_service, "vector_db", store)
+    monkeypatch.setattr(rag_service, "keyword_index", NullKeywordIndex())
+    return store
+
+
+def test_text_blocks_decode_characters_split_across_blocks(tmp_path):
+    path = tmp_path / "menu.txt"
+    text = "Crème brûlée — €7.50\n" * 50
+    path.write_text(text, encoding="utf-8")
+
+    blocks = list(iter_text_blocks(str(path), block_size=7))
+
+    assert len(blocks) > 1
+    assert "".join(blocks) == text
+
+
+def test_text_blocks_of_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert list(iter_text_blocks(str(path))) == []
+
+
+def test_streamed_chunks_match_whole_text_split():
+    text = "".join(f"Paragraph {i}. " + "word " * (i % 37) + ("\n\n" if i % 5 == 0 else "") for i in range(800))
+    blocks = [text[i:i + 333] for i in range(0, len(text), 333)]
+
+    assert list(iter_text_chunks(blocks)) == recursive_character_text_splitter(text)
+
+
+def test_ingestion_embeds_in_batches_with_bounded_memory(db_session, counting_store, monkeypatch, tmp_path):
+    monkeypatch.setattr(rag_module, "EMBED_BATCH_SIZE", 32)
+    path = tmp_path / "dump.txt"
+    line = "Order {n} shipped to warehouse {w} with tracking code TRK{n:08d}.\n"
+    with open(path, "w") as f:
+        for n in range(120_000):
+            f.write(line.format(n=n, w=n % 17))
+    file_size = path.stat().st_size
+
+    monkeypatch.setattr(rag_service.file_storage, "get_full_path", lambda _: str(path))
+    db_session.add(Document(user_id="u1", filename="dump.txt", file_path="dump.txt", status="pending"))
+    db_session.commit()
+
+    tracemalloc.start()
+    try:
+        result = rag_service.process_documents("u1", db_session)[0]
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert result.status == "success"
+    assert max(counting_store.batches) <= 32
+    assert sum(counting_store.batches) == result.chunks_created > 1000
+    assert peak < file_size / 2
+
+
+def test_breaks_inside_the_overlap_do_not_creep():
+    # A paragraph break just after the chunk start used to advance the splitter one
+    # character at a time, emitting ~200 near-identical chunks per break
+    text = ("Short intro line.\n\n" + "word " * 400 + "\n\n") * 5
+
+    chunks = recursive_character_text_splitter(text)
+
+    assert len(chunks) < len(text) // 500
+    assert all(len(c) > 200 for c in chunks[:-1])
+
+
+def test_breaks_ending_past_the_overlap_split_as_before():
+    # The sentence break ends one character past the overlap: the whole-range search picks
+    # it over the later space, and the next chunk starts after this one
+    text = "a" * 199 + ". " + "b" * 300 + " " + "c" * 499
+
+    assert recursive_character_text_splitter(text) == [text[:201], text[1:]]
@@ -0,0 +1,80 @@
+import asyncio
+import httpx
+from fastapi import FastAPI
+from app.core.metrics import Histogram, MetricsRegistry
+from app.core.tracing import TracingMiddleware, setup_tracing, stage_duration, tracer
+from app.main import app as main_app
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def get(app, path):
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get(path)
+    return run(go())
+
+
+def stage_count(stage):
+    return stage_duration.snapshot().get((stage,), {"count": 0})["count"]
+
+
+def test_histogram_renders_cumulative_prometheus_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("demo_seconds", "Demo", labelnames=("stage",), buckets=(0.1, 1.0)))
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(5, stage="a")
+
+    text = registry.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="a"} 3' in text
+    assert registry.register(Histogram("demo_seconds", "Again")) is histogram
+
+
+def test_finished_spans_feed_stage_histogram():
+    setup_tracing()
+    before = stage_count("test.stage")
+
+    with tracer.start_as_current_span("test.stage"):
+        pass
+
+    @tracer.start_as_current_span("test.stage")
+    async def traced():
+        await asyncio.sleep(0.01)
+
+    run(traced())
+    assert stage_count("test.stage") == before + 2
+    assert stage_duration.snapshot()[("test.stage",)]["sum"] >= 0.01
+
+
+def test_middleware_names_request_span_after_route_template():
+    setup_tracing()
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/items/{item_id}")
+    def read_item(item_id: str):
+        return {"id": item_id}
+
+    before = stage_count("GET /items/{item_id}")
+    assert get(app, "/items/abc123").status_code == 200
+    assert get(app, "/items/def456").status_code == 200
+    assert stage_count("GET /items/{item_id}") == before + 2
+    assert ("GET /items/abc123",) not in stage_duration.snapshot()
+
+
+def test_metrics_endpoint_exposes_stage_histogram():
+    with tracer.start_as_current_span("test.metrics_endpoint"):
+        pass
+
+    response = get(main_app, "/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'taimako_stage_duration_seconds_count{stage="test.metrics_endpoint"}' in response.text
@@ -0,0 +1,138 @@
+import asyncio
+import io
+import os
+import httpx
+import pytest
+from datetime import datetime
+from unittest.mock import MagicMock
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+from app.core.upload_limits import UploadSizeLimitMiddleware
+from app.services.file_storage import LocalFileStorage, StorageQuotaExceeded, safe_extension
+from app.services.rag_service import rag_service
+from app.utils.hashing import HashingReader, ReadLimitExceeded, sha256_text
+from app.models.document import Document
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    local = LocalFileStorage(base_dir=str(tmp_path / "uploads"))
+    monkeypatch.setattr(rag_service, "file_storage", local)
+    return tmp_path / "uploads"
+
+
+def make_file(name, content):
+    file = MagicMock()
+    file.filename = name
+    file.file = io.BytesIO(content)
+    return file
+
+
+def run(coro):
+    return asyncio.new_event_loop().run_until_complete(coro)
+
+
+def test_hashing_reader_enforces_limit():
+    reader = HashingReader(io.BytesIO(b"x" * 10), max_bytes=8)
+    assert reader.read(8) == b"x" * 8
+    with pytest.raises(ReadLimitExceeded):
+        reader.read(8)
+
+
+def test_safe_extension_ignores_path_tricks():
+    assert safe_extension("Report.PDF") == ".pdf"
+    assert safe_extension("../../etc/passwd") == ""
+    assert safe_extension("notes.t xt") == ""
+
+
+def test_upload_records_size_and_hash(db_session, storage):
+    run(rag_service.upload_document(make_file("a.txt", b"hello world"), "u1", db_session))
+
+    doc = db_session.query(Document).filter(Document.user_id == "u1").one()
+    assert doc.size_bytes == 11
+    assert doc.content_hash == sha256_text("hello world")
+    assert os.path.basename(doc.file_path) == doc.content_hash + ".txt"
+
+
+def test_oversized_upload_is_rejected_without_leftovers(db_session, storage, monkeypatch):
+    monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", 16)
+
+    with pytest.raises(ReadLimitExceeded):
+        run(rag_service.upload_document(make_file("big.txt", b"y" * 64), "u1", db_session))
+
+    assert db_session.query(Document).count() == 0
+    assert not any(f for _, _, files in os.walk(storage) for f in files)
+
+
+def test_quota_counts_existing_documents(db_session, storage, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 20)
+    run(rag_service.upload_document(make_file("a.txt", b"a" * 15), "u1", db_session))
+
+    with pytest.raises(ReadLimitExceeded):
+        run(rag_service.upload_document(make_file("b.txt", b"b" * 10), "u1", db_session))
+
+    # Replacing a document frees its old size
+    run(rag_service.upload_document(make_file("a.txt", b"c" * 18), "u1", db_session))
+    assert rag_service.storage_used("u1", db_session) == 18
+
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 18)
+    with pytest.raises(StorageQuotaExceeded):
+        run(rag_service.upload_document(make_file("c.txt", b"d"), "u1", db_session))
+
+
+def test_concurrent_uploads_respect_quota(db_session, storage, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 25)
+
+    async def upload_all():
+        files = [make_file(f"f{i}.txt", bytes([65 + i]) * 10) for i in range(4)]
+        return await asyncio.gather(
+            *(rag_service.upload_document(f, "u1", db_session) for f in files),
+            return_exceptions=True
+        )
+
+    results = run(upload_all())
+    saved = [r for r in results if isinstance(r, str)]
+    assert len(saved) == 2
+    assert all(isinstance(r, (ReadLimitExceeded, StorageQuotaExceeded)) for r in results if not isinstance(r, str))
+    assert rag_service.storage_used("u1", db_session) == 20
+
+
+def test_replacing_a_document_only_frees_that_documents_size(db_session, storage, monkeypatch):
+    monkeypatch.setattr(settings, "STORAGE_QUOTA_BYTES", 30)
+    run(rag_service.upload_document(make_file("a.txt", b"a" * 10), "u1", db_session))
+    # An older document with the same name (e.g. from before re-uploads updated in place)
+    db_session.add(Document(user_id="u1", filename="a.txt", file_path="old", size_bytes=15,
+                            created_at=datetime(2020, 1, 1)))
+    db_session.commit()
+
+    # Only the newest a.txt is replaced: 15 (older copy) + 16 > 30
+    with pytest.raises(ReadLimitExceeded):
+        run(rag_service.upload_document(make_file("a.txt", b"b" * 16), "u1", db_session))
+
+    run(rag_service.upload_document(make_file("a.txt", b"c" * 15), "u1", db_session))
+    assert rag_service.storage_used("u1", db_session) == 30
+
+
+def test_oversized_upload_requests_are_refused_before_the_body_is_read():
+    received = []
+
+    async def endpoint(scope, receive, send):
+        received.append(await receive())
+        await JSONResponse({})(scope, receive, send)
+
+    app = UploadSizeLimitMiddleware(endpoint, paths=["/documents/upload"], max_bytes=1024)
+
+    async def go():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            small = await client.post("/documents/upload", files={"files": ("a.txt", b"a" * 100)})
+            big = await client.post("/documents/upload", files={"files": ("b.txt", b"b" * 200_000)})
+            other = await client.post("/elsewhere", content=b"c" * 200_000)
+        return small, big, other
+
+    small, big, other = run(go())
+    assert small.status_code == 200
+    assert big.status_code == 413
+    assert big.json()["error_code"] == "PAYLOAD_TOO_LARGE"
+    assert other.status_code == 200
+    assert len(received) == 2
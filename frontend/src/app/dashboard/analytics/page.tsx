@@ -4,7 +4,7 @@ import React, { useEffect, useState } from 'react';
 import Tabs from '@/components/ui/Tabs';
 import { Activity, Users, Globe, Target } from 'lucide-react';
 import Card from '@/components/ui/Card';
-import { getTopIntents, getTopLocations, getTrafficSources, getAnalyticsOverview } from '@/lib/api';
+import { getAnalyticsDashboard } from '@/lib/api';
 import { IntentStat, TrafficSource, AnalyticsOverview, LocationStat } from '@/lib/types';
 
 // TrendChart Component
@@ -93,16 +93,11 @@ export default function AnalyticsPage() {
   useEffect(() => {
     async function fetchData() {
       try {
-        const [i, l, s, o] = await Promise.all([
-          getTopIntents(),
-          getTopLocations(),
-          getTrafficSources(),
-          getAnalyticsOverview()
-        ]);
-        setIntents(i);
-        setLocations(l);
-        setSources(s);
-        setOverview(o as AnalyticsOverview);
+        const dashboard = await getAnalyticsDashboard();
+        setIntents(dashboard.intents);
+        setLocations(dashboard.locations);
+        setSources(dashboard.sources);
+        setOverview(dashboard.overview);
       } catch (e) {
         console.error(e);
       } finally {
@@ -4,7 +4,7 @@ import React, { useEffect, useState } from 'react';
 import { motion } from 'framer-motion';
 import { Users, Clock, MessageSquare, Target, ArrowUp, ArrowDown, MapPin, RefreshCw } from 'lucide-react';
 import { cn } from '@/lib/utils';
-import { getAnalyticsOverview, getTopIntents, getTopLocations, getTrafficSources } from '@/lib/api';
+import { getAnalyticsDashboard } from '@/lib/api';
 import { AnalyticsOverview, IntentStat, TrafficSource, LocationStat } from '@/lib/types';
 
 // --- Components ---
@@ -96,16 +96,11 @@ export default function DashboardOverview() {
   useEffect(() => {
     async function fetchData() {
       try {
-        const [m, i, l, s] = await Promise.all([
-          getAnalyticsOverview(),
-          getTopIntents(),
-          getTopLocations(),
-          getTrafficSources()
-        ]);
-        setMetrics(m as AnalyticsOverview);
-        setIntents(i);
-        setLocations(l);
-        setSources(s);
+        const dashboard = await getAnalyticsDashboard();
+        setMetrics(dashboard.overview);
+        setIntents(dashboard.intents);
+        setLocations(dashboard.locations);
+        setSources(dashboard.sources);
       } catch (e) {
         console.error("Failed to load dashboard data", e);
       } finally {
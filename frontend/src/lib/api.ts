@@ -11,6 +11,7 @@ import type {
   Document,
   ApiResponse,
   AnalyticsOverview,
+  AnalyticsDashboard,
   IntentStat,
   LocationStat,
   TrafficSource,
@@ -214,6 +215,12 @@ export const chatWithAgent = async (message: string): Promise<ChatResponse> => {
 };
 
 // Analytics & Sessions
+// All dashboard panels in one request (one auth check, one scan of the sessions window)
+export const getAnalyticsDashboard = async (days: number = 30): Promise<AnalyticsDashboard> => {
+  const response = await api.get(`/analytics/dashboard?days=${days}`);
+  return response.data.data;
+};
+
 export const getAnalyticsOverview = async (days: number = 30): Promise<ApiResponse<AnalyticsOverview> | AnalyticsOverview> => {
   // Note: The backend returns raw dict for overview, not wrapped in ApiResponse envelope currently in code, let's verify.
   // Looking at analytics.py: return {...} directly. So it's raw JSON.
@@ -183,6 +183,14 @@ export interface LocationStat {
   count: number;
 }
 
+export interface AnalyticsDashboard {
+  overview: AnalyticsOverview;
+  intents: IntentStat[];
+  locations: LocationStat[];
+  sources: TrafficSource[];
+  trend: { date: string; count: number }[];
+}
+
 export interface Guest {
   id: string;
   name: string;